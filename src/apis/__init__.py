@@ -5,6 +5,7 @@ from .dataset.dataset_api import api as dataset_api
 from .resource.resource_api import api as resource_api
 from .gtaa.gtaa_api import api as gtaa_api
 from .link.link_api import api as link_api
+from .batch.batch_api import api as batch_api
 from config import cfg
 
 SWAGGER_UI_PATH = cfg["SWAGGER_UI_PATH"]
@@ -39,3 +40,6 @@ if "health" in enabled_endpoints:
 
 if "link" in enabled_endpoints:
     api.add_namespace(link_api, path="%s" % base_path)
+
+if "batch" in enabled_endpoints:
+    api.add_namespace(batch_api, path="%s" % base_path)
@@ -0,0 +1,158 @@
+import itertools
+import logging
+from enum import Enum
+from typing import Iterable, Iterator, List, Optional, Tuple
+from flask import current_app, request, Response, stream_with_context
+from flask_restx import Namespace, Resource
+from rdflib import Dataset, Graph, URIRef
+from requests.exceptions import ConnectionError, HTTPError, Timeout
+from models.ResourceApiUriLevel import ResourceApiUriLevel
+from util.APIUtil import APIUtil
+import util.ld_util
+
+logger = logging.getLogger()
+
+
+api = Namespace(
+    "batch",
+    description="Many audiovisual catalog items and GTAA terms in RDF, in one request.",
+)
+
+
+class BatchMimeType(Enum):
+    N_TRIPLES = "application/n-triples"
+    N_QUADS = "application/n-quads"
+    JSON_LD_LINES = "application/x-ndjson"  # a JSON-LD document per resource per line
+
+
+def serialize_resource(
+    rdf_graph: Graph, resource_url: str, mime_type: BatchMimeType
+) -> str:
+    """Returns the graph of the resource in the mime type, ending with a newline.
+    In N-Quads, the resource URI is the name of the graph with its triples."""
+    if mime_type is BatchMimeType.N_QUADS:
+        dataset = Dataset()
+        named_graph = dataset.graph(URIRef(resource_url))
+        named_graph += rdf_graph
+        return dataset.serialize(format="nquads").rstrip("\n") + "\n"
+    if mime_type is BatchMimeType.JSON_LD_LINES:
+        return rdf_graph.serialize(format="json-ld", indent=None) + "\n"
+    return rdf_graph.serialize(format="nt11")
+
+
+def read_identifiers() -> List[str]:
+    """Returns the identifiers in the request: a JSON list, a newline-delimited file
+    (form field "file") or newline-delimited text in the body."""
+    if request.is_json:
+        identifiers = request.get_json(silent=True)
+        if not isinstance(identifiers, list):
+            raise ValueError("The JSON body must be a list of identifiers.")
+        return [str(identifier).strip() for identifier in identifiers]
+    if "file" in request.files:
+        text = request.files["file"].read().decode("utf-8")
+    else:
+        text = request.get_data(as_text=True)
+    return [line.strip() for line in text.splitlines() if line.strip()]
+
+
+def to_resource(
+    identifier: str, data_domain: str
+) -> Tuple[str, Optional[Iterable[URIRef]]]:
+    """Returns the resource URI and the rdf:types of which the resource must have
+    one, for an identifier like program/1234 or gtaa/1234 (or the resource URI).
+    raises a ValueError for an invalid identifier."""
+    for prefix in (data_domain, "id/"):
+        if identifier.startswith(prefix):
+            identifier = identifier[len(prefix) :]
+    resource_type, _, number = identifier.partition("/")
+    if resource_type == "gtaa":
+        if not number.replace("_", "").isalnum():
+            raise ValueError(f"Invalid GTAA identifier: {identifier}")
+        return f"{data_domain}gtaa/{number}", util.ld_util.SKOS_RESOURCE_TYPES
+    if not number.isdigit():
+        raise ValueError(f"Invalid identifier: {identifier}")
+    resource_url = util.ld_util.generate_lod_resource_uri(
+        ResourceApiUriLevel(resource_type), number, data_domain
+    )
+    return resource_url, util.ld_util.NISV_CAT_RESOURCE_TYPES
+
+
+@api.doc(
+    responses={
+        200: "Success",
+        400: "Bad request.",
+    }
+)
+@api.route("batch", endpoint="batch")
+class BatchAPI(Resource):
+    """Serve the RDF for many catalog items and GTAA terms at once, e.g. for harvesting."""
+
+    @api.doc(
+        responses={
+            502: "The triple store failed.",
+            504: "The triple store timed out.",
+        }
+    )
+    @api.produces([mt.value for mt in BatchMimeType])
+    def post(self):
+        """Get the RDF for a list of identifiers, like program/1234 or gtaa/1234.
+        The identifiers are a JSON list, or newline-delimited in the body or in an
+        uploaded file. Identifiers of resources that don't exist are skipped.
+        """
+        data_domain = current_app.config.get("BENG_DATA_DOMAIN", "")
+        try:
+            identifiers = read_identifiers()
+            resources = list(
+                dict.fromkeys(to_resource(i, data_domain) for i in identifiers)
+            )
+        except ValueError as e:  # also a UnicodeDecodeError
+            return APIUtil.toErrorResponse("bad_request", str(e))
+        max_identifiers = current_app.config.get("BATCH_MAX_IDENTIFIERS", 10000)
+        if not resources or len(resources) > max_identifiers:
+            return APIUtil.toErrorResponse(
+                "bad_request",
+                f"Supply between 1 and {max_identifiers} identifiers.",
+            )
+
+        best_match = request.accept_mimetypes.best_match(
+            [mt.value for mt in BatchMimeType], BatchMimeType.N_TRIPLES.value
+        )
+        mime_type = BatchMimeType(best_match)
+
+        # the graphs are queried in batches while the response is streamed
+        graphs = util.ld_util.get_resources_from_rdf_store(
+            resources,
+            current_app.config.get("SPARQL_ENDPOINT", ""),
+            current_app.config.get("BENG_LOD_RESOURCE_QUERY", ""),
+            current_app.config.get("URI_NISV_ORGANISATION", ""),
+            current_app.config.get("BATCH_QUERY_SIZE", 100),
+        )
+        # the first resource is read before the status is sent, so a triple store
+        # that can't be reached gives an error status instead of an empty body
+        try:
+            first = list(itertools.islice(graphs, 1))
+        except Timeout:
+            logger.exception("Getting the resources for a batch request timed out.")
+            return APIUtil.toErrorResponse("gateway_timeout")
+        except (ConnectionError, HTTPError):
+            logger.exception("Getting the resources for a batch request failed.")
+            return APIUtil.toErrorResponse("bad_gateway")
+        return Response(
+            stream_with_context(
+                generate_body(itertools.chain(first, graphs), mime_type)
+            ),
+            mimetype=mime_type.value,
+        )
+
+
+def generate_body(
+    graphs: Iterator[Tuple[str, Graph]], mime_type: BatchMimeType
+) -> Iterator[str]:
+    try:
+        for resource_url, rdf_graph in graphs:
+            yield serialize_resource(rdf_graph, resource_url, mime_type)
+    except (ConnectionError, HTTPError, Timeout):
+        # the status was sent already: the error aborts the response, so the client
+        # gets a truncated (chunked) body instead of a complete one
+        logger.exception("Getting the resources for a batch request failed.")
+        raise
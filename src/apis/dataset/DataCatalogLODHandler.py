@@ -1,6 +1,10 @@
 import logging
-from typing import List, Optional
-from rdflib import Graph, URIRef
+import math
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+from rdflib import Graph, Literal, Namespace, URIRef
+from rdflib.term import Node
+from rdflib.compare import to_isomorphic
 from rdflib.namespace import RDF, SDO  # type: ignore
 from util.mime_type_util import MimeType
 from util.ld_util import sparql_construct_query
@@ -8,17 +12,134 @@ from config import cfg
 
 logger = logging.getLogger()
 
+HYDRA = Namespace("http://www.w3.org/ns/hydra/core#")
+
+# the mime types of the materialized documents: only the RDF serializations, which
+# depend on the graph of the resource alone (its digest). An HTML page also shows
+# the inverse relations of the resource, which may change without the graph.
+MATERIALIZED_MIME_TYPES = [
+    mime_type for mime_type in MimeType if mime_type is not MimeType.HTML
+]
+
 
 class DataCatalogLODHandler:
     """Handles requests from the beng-lod server for data catalogs, datasets, datadownloads.
     The only data model/ontology this data is available in is schema.org.
     """
 
-    def __init__(self):
-        self._data_catalog = self._get_data_catalog_from_store(
-            cfg["SPARQL_ENDPOINT"], cfg["DATA_CATALOG_GRAPH"]
+    def __init__(self, data_catalog: Optional[Graph] = None):
+        """:param data_catalog: the data catalog Graph. When omitted, the data
+        catalog is loaded from the triple store."""
+        if data_catalog is None:
+            data_catalog = self._get_data_catalog_from_store(
+                cfg["SPARQL_ENDPOINT"], cfg["DATA_CATALOG_GRAPH"]
+            )
+        self._data_catalog = data_catalog
+        self._digest: Optional[str] = None
+        self._index_validity()
+        # the serialized documents per (IRI, mime type), see materialize
+        self._documents: Dict[Tuple[str, MimeType], bytes] = {}
+        # the digest of the graph and the modification time per materialized IRI
+        self._entity_digests: Dict[str, str] = {}
+        self._entity_modified_at: Dict[str, Optional[datetime]] = {}
+        # when the triples of the data catalog last changed, set by the DataCatalogStore
+        self.modified_at: Optional[datetime] = None
+
+    def size(self) -> int:
+        """Returns the number of triples in the data catalog."""
+        return len(self._data_catalog)
+
+    def digest(self) -> str:
+        """Returns a digest of the data catalog, which is the same for the same
+        triples (blank nodes included), also in another process."""
+        if self._digest is None:
+            self._digest = format(to_isomorphic(self._data_catalog).graph_digest(), "x")
+        return self._digest
+
+    def to_ntriples(self) -> bytes:
+        """Returns the data catalog as N-Triples, UTF-8 encoded."""
+        return self._data_catalog.serialize(format="nt11", encoding="utf-8")
+
+    def materialize(self, previous: Optional["DataCatalogLODHandler"] = None):
+        """Serializes the valid data catalogs, datasets and data downloads in every
+        RDF mime type once, for this data catalog graph, so a request for them is a
+        lookup (see get_document). The HTML pages are rendered per request, as they
+        show the inverse relations from the triple store.
+        :param previous: optional, the handler of the previous snapshot. The
+            documents of the IRIs whose graph didn't change are taken from it, so
+            only the changes are serialized (and get a new ETag).
+        """
+        # nothing changed, all documents are the same
+        if previous is not None and previous.digest() == self.digest():
+            self._documents = previous._documents
+            self._entity_digests = previous._entity_digests
+            self._entity_modified_at = previous._entity_modified_at
+            logger.info("The data catalog didn't change, no documents materialized.")
+            return
+
+        graphs = (
+            [
+                (uri, self.get_data_catalog_graph(uri))
+                for uri in self._valid_data_catalogs
+            ]
+            + [
+                (uri, self.get_dataset_triples(URIRef(uri)))
+                for uri in self._valid_datasets
+            ]
+            + [
+                (uri, self.get_data_download_triples(URIRef(uri)))
+                for uri in self._valid_data_downloads
+            ]
+        )
+        changed = 0
+        for uri, g in graphs:
+            entity_digest = format(to_isomorphic(g).graph_digest(), "x")
+            self._entity_digests[uri] = entity_digest
+            if (
+                previous is not None
+                and previous._entity_digests.get(uri) == entity_digest
+            ):
+                self._entity_modified_at[uri] = previous._entity_modified_at[uri]
+                for mime_type in MATERIALIZED_MIME_TYPES:
+                    document = previous._documents.get((uri, mime_type))
+                    if document is not None:
+                        self._documents[(uri, mime_type)] = document
+                continue
+            changed += 1
+            self._entity_modified_at[uri] = self.modified_at
+            self._serialize(uri, g)
+        logger.info(
+            f"{len(self._documents)} data catalog documents materialized, "
+            f"for {changed} of {len(graphs)} changed resources."
         )
 
+    def _serialize(self, uri: str, g: Graph):
+        for mime_type in MATERIALIZED_MIME_TYPES:
+            try:
+                document = g.serialize(format=mime_type.to_ld_format())
+            except Exception:
+                # the document is created when it is requested
+                logger.exception(f"Serializing {uri} as {mime_type.value} failed.")
+                continue
+            if document:
+                self._documents[(uri, mime_type)] = document.encode("utf-8")
+
+    def entity_digest(self, uri: str) -> str:
+        """Returns the digest of the graph of the data catalog, dataset or data
+        download, which only changes when its triples change. It is the digest of
+        the data catalog for an IRI that was not materialized."""
+        return self._entity_digests.get(str(uri)) or self.digest()
+
+    def entity_modified_at(self, uri: str) -> Optional[datetime]:
+        """Returns when the triples of the data catalog, dataset or data download
+        last changed, see entity_digest."""
+        return self._entity_modified_at.get(str(uri), self.modified_at)
+
+    def get_document(self, uri: str, mime_type: MimeType) -> Optional[bytes]:
+        """Returns the serialized document for the IRI in the mime type, or None if
+        it was not materialized."""
+        return self._documents.get((str(uri), mime_type))
+
     def _get_data_catalog_from_store(self, sparql_endpoint, catalog_graph) -> Graph:
         """Get data catalog triples from the sparql endpoint."""
         logger.info(f"Getting data catalog triples from '{sparql_endpoint}'")
@@ -33,6 +154,46 @@ class DataCatalogLODHandler:
 
     """-------------NDE requirements validation----------------------"""
 
+    def _index_validity(self):
+        """Validates all data catalogs, datasets, data downloads and organizations
+        once, for this data catalog graph, so the is_valid_* functions and the
+        get_*_for_* functions are lookups."""
+        g = self._data_catalog
+
+        def valid(rdf_type: URIRef, *predicates: URIRef) -> Set[str]:
+            # the IRIs of the type that have all the predicates
+            subjects_per_predicate = [
+                set(g.subjects(predicate, unique=True)) for predicate in predicates
+            ]
+            return {
+                str(subject)
+                for subject in g.subjects(RDF.type, rdf_type, unique=True)
+                if isinstance(subject, URIRef)
+                and all(subject in subjects for subjects in subjects_per_predicate)
+            }
+
+        self._valid_data_downloads = valid(
+            SDO.DataDownload, SDO.contentUrl, SDO.encodingFormat, SDO.usageInfo
+        )
+        self._valid_datasets = valid(
+            SDO.Dataset, SDO.name, SDO.license, SDO.publisher, SDO.distribution
+        )
+        self._valid_data_catalogs = valid(
+            SDO.DataCatalog, SDO.name, SDO.publisher, SDO.dataset
+        )
+        self._valid_organizations = valid(SDO.Organization, SDO.name)
+
+        # the valid datasets per data catalog and data downloads per dataset,
+        # sorted so every request lists them in the same order
+        self._datasets: Dict[str, List[str]] = {}
+        for subject, obj in sorted(g.subject_objects(SDO.dataset)):
+            if str(obj) in self._valid_datasets:
+                self._datasets.setdefault(str(subject), []).append(str(obj))
+        self._data_downloads: Dict[str, List[Node]] = {}
+        for subject, obj in sorted(g.subject_objects(SDO.distribution)):
+            if str(obj) in self._valid_data_downloads:
+                self._data_downloads.setdefault(str(subject), []).append(obj)
+
     def is_valid_data_download(self, data_download_id: str) -> bool:
         """Checks whether the data download has the minimal required information.
 
@@ -42,14 +203,7 @@ class DataCatalogLODHandler:
           - encodingFormat
           - usageInfo (if the distribution is non-standard API)
         """
-        if (
-            self.is_data_download(data_download_id)
-            and self.has_content_url(data_download_id)
-            and self.has_encoding_format(data_download_id)
-            and self.has_usage_info(data_download_id)
-        ):
-            return True
-        return False
+        return str(data_download_id) in self._valid_data_downloads
 
     def is_valid_dataset(self, dataset_id: str) -> bool:
         """Checks whether the dataset qualifies according to the NDE requirements for datasets.
@@ -63,15 +217,7 @@ class DataCatalogLODHandler:
           - a publisher
           - at least one distribution
         """
-        if (
-            self.is_dataset(dataset_id)
-            and self.has_name(dataset_id)
-            and self.has_license(dataset_id)
-            and self.has_publisher(dataset_id)
-            and self.has_distribution(dataset_id)
-        ):
-            return True
-        return False
+        return str(dataset_id) in self._valid_datasets
 
     def is_valid_data_catalog(self, data_catalog_id: str) -> bool:
         """Checks if the data catalog has at least got the minimal required properties.
@@ -82,14 +228,7 @@ class DataCatalogLODHandler:
           - a publisher
           - at least one dataset
         """
-        if (
-            self.is_data_catalog(data_catalog_id)
-            and self.has_name(data_catalog_id)
-            and self.has_publisher(data_catalog_id)
-            and self.has_dataset(data_catalog_id)
-        ):
-            return True
-        return False
+        return str(data_catalog_id) in self._valid_data_catalogs
 
     def is_valid_organization(self, organization_id: str) -> bool:
         """Validates whether the Organization has the minimal required properties.
@@ -98,11 +237,7 @@ class DataCatalogLODHandler:
           - an IRI
           - a name
         """
-        if self.is_organization(URIRef(organization_id)) and self.has_name(
-            organization_id
-        ):
-            return True
-        return False
+        return str(organization_id) in self._valid_organizations
 
     def has_name(self, some_uri: str) -> bool:
         """Check whether the resource has a name."""
@@ -201,6 +336,15 @@ class DataCatalogLODHandler:
         :param data_catalog_uri: the identifier for the data catalog
         :param mime_format: the requested mime type for the graph data. Defaults to JSON-LD.
         """
+        # now serialize the collected triples in the requested format
+        return self.get_data_catalog_graph(data_catalog_uri).serialize(
+            format=mime_format,
+            auto_compact=True,
+        )
+
+    def get_data_catalog_graph(self, data_catalog_uri: str) -> Graph:
+        """Returns the graph with the triples for the data catalog, its publisher
+        and its datasets."""
         g = Graph()
         g.bind("sdo", SDO)
 
@@ -215,12 +359,7 @@ class DataCatalogLODHandler:
         # add triples for each dataset
         for dataset_uri in self.get_datasets_for_data_catalog(URIRef(data_catalog_uri)):
             g += self.get_dataset_triples(URIRef(dataset_uri))
-
-        # now serialize the collected triples in the requested format
-        return g.serialize(
-            format=mime_format,
-            auto_compact=True,
-        )
+        return g
 
     def is_dataset(self, dataset_uri: str) -> bool:
         """Check if dataset exists"""
@@ -288,27 +427,92 @@ class DataCatalogLODHandler:
             g.add(triple)
         return g
 
+    """------------- get pages ------------------"""
+
+    def get_datasets_page(
+        self, data_catalog_uri: str, page: int, page_size: int
+    ) -> Iterator[Graph]:
+        """Yields the graphs for a page of the datasets in the data catalog, see
+        _get_collection_page. The graph of a dataset has the triples of the dataset
+        itself, its data downloads are in the page of its distributions."""
+        return self._get_collection_page(
+            f"{data_catalog_uri}/datasets",
+            self.get_datasets_for_data_catalog(data_catalog_uri),
+            page,
+            page_size,
+            lambda dataset_uri: self._get_triples(URIRef(dataset_uri)),
+        )
+
+    def get_data_downloads_page(
+        self, dataset_uri: str, page: int, page_size: int
+    ) -> Iterator[Graph]:
+        """Yields the graphs for a page of the data downloads in the dataset, see
+        _get_collection_page."""
+        return self._get_collection_page(
+            f"{dataset_uri}/distributions",
+            self.get_data_downloads_for_dataset(dataset_uri),
+            page,
+            page_size,
+            self.get_data_download_triples,
+        )
+
+    def _get_collection_page(
+        self,
+        collection_uri: str,
+        members: List,
+        page: int,
+        page_size: int,
+        get_member_graph: Callable[[URIRef], Graph],
+    ) -> Iterator[Graph]:
+        """Yields the graphs for a page (from 1) of the members of a collection, one
+        at a time so they can be streamed: first the hydra:Collection with the
+        members of the page and the hydra:PartialCollectionView with the links to
+        the other pages, then the graph of each member.
+        """
+        last_page = max(1, math.ceil(len(members) / page_size))
+
+        def page_uri(number: int) -> URIRef:
+            return URIRef(f"{collection_uri}?page={number}&page_size={page_size}")
+
+        g = Graph()
+        g.bind("sdo", SDO)
+        g.bind("hydra", HYDRA)
+        page_members = members[(page - 1) * page_size : page * page_size]
+        collection = URIRef(collection_uri)
+        view = page_uri(page)
+        g.add((collection, RDF.type, HYDRA.Collection))
+        g.add((collection, HYDRA.totalItems, Literal(len(members))))
+        g.add((collection, HYDRA.view, view))
+        for member in page_members:
+            g.add((collection, HYDRA.member, URIRef(member)))
+        g.add((view, RDF.type, HYDRA.PartialCollectionView))
+        g.add((view, HYDRA.first, page_uri(1)))
+        g.add((view, HYDRA.last, page_uri(last_page)))
+        if page > 1:
+            g.add((view, HYDRA.previous, page_uri(page - 1)))
+        if page < last_page:
+            g.add((view, HYDRA.next, page_uri(page + 1)))
+        yield g
+
+        for member in page_members:
+            yield get_member_graph(URIRef(member))
+
+    def _get_triples(self, uri: URIRef) -> Graph:
+        g = Graph()
+        g.bind("sdo", SDO)
+        for triple in self._data_catalog.triples((uri, None, None)):
+            g.add(triple)
+        return g
+
     """------------- get aggregates ------------------"""
 
     def get_datasets_for_data_catalog(self, data_catalog_id: str) -> List:
-        """Return a list of dataset_id's that are in the data datalog."""
-        return [
-            str(dataset_obj)
-            for dataset_obj in self._data_catalog.objects(
-                URIRef(data_catalog_id), SDO.dataset
-            )
-            if self.is_valid_dataset(str(dataset_obj))
-        ]
+        """Return a list of dataset_id's that are in the data datalog (don't change it)."""
+        return self._datasets.get(str(data_catalog_id), [])
 
     def get_data_downloads_for_dataset(self, dataset_id: str) -> List:
-        """Return a list of data_downloads_id's that are in the dataset."""
-        return [
-            data_download_obj
-            for data_download_obj in self._data_catalog.objects(
-                URIRef(dataset_id), SDO.distribution
-            )
-            if self.is_valid_data_download(str(data_download_obj))
-        ]
+        """Return a list of data_downloads_id's that are in the dataset (don't change it)."""
+        return self._data_downloads.get(str(dataset_id), [])
 
     def get_publisher_for_data_catalog(
         self, data_catalog_id: URIRef
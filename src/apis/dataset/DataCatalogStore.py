@@ -0,0 +1,196 @@
+import logging
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional
+from rdflib import Graph
+from apis.dataset.DataCatalogLODHandler import DataCatalogLODHandler
+from config import cfg
+from util.concurrency_util import SingleFlight
+
+logger = logging.getLogger()
+
+
+class DataCatalogStore:
+    """Holds the DataCatalogLODHandler that is shared by all dataset, data catalog
+    and data download endpoints of a (gunicorn worker) process.
+    The data catalog is loaded once and then refreshed in a background thread,
+    so the requests don't have to wait for the catalog to be downloaded.
+    Every catalog loaded from the triple store is saved in a local snapshot file,
+    from which the next process loads it before asking the triple store.
+    """
+
+    def __init__(self, refresh_interval_sec: float = 0.0, snapshot_path: str = ""):
+        """:param refresh_interval_sec: seconds between two catalog refreshes,
+        0 means the catalog is loaded only once.
+        :param snapshot_path: optional, the N-Triples file with the last catalog
+        loaded from the triple store."""
+        self._refresh_interval_sec = refresh_interval_sec
+        self._snapshot_path = snapshot_path
+        self._handler: Optional[DataCatalogLODHandler] = None
+        self._version = 0
+        self._loaded_at: Optional[float] = None
+        self._load_lock = threading.Lock()
+        self._refreshes = SingleFlight()
+        self._stop_event = threading.Event()
+        self._refresh_thread: Optional[threading.Thread] = None
+
+    @property
+    def version(self) -> int:
+        """Incremented every time a new snapshot of the catalog is swapped in."""
+        return self._version
+
+    @property
+    def loaded_at(self) -> Optional[float]:
+        """Timestamp (seconds since epoch) of the current snapshot of the catalog."""
+        return self._loaded_at
+
+    def start(self):
+        """Starts the background thread that loads the catalog immediately and
+        then refreshes it every refresh_interval_sec seconds."""
+        if self._refresh_thread is not None and self._refresh_thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._refresh_thread = threading.Thread(
+            target=self._run, name="data-catalog-refresh", daemon=True
+        )
+        self._refresh_thread.start()
+
+    def stop(self):
+        """Stops the background refresh thread."""
+        self._stop_event.set()
+
+    def _run(self):
+        # the snapshot is served while the catalog is loaded from the triple store
+        if self._handler is None:
+            with self._load_lock:
+                if self._handler is None:
+                    self._load_snapshot()
+        self.refresh()
+        while self._refresh_interval_sec > 0 and not self._stop_event.wait(
+            self._refresh_interval_sec
+        ):
+            self.refresh()
+
+    def refresh(self) -> bool:
+        """Loads the data catalog from the triple store and swaps it in.
+        The current catalog is kept when loading fails.
+        :returns: True if a new snapshot of the catalog was swapped in.
+        """
+        # concurrent refreshes share one load of the catalog
+        return self._refreshes.do("refresh", self._locked_load)
+
+    def _locked_load(self) -> bool:
+        with self._load_lock:
+            return self._load()
+
+    def _load(self) -> bool:
+        try:
+            handler = DataCatalogLODHandler()
+        except Exception:
+            logger.exception("Loading the data catalog failed.")
+            return False
+
+        if handler.size() == 0 and self._handler is not None:
+            logger.error("Loaded data catalog is empty, keeping the current one.")
+            return False
+
+        # the snapshot is only modified if the triples changed, the digest is computed
+        # here (in the background) instead of by the first request
+        if self._handler is not None and handler.digest() == self._handler.digest():
+            handler.modified_at = self._handler.modified_at
+        else:
+            handler.modified_at = datetime.now(timezone.utc).replace(microsecond=0)
+            self._save_snapshot(handler)
+        self._swap(handler)
+        return True
+
+    def _load_snapshot(self) -> bool:
+        """Loads the data catalog from the snapshot file, if there is one.
+        :returns: True if the catalog of the snapshot file was swapped in.
+        """
+        if not self._snapshot_path or not os.path.exists(self._snapshot_path):
+            return False
+        try:
+            data_catalog = Graph().parse(self._snapshot_path, format="nt")
+            modified_at = os.path.getmtime(self._snapshot_path)
+        except Exception:
+            logger.exception(f"Loading the snapshot {self._snapshot_path} failed.")
+            return False
+        if len(data_catalog) == 0:
+            logger.error(f"The snapshot {self._snapshot_path} is empty.")
+            return False
+
+        handler = DataCatalogLODHandler(data_catalog)
+        # the snapshot file is written when the triples changed
+        handler.modified_at = datetime.fromtimestamp(int(modified_at), timezone.utc)
+        logger.info(f"Data catalog loaded from the snapshot {self._snapshot_path}.")
+        self._swap(handler)
+        return True
+
+    def _save_snapshot(self, handler: DataCatalogLODHandler):
+        """Writes the data catalog to the snapshot file, as sorted N-Triples (which
+        are parsed a lot faster than RDF/XML). The file is written next to the
+        snapshot file and then swapped in, so it is never read half written. Each
+        process writes its own temporary file, as the workers save the catalog at
+        about the same time."""
+        if not self._snapshot_path:
+            return
+        tmp_path = None
+        try:
+            snapshot_dir = os.path.dirname(os.path.abspath(self._snapshot_path))
+            os.makedirs(snapshot_dir, exist_ok=True)
+            with tempfile.NamedTemporaryFile(
+                dir=snapshot_dir,
+                prefix=f"{os.path.basename(self._snapshot_path)}.",
+                suffix=".tmp",
+                delete=False,
+            ) as f:
+                tmp_path = f.name
+                f.writelines(sorted(handler.to_ntriples().splitlines(True)))
+            os.replace(tmp_path, self._snapshot_path)
+        except Exception:
+            # the catalog is served anyway, only the next start is slower
+            logger.exception(f"Saving the snapshot {self._snapshot_path} failed.")
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _swap(self, handler: DataCatalogLODHandler):
+        # serialize the documents before the requests use the snapshot
+        # (only the documents that changed since the current snapshot)
+        handler.materialize(self._handler)
+
+        # swapping the reference is atomic, requests keep using the handler they got
+        self._handler = handler
+        self._version += 1
+        self._loaded_at = time.time()
+        logger.info(
+            f"Data catalog version {self._version} loaded "
+            f"({handler.size()} triples)."
+        )
+
+    def get_handler(self) -> Optional[DataCatalogLODHandler]:
+        """Returns the handler for the current snapshot of the data catalog.
+        If the catalog wasn't loaded yet, it is loaded first (or the current load
+        is awaited), from the snapshot file if there is one: then the catalog is
+        refreshed from the triple store in the background. Returns None if the data
+        catalog could not be loaded.
+        """
+        handler = self._handler
+        if handler is None:
+            with self._load_lock:
+                if self._handler is None:
+                    if self._load_snapshot():
+                        self.start()
+                    else:
+                        self._load()
+                handler = self._handler
+        return handler
+
+
+data_catalog_store = DataCatalogStore(
+    cfg.get("DATA_CATALOG_REFRESH_SEC", 0.0),
+    cfg.get("DATA_CATALOG_SNAPSHOT_PATH", ""),
+)
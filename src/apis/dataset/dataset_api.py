@@ -1,13 +1,18 @@
 import logging
-from flask import current_app, request
+from concurrent.futures import Future
+from functools import partial
+from typing import Callable, Iterator, Optional, Tuple
+from flask import Response, current_app, request
 from flask_restx import Namespace, Resource
-from rdflib import Graph
+from rdflib import Graph, URIRef
 from apis.dataset.DataCatalogLODHandler import DataCatalogLODHandler
+from apis.dataset.DataCatalogStore import data_catalog_store
 from util.mime_type_util import MimeType
 from models.DatasetApiUriLevel import DatasetApiUriLevel
 from util.APIUtil import APIUtil
 import util.ld_util
 import util.lodview_util
+import util.response_util
 
 logger = logging.getLogger()
 
@@ -52,53 +57,28 @@ class LODDatasetAPI(Resource):
         dataset_uri = util.ld_util.generate_lod_resource_uri(
             DatasetApiUriLevel.DATASET, number, current_app.config["BENG_DATA_DOMAIN"]
         )
+        # get the handler for the current snapshot of the data catalog
+        data_catalog = data_catalog_store.get_handler()
+        if data_catalog is None:
+            return APIUtil.toErrorResponse(
+                "internal_server_error", "The data catalog is not available."
+            )
+
         # check if resource exists
-        if self.is_dataset(dataset_uri) is False:
+        if data_catalog.is_dataset(dataset_uri) is False:
             logger.error(f"Dataset doesn't exist: {dataset_uri}.")
             return APIUtil.toErrorResponse("not_found")
 
         # check if dataset is valid
-        if self.is_valid_dataset(dataset_uri) is False:
+        if data_catalog.is_valid_dataset(dataset_uri) is False:
             logger.error(f"Dataset is not valid: {dataset_uri}.")
             return APIUtil.toErrorResponse("bad_request", "Invalid Dataset")
 
-        # determine mime_type
-        lod_server_supported_mime_types = [mt.value for mt in MimeType]
-        best_match = request.accept_mimetypes.best_match(
-            lod_server_supported_mime_types
-        )
-        mime_type = (
-            MimeType.JSON_LD
-        )  # we choose to set a default if the user has not specified
-        if best_match is not None:
-            mime_type = MimeType(best_match)
-
-        # get rdf
-        logger.info(f"Getting RDF for resource {dataset_uri} from triple store.")
-        rdf_graph = Graph()
-        ds_data = DataCatalogLODHandler().get_dataset(
-            dataset_uri, MimeType.TURTLE.value
+        return catalog_response(
+            data_catalog,
+            dataset_uri,
+            partial(data_catalog.get_dataset_triples, URIRef(dataset_uri)),
         )
-        rdf_graph.parse(data=ds_data, format=MimeType.TURTLE.value)
-        if not rdf_graph:
-            return APIUtil.toErrorResponse(
-                "internal_server_error",
-                f"No graph created. Check resource type and identifier for {dataset_uri}",
-            )
-        # generate and return response
-        if mime_type is MimeType.HTML:
-            return util.lodview_util.generate_html_page(
-                rdf_graph, dataset_uri, current_app.config.get("SPARQL_ENDPOINT", "")
-            )
-        else:
-            # another serialisation than HTML
-            return util.lodview_util.get_serialised_graph(rdf_graph, mime_type)
-
-    def is_dataset(self, dataset_uri: str) -> bool:
-        return DataCatalogLODHandler().is_dataset(dataset_uri)
-
-    def is_valid_dataset(self, dataset_uri: str) -> bool:
-        return DataCatalogLODHandler().is_valid_dataset(dataset_uri)
 
 
 @api.doc(
@@ -138,55 +118,28 @@ class LODDataCatalogAPI(Resource):
             current_app.config["BENG_DATA_DOMAIN"],
         )
 
+        # get the handler for the current snapshot of the data catalog
+        data_catalog = data_catalog_store.get_handler()
+        if data_catalog is None:
+            return APIUtil.toErrorResponse(
+                "internal_server_error", "The data catalog is not available."
+            )
+
         # check if resource exists
-        if self.is_data_catalog(data_catalog_uri) is False:
+        if data_catalog.is_data_catalog(data_catalog_uri) is False:
             logger.error(f"The data catalog doesn't exist: {data_catalog_uri}.")
             return APIUtil.toErrorResponse("not_found")
 
         # check if data catalog is valid
-        if self.is_valid_data_catalog(data_catalog_uri) is False:
+        if data_catalog.is_valid_data_catalog(data_catalog_uri) is False:
             logger.error(f"The data catalog is invalid: {data_catalog_uri}.")
             return APIUtil.toErrorResponse("bad_request", "Invalid DataCatalog")
 
-        # get the mime_type
-        lod_server_supported_mime_types = [mt.value for mt in MimeType]
-        best_match = request.accept_mimetypes.best_match(
-            lod_server_supported_mime_types
-        )
-        mime_type = (
-            MimeType.JSON_LD
-        )  # we choose to set a default if the user has not specified
-        if best_match is not None:
-            mime_type = MimeType(best_match)
-
-        # get rdf
-        logger.info(f"Getting RDF for resource {data_catalog_uri} from triple store.")
-        rdf_graph = Graph()
-        dc_data = DataCatalogLODHandler().get_data_catalog(
-            data_catalog_uri, MimeType.TURTLE.value
+        return catalog_response(
+            data_catalog,
+            data_catalog_uri,
+            partial(data_catalog.get_data_catalog_graph, data_catalog_uri),
         )
-        rdf_graph.parse(data=dc_data, format=MimeType.TURTLE.value)
-        if not rdf_graph:
-            return APIUtil.toErrorResponse(
-                "internal_server_error",
-                f"No graph created. Check resource type and identifier for {data_catalog_uri}",
-            )
-        # generate and return response
-        if mime_type is MimeType.HTML:
-            return util.lodview_util.generate_html_page(
-                rdf_graph,
-                data_catalog_uri,
-                current_app.config.get("SPARQL_ENDPOINT", ""),
-            )
-        else:
-            # another serialisation than HTML
-            return util.lodview_util.get_serialised_graph(rdf_graph, mime_type)
-
-    def is_data_catalog(self, data_catalog_uri: str) -> bool:
-        return DataCatalogLODHandler().is_data_catalog(data_catalog_uri)
-
-    def is_valid_data_catalog(self, data_catalog_uri: str) -> bool:
-        return DataCatalogLODHandler().is_valid_data_catalog(data_catalog_uri)
 
 
 @api.doc(
@@ -226,53 +179,310 @@ class LODDataDownloadAPI(Resource):
             current_app.config["BENG_DATA_DOMAIN"],
         )
 
+        # get the handler for the current snapshot of the data catalog
+        data_catalog = data_catalog_store.get_handler()
+        if data_catalog is None:
+            return APIUtil.toErrorResponse(
+                "internal_server_error", "The data catalog is not available."
+            )
+
         # check if resource exists
-        if self.is_data_download(data_download_uri) is False:
+        if data_catalog.is_data_download(data_download_uri) is False:
             logger.error(f"Data download does not exist: {data_download_uri}")
             return APIUtil.toErrorResponse("not_found")
 
         # check if data download is valid
-        if not self.is_valid_data_download(data_download_uri):
+        if not data_catalog.is_valid_data_download(data_download_uri):
             logger.error(f"Invalid data download: {data_download_uri}")
             return APIUtil.toErrorResponse("bad_request", "Invalid DataDownload")
 
-        # get the requested mime_type
-        lod_server_supported_mime_types = [mt.value for mt in MimeType]
-        best_match = request.accept_mimetypes.best_match(
-            lod_server_supported_mime_types
+        return catalog_response(
+            data_catalog,
+            data_download_uri,
+            partial(data_catalog.get_data_download_triples, URIRef(data_download_uri)),
         )
-        mime_type = (
-            MimeType.JSON_LD
-        )  # we choose to set a default if the user has not specified
-        if best_match is not None:
-            mime_type = MimeType(best_match)
-
-        # get rdf
-        logger.info(f"Getting RDF for resource {data_download_uri} from triple store.")
-        rdf_graph = Graph()
-        dd_data = DataCatalogLODHandler().get_data_download(
-            data_download_uri, MimeType.TURTLE.value
+
+
+@api.doc(
+    responses={
+        200: "Success",
+        400: "Bad request.",
+        404: "Resource or page does not exist.",
+        406: "Not Acceptable. The requested format in the Accept header is not supported by the server.",
+    }
+)
+@api.route("id/datacatalog/<number>/datasets", endpoint="data_catalog_datasets")
+@api.doc(
+    params={
+        "number": {
+            "description": "Enter a zero padded 4 digit integer value.",
+            "in": "number",
+        },
+        "page": {"description": "The page, from 1.", "in": "query", "type": "int"},
+        "page_size": {
+            "description": "The number of datasets per page.",
+            "in": "query",
+            "type": "int",
+        },
+    }
+)
+class LODDataCatalogDatasetsAPI(Resource):
+    """Serve the datasets of the data catalog in pages, with Hydra paging metadata."""
+
+    @api.produces([mt.value for mt in MimeType])
+    def get(self, number: str = ""):
+        """Get a page of the Datasets in the DataCatalog.
+        The page has the triples of the Datasets, not of their DataDownloads.
+        """
+        # check if number is an integer value
+        if not number.isdigit():
+            return APIUtil.toErrorResponse(
+                "bad_request", f"Invalid identifier supplied: {number}"
+            )
+        data_catalog_uri = util.ld_util.generate_lod_resource_uri(
+            DatasetApiUriLevel.DATACATALOG,
+            number,
+            current_app.config["BENG_DATA_DOMAIN"],
         )
-        rdf_graph.parse(data=dd_data, format=MimeType.TURTLE.value)
-        if not rdf_graph:
+
+        # get the handler for the current snapshot of the data catalog
+        data_catalog = data_catalog_store.get_handler()
+        if data_catalog is None:
             return APIUtil.toErrorResponse(
-                "internal_server_error",
-                f"No graph created. Check resource type and identifier for {data_download_uri}",
+                "internal_server_error", "The data catalog is not available."
             )
 
-        # generate and return response
-        if mime_type is MimeType.HTML:
-            return util.lodview_util.generate_html_page(
-                rdf_graph,
-                data_download_uri,
-                current_app.config.get("SPARQL_ENDPOINT", ""),
+        # check if the data catalog exists and is valid
+        if data_catalog.is_data_catalog(data_catalog_uri) is False:
+            logger.error(f"The data catalog doesn't exist: {data_catalog_uri}.")
+            return APIUtil.toErrorResponse("not_found")
+        if data_catalog.is_valid_data_catalog(data_catalog_uri) is False:
+            logger.error(f"The data catalog is invalid: {data_catalog_uri}.")
+            return APIUtil.toErrorResponse("bad_request", "Invalid DataCatalog")
+
+        return page_response(
+            data_catalog,
+            data_catalog_uri,
+            f"{data_catalog_uri}/datasets",
+            len(data_catalog.get_datasets_for_data_catalog(data_catalog_uri)),
+            partial(data_catalog.get_datasets_page, data_catalog_uri),
+        )
+
+
+@api.doc(
+    responses={
+        200: "Success",
+        400: "Bad request.",
+        404: "Resource or page does not exist.",
+        406: "Not Acceptable. The requested format in the Accept header is not supported by the server.",
+    }
+)
+@api.route("id/dataset/<number>/distributions", endpoint="dataset_distributions")
+@api.doc(
+    params={
+        "number": {
+            "description": "Enter a zero padded 4 digit integer value.",
+            "in": "number",
+        },
+        "page": {"description": "The page, from 1.", "in": "query", "type": "int"},
+        "page_size": {
+            "description": "The number of data downloads per page.",
+            "in": "query",
+            "type": "int",
+        },
+    }
+)
+class LODDatasetDistributionsAPI(Resource):
+    """Serve the data downloads of the dataset in pages, with Hydra paging metadata."""
+
+    @api.produces([mt.value for mt in MimeType])
+    def get(self, number: str = ""):
+        """Get a page of the DataDownloads in the Dataset."""
+        # check if number is an integer value
+        if not number.isdigit():
+            return APIUtil.toErrorResponse(
+                "bad_request", f"Invalid identifier supplied: {number}"
             )
-        else:
-            # another serialisation than HTML
-            return util.lodview_util.get_serialised_graph(rdf_graph, mime_type)
+        dataset_uri = util.ld_util.generate_lod_resource_uri(
+            DatasetApiUriLevel.DATASET, number, current_app.config["BENG_DATA_DOMAIN"]
+        )
 
-    def is_data_download(self, data_download_uri: str) -> bool:
-        return DataCatalogLODHandler().is_data_download(data_download_uri)
+        # get the handler for the current snapshot of the data catalog
+        data_catalog = data_catalog_store.get_handler()
+        if data_catalog is None:
+            return APIUtil.toErrorResponse(
+                "internal_server_error", "The data catalog is not available."
+            )
+
+        # check if the dataset exists and is valid
+        if data_catalog.is_dataset(dataset_uri) is False:
+            logger.error(f"Dataset doesn't exist: {dataset_uri}.")
+            return APIUtil.toErrorResponse("not_found")
+        if data_catalog.is_valid_dataset(dataset_uri) is False:
+            logger.error(f"Dataset is not valid: {dataset_uri}.")
+            return APIUtil.toErrorResponse("bad_request", "Invalid Dataset")
+
+        return page_response(
+            data_catalog,
+            dataset_uri,
+            f"{dataset_uri}/distributions",
+            len(data_catalog.get_data_downloads_for_dataset(dataset_uri)),
+            partial(data_catalog.get_data_downloads_page, dataset_uri),
+        )
+
+
+def get_mime_type() -> MimeType:
+    """Returns the mime type that the client prefers (Accept header), JSON-LD if it
+    has no preference."""
+    best_match = request.accept_mimetypes.best_match([mt.value for mt in MimeType])
+    return MimeType(best_match) if best_match is not None else MimeType.JSON_LD
+
+
+def catalog_response(
+    data_catalog: DataCatalogLODHandler,
+    resource_uri: str,
+    get_graph: Callable[[], Graph],
+):
+    """Returns the response for the data catalog, dataset or data download in the
+    requested mime type, for the snapshot of the data catalog: 304 Not Modified,
+    the cached response, the materialized document or else the rendered graph.
+    """
+    mime_type = get_mime_type()
+    if mime_type is MimeType.HTML:
+        # the HTML page also shows the inverse relations from the triple store,
+        # which are not part of the version of the resource. So it gets no
+        # validators, and it is cached for RESPONSE_CACHE_TTL_SEC.
+        cached_response = util.response_util.get_cached_response(
+            resource_uri, mime_type
+        )
+        if cached_response is not None:
+            return cached_response
+        return util.response_util.cache_response(
+            resource_uri, mime_type, render_graph(resource_uri, get_graph(), mime_type)
+        )
+
+    # the version and modification time of the resource, unchanged when other
+    # resources in the data catalog change
+    version = data_catalog.entity_digest(resource_uri)
+    modified_at = data_catalog.entity_modified_at(resource_uri)
+
+    # return 304 if the client has this representation. The ETag only depends on
+    # the version of the resource, so no RDF is needed to revalidate.
+    etag = util.response_util.version_etag(resource_uri, mime_type, version)
+    if util.response_util.is_not_modified(etag, modified_at):
+        return util.response_util.not_modified_response(etag, modified_at)
+
+    # return the response from the cache, if this representation was served
+    # before for this version of the resource
+    cached_response = util.response_util.get_cached_response(
+        resource_uri, mime_type, version, modified_at
+    )
+    if cached_response is not None:
+        return cached_response
+
+    # the document that was serialized when the snapshot was loaded
+    document = data_catalog.get_document(resource_uri, mime_type)
+    response = (
+        Response(document, mimetype=mime_type.value)
+        if document is not None
+        else render_graph(resource_uri, get_graph(), mime_type)
+    )
+    return util.response_util.cache_response(
+        resource_uri, mime_type, response, version, etag, modified_at
+    )
+
+
+def render_graph(
+    resource_uri: str,
+    rdf_graph: Graph,
+    mime_type: MimeType,
+    inverse_relations: Optional[Future] = None,
+):
+    logger.info(f"Getting RDF for resource {resource_uri} from the data catalog.")
+    if not rdf_graph:
+        return APIUtil.toErrorResponse(
+            "internal_server_error",
+            f"No graph created. Check resource type and identifier for {resource_uri}",
+        )
+    if mime_type is MimeType.HTML:
+        return util.lodview_util.generate_html_page(
+            rdf_graph,
+            resource_uri,
+            current_app.config.get("SPARQL_ENDPOINT", ""),
+            inverse_relations=inverse_relations,
+        )
+    # another serialisation than HTML
+    return util.lodview_util.get_serialised_graph(rdf_graph, mime_type)
+
+
+def get_paging() -> Tuple[int, int]:
+    """Returns the page (from 1) and the page size in the request.
+    raises a ValueError for an invalid page or page size."""
+    page = int(request.args.get("page", "1"))
+    page_size = int(
+        request.args.get("page_size", current_app.config.get("LISTING_PAGE_SIZE", 100))
+    )
+    max_page_size = current_app.config.get("LISTING_MAX_PAGE_SIZE", 1000)
+    if page < 1 or not 1 <= page_size <= max_page_size:
+        raise ValueError(
+            f"The page must be 1 or more, the page size between 1 and {max_page_size}."
+        )
+    return page, page_size
+
+
+def page_response(
+    data_catalog: DataCatalogLODHandler,
+    resource_uri: str,
+    collection_uri: str,
+    total_items: int,
+    get_page: Callable[[int, int], Iterator[Graph]],
+):
+    """Returns the response for a page of the datasets of a data catalog or of the
+    data downloads of a dataset, in the requested mime type. N-Triples are
+    streamed, a member at a time, the other formats are serialized per page.
+    """
+    try:
+        page, page_size = get_paging()
+    except ValueError as e:
+        return APIUtil.toErrorResponse("bad_request", str(e))
+    if page > 1 and (page - 1) * page_size >= total_items:
+        return APIUtil.toErrorResponse("not_found")
+    mime_type = get_mime_type()
+
+    # the page only changes when the graph of the data catalog or dataset changes
+    page_uri = f"{collection_uri}?page={page}&page_size={page_size}"
+    version = data_catalog.entity_digest(resource_uri)
+    modified_at = data_catalog.entity_modified_at(resource_uri)
+    etag = util.response_util.version_etag(page_uri, mime_type, version)
+    if util.response_util.is_not_modified(etag, modified_at):
+        return util.response_util.not_modified_response(etag, modified_at)
+
+    graphs = get_page(page, page_size)
+    if mime_type is MimeType.N_TRIPLES:
+        return util.response_util.streamed_response(
+            (g.serialize(format=mime_type.to_ld_format()) for g in graphs),
+            mime_type,
+            etag,
+            modified_at,
+        )
 
-    def is_valid_data_download(self, data_download_uri: str) -> bool:
-        return DataCatalogLODHandler().is_valid_data_download(data_download_uri)
+    cached_response = util.response_util.get_cached_response(
+        page_uri, mime_type, version, modified_at
+    )
+    if cached_response is not None:
+        return cached_response
+    page_graph = next(graphs)
+    for g in graphs:
+        page_graph += g
+    # the HTML page shows the collection with the members of the page. The
+    # collection is not in the triple store, so it has no inverse relations.
+    no_inverse_relations: Future = Future()
+    no_inverse_relations.set_result([])
+    return util.response_util.cache_response(
+        page_uri,
+        mime_type,
+        render_graph(collection_uri, page_graph, mime_type, no_inverse_relations),
+        version,
+        etag,
+        modified_at,
+    )
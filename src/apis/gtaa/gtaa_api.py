@@ -1,10 +1,12 @@
 import logging
+from functools import partial
 from flask import current_app, request
 from flask_restx import Namespace, Resource
 from util.mime_type_util import MimeType
 from util.APIUtil import APIUtil
 import util.ld_util
 import util.lodview_util
+import util.response_util
 
 logger = logging.getLogger()
 
@@ -46,12 +48,6 @@ class GTAAAPI(Resource):
 
         gtaa_uri = f'{current_app.config.get("BENG_DATA_DOMAIN")}gtaa/{identifier}'
 
-        # Do ASK request to triple store. Return 404 if resource doesn't exist.
-        if not util.ld_util.is_skos_resource(
-            gtaa_uri, current_app.config.get("SPARQL_ENDPOINT", "")
-        ):
-            return APIUtil.toErrorResponse("not_found")
-
         lod_server_supported_mime_types = [mt.value for mt in MimeType]
         best_match = request.accept_mimetypes.best_match(
             lod_server_supported_mime_types
@@ -60,13 +56,48 @@ class GTAAAPI(Resource):
         if best_match is not None:
             mime_type = MimeType(best_match)
 
-        rdf_graph = util.ld_util.get_resource_from_rdf_store(
+        # return the response from the cache, if this representation was served
+        # before. A stale response is returned while the graph is refreshed.
+        cached_response = util.response_util.get_cached_response(
             gtaa_uri,
-            current_app.config.get("SPARQL_ENDPOINT", ""),
-            current_app.config.get("BENG_LOD_RESOURCE_QUERY", ""),
-            current_app.config.get("URI_NISV_ORGANISATION", ""),
+            mime_type,
+            refresh=partial(
+                util.ld_util.refresh_resource_graph,
+                gtaa_uri,
+                current_app.config.get("SPARQL_ENDPOINT", ""),
+                current_app.config.get("BENG_LOD_RESOURCE_QUERY", ""),
+                current_app.config.get("URI_NISV_ORGANISATION", ""),
+            ),
         )
+        if cached_response is not None:
+            return cached_response
+
+        # for HTML, start getting the inverse relations while getting the resource.
+        inverse_relations = (
+            util.lodview_util.submit_inverse_relations_for_resource(
+                gtaa_uri, current_app.config.get("SPARQL_ENDPOINT", "")
+            )
+            if mime_type is MimeType.HTML
+            else None
+        )
+
+        # get the graph and check if it is a SKOS resource, in one request to the
+        # triple store. Return 404 if resource doesn't exist.
+        is_resource, rdf_graph = (
+            util.ld_util.get_resource_with_type_check_from_rdf_store(
+                gtaa_uri,
+                current_app.config.get("SPARQL_ENDPOINT", ""),
+                current_app.config.get("BENG_LOD_RESOURCE_QUERY", ""),
+                current_app.config.get("URI_NISV_ORGANISATION", ""),
+                util.ld_util.SKOS_RESOURCE_TYPES,
+            )
+        )
+        if not is_resource:
+            util.response_util.cancel_pending(inverse_relations)
+            return APIUtil.toErrorResponse("not_found")
+
         if not rdf_graph:
+            util.response_util.cancel_pending(inverse_relations)
             logger.error(f"Could not generate LOD for resource {gtaa_uri}.")
             return APIUtil.toErrorResponse(
                 "internal_server_error",
@@ -74,9 +105,23 @@ class GTAAAPI(Resource):
             )
 
         if mime_type is MimeType.HTML:
-            return util.lodview_util.generate_html_page(
-                rdf_graph, gtaa_uri, current_app.config.get("SPARQL_ENDPOINT", "")
+            render = partial(
+                util.lodview_util.generate_html_page,
+                rdf_graph,
+                gtaa_uri,
+                current_app.config.get("SPARQL_ENDPOINT", ""),
+                inverse_relations=inverse_relations,
             )
         else:
             # another serialisation than HTML
-            return util.lodview_util.get_serialised_graph(rdf_graph, mime_type)
+            render = partial(
+                util.lodview_util.get_serialised_graph, rdf_graph, mime_type
+            )
+        # return 304 if the client has this representation, without rendering it
+        return util.response_util.conditional_response(
+            gtaa_uri,
+            mime_type,
+            util.response_util.graph_etag(rdf_graph, mime_type),
+            render,
+            pending=inverse_relations,
+        )
@@ -5,6 +5,7 @@ from flask import current_app
 from flask_restx import Namespace, Resource
 
 from apis.health.DependencyHealth import Dependency, DependencyHealth
+from util.http_util import get_replica_stats
 
 api = Namespace(
     "Health",
@@ -43,5 +44,27 @@ class Health(Resource):
             for dependency, health in dependency_health
         }
 
+        # the state of the circuit breakers of the SPARQL endpoints (replicas) in
+        # this worker
+        for config_key in ("SPARQL_ENDPOINT", "MUZIEKWEB_SPARQL_ENDPOINT"):
+            sparql_endpoint = current_app.config.get(config_key, "")
+            if sparql_endpoint:
+                health.setdefault(config_key, {"url": sparql_endpoint})["replicas"] = (
+                    get_replica_stats(sparql_endpoint)
+                )
+
         health_status = 200 if dependencies_ok else 500
         return health, health_status
+
+
+@api.hide
+@api.route("health/cache")
+class CacheStats(Resource):
+    def get(self):
+        """Returns the hit/miss counters of the caches, counted by this worker, and
+        their entries and size: of this worker for the in-process caches, of all
+        workers on the host for the caches in the shared SQLite file."""
+        return {
+            name: cache.stats()
+            for name, cache in current_app.config["GLOBAL_CACHE"].items()
+        }, 200
@@ -1,4 +1,5 @@
 import logging
+from functools import partial
 from flask import current_app, request, Response
 from flask_restx import Namespace, Resource
 import util.ld_util
@@ -6,6 +7,7 @@ from models.ResourceApiUriLevel import ResourceApiUriLevel
 from util.APIUtil import APIUtil
 from util.mime_type_util import MimeType
 import util.lodview_util
+import util.response_util
 
 logger = logging.getLogger()
 
@@ -75,23 +77,51 @@ class ResourceAPI(Resource):
                 "bad_request", "Invalid DAAN identifier supplied."
             )
 
-        # check if resource exists and return 404 if it doesn't.
-        if not util.ld_util.is_nisv_cat_resource(
-            lod_url, current_app.config.get("SPARQL_ENDPOINT", "")
-        ):
-            return APIUtil.toErrorResponse("not_found")
+        # return the response from the cache, if this representation was served
+        # before. A stale response is returned while the graph is refreshed.
+        cached_response = util.response_util.get_cached_response(
+            lod_url,
+            mime_type,
+            refresh=partial(
+                util.ld_util.refresh_resource_graph,
+                lod_url,
+                current_app.config.get("SPARQL_ENDPOINT", ""),
+                current_app.config.get("BENG_LOD_RESOURCE_QUERY", ""),
+                current_app.config.get("URI_NISV_ORGANISATION", ""),
+            ),
+        )
+        if cached_response is not None:
+            return cached_response
 
-        # getting and returning lod data
+        # for HTML, start getting the inverse relations while getting the resource.
+        inverse_relations = (
+            util.lodview_util.submit_inverse_relations_for_resource(
+                lod_url, current_app.config.get("SPARQL_ENDPOINT", "")
+            )
+            if mime_type is MimeType.HTML
+            else None
+        )
+
+        # getting the lod data and checking if the resource exists, in one query.
         logger.info(f"Getting the graph from the triple store for resource {lod_url}.")
-        rdf_graph = util.ld_util.get_resource_from_rdf_store(
-            lod_url,
-            current_app.config.get("SPARQL_ENDPOINT", ""),
-            current_app.config.get("BENG_LOD_RESOURCE_QUERY", ""),
-            current_app.config.get("URI_NISV_ORGANISATION", ""),
+        is_resource, rdf_graph = (
+            util.ld_util.get_resource_with_type_check_from_rdf_store(
+                lod_url,
+                current_app.config.get("SPARQL_ENDPOINT", ""),
+                current_app.config.get("BENG_LOD_RESOURCE_QUERY", ""),
+                current_app.config.get("URI_NISV_ORGANISATION", ""),
+                util.ld_util.NISV_CAT_RESOURCE_TYPES,
+            )
         )
 
+        # return 404 if the resource doesn't exist.
+        if not is_resource:
+            util.response_util.cancel_pending(inverse_relations)
+            return APIUtil.toErrorResponse("not_found")
+
         # check if graph contains data and return 500 if not.
         if not rdf_graph:
+            util.response_util.cancel_pending(inverse_relations)
             return APIUtil.toErrorResponse(
                 "internal_server_error",
                 "No graph created. Check your resource type and identifier",
@@ -99,12 +129,26 @@ class ResourceAPI(Resource):
 
         # check if mime_type is HTML and generate HTML page and 200 if so.
         if mime_type is MimeType.HTML:
-            return util.lodview_util.generate_html_page(
-                rdf_graph, lod_url, current_app.config.get("SPARQL_ENDPOINT", "")
+            render = partial(
+                util.lodview_util.generate_html_page,
+                rdf_graph,
+                lod_url,
+                current_app.config.get("SPARQL_ENDPOINT", ""),
+                inverse_relations=inverse_relations,
             )
         else:
             # return other formats than HTML. Returns data and 200 status.
-            return util.lodview_util.get_serialised_graph(rdf_graph, mime_type)
+            render = partial(
+                util.lodview_util.get_serialised_graph, rdf_graph, mime_type
+            )
+        # return 304 if the client has this representation, without rendering it
+        return util.response_util.conditional_response(
+            lod_url,
+            mime_type,
+            util.response_util.graph_etag(rdf_graph, mime_type),
+            render,
+            pending=inverse_relations,
+        )
 
     def check_for_wemi_postfix(self, identifier: str) -> tuple[int, str]:
         """Try to split the identifier and detect the wemi entity postfix.
@@ -3,7 +3,11 @@ import logging
 from flask import Flask, render_template
 from flask_cors import CORS
 from apis import api
+from apis.dataset.DataCatalogStore import data_catalog_store
 from util.base_util import LOG_FORMAT
+from util.cache_util import caches
+from util.existence_filter_util import get_existence_filter
+from util.query_util import load_queries
 from config import cfg
 
 app = Flask(__name__)
@@ -14,7 +18,7 @@ app.config.update(
 )  # note: works als long as no existing nested config dict needs to be updated
 app.config["CORS_HEADERS"] = "Content-Type"
 app.config["RESTPLUS_VALIDATE"] = False
-app.config["GLOBAL_CACHE"] = {}  # just put the cache in here
+app.config["GLOBAL_CACHE"] = caches  # the caches (in-process or shared), by name
 
 # initialises the root logger
 logging.basicConfig(
@@ -42,6 +46,17 @@ if "link" in cfg["ENABLED_ENDPOINTS"]:
         )
 
 
+if "dataset" in cfg["ENABLED_ENDPOINTS"]:
+    if cfg.get("DATA_CATALOG_LOAD_AT_STARTUP", True):
+        # load the data catalog (and keep it fresh) in the background of each worker
+        data_catalog_store.start()
+
+# read (and check) the query files once, instead of for every request
+load_queries(cfg)
+
+# memory-map the existence filter (if configured), before the first request needs it
+get_existence_filter()
+
 api.init_app(
     app,
     title="Open Data API - Netherlands Institute for Sound and Vision",
@@ -1,9 +1,20 @@
 import json
 import os
 import pytest
+import tempfile
 from rdflib import Graph
 from config import cfg
 
+# the tests don't share a cache database with a running server
+cfg["SHARED_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(), "cache.sqlite3")
+cfg["EXISTENCE_FILTER_PATH"] = ""
+# the batch endpoint is disabled by default
+if "batch" not in cfg["ENABLED_ENDPOINTS"]:
+    cfg["ENABLED_ENDPOINTS"] = cfg["ENABLED_ENDPOINTS"] + ["batch"]
+from util.cache_util import caches  # noqa: E402
+from util.circuit_breaker_util import reset_circuit_breakers  # noqa: E402
+from util.concurrency_util import shutdown_executors  # noqa: E402
+
 """
 Basic fixtures that are useful for most of the test modules
 """
@@ -75,6 +86,17 @@ def open_file():
     return return_contents_of_file
 
 
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Every test starts with empty caches (and closed circuits), and no SPARQL
+    requests of a test are left in flight in the background."""
+    for cache in caches.values():
+        cache.clear()
+    reset_circuit_breakers()
+    yield
+    shutdown_executors()
+
+
 """------------------------ APPLICATION SETTINGS (VALID) ----------------------"""
 
 
@@ -90,11 +112,11 @@ def application_settings(flask_test_client):
 @pytest.fixture(scope="session")
 def flask_test_client():
     """Returns a basic Flask test client."""
+    cfg["DATA_CATALOG_LOAD_AT_STARTUP"] = False  # don't load the catalog in tests
     from server import app
 
     app.config.update(cfg)  # merge config with app config
     app.config["TESTING"] = True
-    app.config["GLOBAL_CACHE"] = {}
     app.config["SERVER_NAME"] = "localhost:5000"
 
     return app.test_client()
@@ -0,0 +1,160 @@
+import io
+import json
+import pytest
+from mockito import when, unstub, verify
+from rdflib import Dataset, Graph, Literal, URIRef
+from rdflib.compare import to_isomorphic
+from rdflib.namespace import RDF, SDO, SKOS  # type: ignore
+from requests.exceptions import ConnectionError, HTTPError, Timeout
+from apis.batch.batch_api import BatchMimeType
+import util.ld_util
+
+PROGRAM_URI = "http://data.beeldengeluid.nl/id/program/1234"
+GTAA_URI = "http://data.beeldengeluid.nl/gtaa/5678"
+
+
+@pytest.fixture()
+def batch_graphs():
+    program_graph = Graph()
+    program_graph.add((URIRef(PROGRAM_URI), RDF.type, SDO.CreativeWork))
+    program_graph.add((URIRef(PROGRAM_URI), SDO.name, Literal("Journaal")))
+    gtaa_graph = Graph()
+    gtaa_graph.add((URIRef(GTAA_URI), RDF.type, SKOS.Concept))
+    return [(PROGRAM_URI, program_graph), (GTAA_URI, gtaa_graph)]
+
+
+def _stub_get_resources(flask_test_client, batch_graphs):
+    config = flask_test_client.application.config
+    when(util.ld_util).get_resources_from_rdf_store(
+        [
+            (PROGRAM_URI, util.ld_util.NISV_CAT_RESOURCE_TYPES),
+            (GTAA_URI, util.ld_util.SKOS_RESOURCE_TYPES),
+        ],
+        config.get("SPARQL_ENDPOINT", ""),
+        config.get("BENG_LOD_RESOURCE_QUERY", ""),
+        config.get("URI_NISV_ORGANISATION", ""),
+        config.get("BATCH_QUERY_SIZE", 100),
+    ).thenReturn(iter(batch_graphs))
+
+
+def test_post_n_triples(flask_test_client, batch_graphs):
+    """Given identifiers as newline-delimited text (duplicates and full URIs
+    included), the graphs are merged in one N-Triples body."""
+    try:
+        _stub_get_resources(flask_test_client, batch_graphs)
+        resp = flask_test_client.post(
+            "/batch",
+            data=f"program/1234\n\ngtaa/5678\n{PROGRAM_URI}\n",
+            headers={"Content-Type": "text/plain"},
+        )
+        assert resp.status_code == 200
+        assert resp.content_type == BatchMimeType.N_TRIPLES.value
+        merged_graph = batch_graphs[0][1] + batch_graphs[1][1]
+        assert to_isomorphic(
+            Graph().parse(data=resp.text, format="nt11")
+        ) == to_isomorphic(merged_graph)
+        verify(util.ld_util, times=1).get_resources_from_rdf_store(...)
+    finally:
+        unstub()
+
+
+def test_post_n_quads_file(flask_test_client, batch_graphs):
+    """Given identifiers in a file, every resource is in its own named graph."""
+    try:
+        _stub_get_resources(flask_test_client, batch_graphs)
+        resp = flask_test_client.post(
+            "/batch",
+            data={"file": (io.BytesIO(b"program/1234\ngtaa/5678\n"), "ids.txt")},
+            headers={"Accept": BatchMimeType.N_QUADS.value},
+        )
+        assert resp.status_code == 200
+        assert resp.content_type == BatchMimeType.N_QUADS.value
+        dataset = Dataset()
+        dataset.parse(data=resp.text, format="nquads")
+        for resource_url, rdf_graph in batch_graphs:
+            assert len(dataset.graph(URIRef(resource_url))) == len(rdf_graph)
+    finally:
+        unstub()
+
+
+def test_post_json_ld_lines(flask_test_client, batch_graphs):
+    """Given identifiers as JSON, there is a JSON-LD document per resource per line."""
+    try:
+        _stub_get_resources(flask_test_client, batch_graphs)
+        resp = flask_test_client.post(
+            "/batch",
+            json=["program/1234", "gtaa/5678"],
+            headers={"Accept": BatchMimeType.JSON_LD_LINES.value},
+        )
+        assert resp.status_code == 200
+        lines = resp.text.splitlines()
+        assert len(lines) == len(batch_graphs)
+        for line, (_, rdf_graph) in zip(lines, batch_graphs):
+            json.loads(line)
+            assert len(Graph().parse(data=line, format="json-ld")) == len(rdf_graph)
+    finally:
+        unstub()
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        "",
+        "program/abc",
+        "dataset/1234",
+        "gtaa/12 34",
+        "\n".join(f"program/{i}" for i in range(10001)),
+    ],
+)
+def test_post_400(flask_test_client, data):
+    resp = flask_test_client.post(
+        "/batch", data=data, headers={"Content-Type": "text/plain"}
+    )
+    assert resp.status_code == 400
+
+
+@pytest.mark.parametrize(
+    "error, status_code", [(ConnectionError, 502), (HTTPError, 502), (Timeout, 504)]
+)
+def test_post_triple_store_error(error, status_code, flask_test_client):
+    """Given a triple store that fails for the first batch, the client gets an
+    error status, not a 200 with an empty body."""
+
+    def failing_graphs():
+        raise error()
+        yield  # a generator, like get_resources_from_rdf_store
+
+    try:
+        when(util.ld_util).get_resources_from_rdf_store(...).thenReturn(
+            failing_graphs()
+        )
+        resp = flask_test_client.post(
+            "/batch", data="program/1234", headers={"Content-Type": "text/plain"}
+        )
+        assert resp.status_code == status_code
+    finally:
+        unstub()
+
+
+def test_post_triple_store_error_streaming(flask_test_client, batch_graphs):
+    """Given a triple store that fails for a later batch, the response is aborted."""
+
+    def failing_graphs():
+        yield batch_graphs[0]
+        raise ConnectionError()
+
+    try:
+        when(util.ld_util).get_resources_from_rdf_store(...).thenReturn(
+            failing_graphs()
+        )
+        resp = flask_test_client.post(
+            "/batch",
+            data="program/1234\ngtaa/5678",
+            headers={"Content-Type": "text/plain"},
+            buffered=False,
+        )
+        assert resp.status_code == 200
+        with pytest.raises(ConnectionError):
+            resp.get_data()
+    finally:
+        unstub()
@@ -1,7 +1,9 @@
 import pytest
+from datetime import datetime, timezone
 from mockito import when
-from rdflib import Graph
+from rdflib import Graph, Literal, URIRef
 from rdflib.compare import to_isomorphic, graph_diff
+from rdflib.namespace import RDF, SDO  # type: ignore
 from rdflib.plugin import PluginException
 from util.ld_util import generate_lod_resource_uri
 from util.mime_type_util import MimeType
@@ -190,3 +192,141 @@ def test_get_dataset(
 
     except PluginException:
         assert mime_type == "application/phony_mime_type"
+
+
+def test_digest(i_datacatalog):
+    """The same triples give the same digest, other triples another digest."""
+    handler = apis.dataset.DataCatalogLODHandler.DataCatalogLODHandler(i_datacatalog)
+    same_catalog = Graph()
+    same_catalog += i_datacatalog
+    other_catalog = Graph()
+    other_catalog += i_datacatalog
+    other_catalog.remove((None, None, next(iter(i_datacatalog.objects()))))
+
+    digest = handler.digest()
+    assert isinstance(digest, str)
+    assert digest == (
+        apis.dataset.DataCatalogLODHandler.DataCatalogLODHandler(same_catalog).digest()
+    )
+    assert digest != (
+        apis.dataset.DataCatalogLODHandler.DataCatalogLODHandler(other_catalog).digest()
+    )
+
+
+def test_validity_index(i_datacatalog):
+    """The precomputed validity is the same as checking the requirements."""
+    handler = apis.dataset.DataCatalogLODHandler.DataCatalogLODHandler(i_datacatalog)
+    for dataset_uri in map(str, i_datacatalog.subjects(RDF.type, SDO.Dataset)):
+        assert handler.is_valid_dataset(dataset_uri) == (
+            handler.has_name(dataset_uri)
+            and handler.has_license(dataset_uri)
+            and handler.has_publisher(dataset_uri)
+            and handler.has_distribution(dataset_uri)
+        )
+    for data_download_uri in map(
+        str, i_datacatalog.subjects(RDF.type, SDO.DataDownload)
+    ):
+        assert handler.is_valid_data_download(data_download_uri) == (
+            handler.has_content_url(data_download_uri)
+            and handler.has_encoding_format(data_download_uri)
+            and handler.has_usage_info(data_download_uri)
+        )
+    assert handler.is_valid_data_catalog(DUMMY_DATA_CATALOG_URI)
+    assert handler.is_valid_dataset(DUMMY_DATASET_URI)
+    assert handler.is_valid_data_download(DUMMY_DATA_DOWNLOAD_URI)
+    assert not handler.is_valid_dataset(DUMMY_DATA_CATALOG_URI)
+    assert handler.get_datasets_for_data_catalog(DUMMY_DATASET_URI) == []
+
+
+def test_validity_index_invalid_dataset(i_datacatalog):
+    """A dataset without a license is not listed in its data catalog."""
+    data_catalog = Graph()
+    data_catalog += i_datacatalog
+    data_catalog.remove((URIRef(DUMMY_DATASET_URI), SDO.license, None))
+    handler = apis.dataset.DataCatalogLODHandler.DataCatalogLODHandler(data_catalog)
+    valid_handler = apis.dataset.DataCatalogLODHandler.DataCatalogLODHandler(
+        i_datacatalog
+    )
+
+    assert not handler.is_valid_dataset(DUMMY_DATASET_URI)
+    assert DUMMY_DATASET_URI in valid_handler.get_datasets_for_data_catalog(
+        DUMMY_DATA_CATALOG_URI
+    )
+    assert handler.get_datasets_for_data_catalog(DUMMY_DATA_CATALOG_URI) == [
+        dataset_uri
+        for dataset_uri in valid_handler.get_datasets_for_data_catalog(
+            DUMMY_DATA_CATALOG_URI
+        )
+        if dataset_uri != DUMMY_DATASET_URI
+    ]
+
+
+def test_materialize(i_datacatalog):
+    """The documents are serialized in every RDF mime type, the HTML pages are
+    rendered per request (they show inverse relations from the triple store)."""
+    handler = apis.dataset.DataCatalogLODHandler.DataCatalogLODHandler(i_datacatalog)
+    assert handler.get_document(DUMMY_DATASET_URI, MimeType.TURTLE) is None
+
+    handler.materialize()
+
+    dataset_graph = handler.get_dataset_triples(URIRef(DUMMY_DATASET_URI))
+    for mime_type in MimeType:
+        document = handler.get_document(DUMMY_DATASET_URI, mime_type)
+        if mime_type is MimeType.HTML:
+            assert document is None
+        else:
+            assert document is not None
+            g = Graph().parse(data=document, format=mime_type.to_ld_format())
+            assert to_isomorphic(g) == to_isomorphic(dataset_graph)
+    for uri in (DUMMY_DATA_CATALOG_URI, DUMMY_DATA_DOWNLOAD_URI):
+        assert handler.get_document(uri, MimeType.JSON_LD) is not None
+
+
+def test_materialize_incremental(i_datacatalog):
+    """Given a data catalog in which one data download changed, only the documents
+    of the data download, its dataset and its data catalog are serialized again."""
+    previous = apis.dataset.DataCatalogLODHandler.DataCatalogLODHandler(i_datacatalog)
+    previous.modified_at = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    previous.materialize()
+    # no HTML page is taken from the previous snapshot, it may be stale
+    for uri in previous._entity_digests:
+        previous._documents[(uri, MimeType.HTML)] = b"<html></html>"
+
+    data_catalog = Graph()
+    data_catalog += i_datacatalog
+    data_catalog.add(
+        (URIRef(DUMMY_DATA_DOWNLOAD_URI), SDO.description, Literal("changed"))
+    )
+    handler = apis.dataset.DataCatalogLODHandler.DataCatalogLODHandler(data_catalog)
+    handler.modified_at = datetime(2024, 2, 1, tzinfo=timezone.utc)
+    handler.materialize(previous=previous)
+
+    changed = {DUMMY_DATA_DOWNLOAD_URI, DUMMY_DATASET_URI, DUMMY_DATA_CATALOG_URI}
+    for uri in previous._entity_digests:
+        if uri in changed:
+            assert handler.entity_digest(uri) != previous.entity_digest(uri)
+            assert handler.entity_modified_at(uri) == handler.modified_at
+            assert handler.get_document(uri, MimeType.TURTLE) != (
+                previous.get_document(uri, MimeType.TURTLE)
+            )
+        else:
+            assert handler.entity_digest(uri) == previous.entity_digest(uri)
+            assert handler.entity_modified_at(uri) == previous.modified_at
+            # the same document, not serialized again
+            assert handler.get_document(uri, MimeType.TURTLE) is (
+                previous.get_document(uri, MimeType.TURTLE)
+            )
+        assert handler.get_document(uri, MimeType.HTML) is None
+
+
+def test_materialize_unchanged(i_datacatalog):
+    previous = apis.dataset.DataCatalogLODHandler.DataCatalogLODHandler(i_datacatalog)
+    previous.materialize()
+    handler = apis.dataset.DataCatalogLODHandler.DataCatalogLODHandler(i_datacatalog)
+    handler.materialize(previous=previous)
+    assert handler.get_document(DUMMY_DATASET_URI, MimeType.TURTLE) is (
+        previous.get_document(DUMMY_DATASET_URI, MimeType.TURTLE)
+    )
+    assert handler.entity_digest(DUMMY_DATASET_URI) == previous.entity_digest(
+        DUMMY_DATASET_URI
+    )
@@ -0,0 +1,160 @@
+import os
+import threading
+from mockito import when, verify, unstub
+from rdflib import Graph
+from rdflib.namespace import RDF, SDO  # type: ignore
+from requests.exceptions import ConnectionError
+from apis.dataset.DataCatalogLODHandler import DataCatalogLODHandler
+from apis.dataset.DataCatalogStore import DataCatalogStore
+from util.mime_type_util import MimeType
+
+
+def test_init():
+    data_catalog_store = DataCatalogStore()
+    assert isinstance(data_catalog_store, DataCatalogStore)
+    assert data_catalog_store.version == 0
+    assert data_catalog_store.loaded_at is None
+
+
+def test_get_handler_loads_once(application_settings, i_datacatalog):
+    """Given a store that is not loaded yet, the first call to get_handler loads
+    the data catalog, and all following calls share the same handler."""
+    try:
+        when(DataCatalogLODHandler)._get_data_catalog_from_store(
+            application_settings.get("SPARQL_ENDPOINT"),
+            application_settings.get("DATA_CATALOG_GRAPH"),
+        ).thenReturn(i_datacatalog)
+        data_catalog_store = DataCatalogStore()
+
+        handler = data_catalog_store.get_handler()
+        assert isinstance(handler, DataCatalogLODHandler)
+        assert data_catalog_store.get_handler() is handler
+        assert data_catalog_store.get_handler() is handler
+        assert data_catalog_store.version == 1
+        # the documents were serialized when the snapshot was loaded
+        assert any(
+            handler.get_document(str(dataset_uri), MimeType.TURTLE)
+            for dataset_uri in i_datacatalog.subjects(RDF.type, SDO.Dataset)
+        )
+
+        verify(DataCatalogLODHandler, times=1)._get_data_catalog_from_store(
+            application_settings.get("SPARQL_ENDPOINT"),
+            application_settings.get("DATA_CATALOG_GRAPH"),
+        )
+    finally:
+        unstub()
+
+
+def test_refresh_swaps_handler(application_settings, i_datacatalog):
+    try:
+        when(DataCatalogLODHandler)._get_data_catalog_from_store(
+            application_settings.get("SPARQL_ENDPOINT"),
+            application_settings.get("DATA_CATALOG_GRAPH"),
+        ).thenReturn(i_datacatalog)
+        data_catalog_store = DataCatalogStore()
+        first_handler = data_catalog_store.get_handler()
+
+        assert data_catalog_store.refresh() is True
+        assert data_catalog_store.get_handler() is not first_handler
+        assert data_catalog_store.version == 2
+        # the same triples, so the catalog wasn't modified
+        assert data_catalog_store.get_handler().modified_at is not None
+        assert data_catalog_store.get_handler().modified_at == first_handler.modified_at
+    finally:
+        unstub()
+
+
+def test_refresh_failure_keeps_handler(application_settings, i_datacatalog):
+    """Given a loaded store, a failing or empty reload keeps the current catalog."""
+    try:
+        when(DataCatalogLODHandler)._get_data_catalog_from_store(
+            application_settings.get("SPARQL_ENDPOINT"),
+            application_settings.get("DATA_CATALOG_GRAPH"),
+        ).thenReturn(i_datacatalog).thenRaise(ConnectionError).thenReturn(Graph())
+        data_catalog_store = DataCatalogStore()
+        handler = data_catalog_store.get_handler()
+
+        assert data_catalog_store.refresh() is False  # connection error
+        assert data_catalog_store.refresh() is False  # empty catalog
+        assert data_catalog_store.get_handler() is handler
+        assert data_catalog_store.version == 1
+    finally:
+        unstub()
+
+
+def test_get_handler_not_available(application_settings):
+    try:
+        when(DataCatalogLODHandler)._get_data_catalog_from_store(
+            application_settings.get("SPARQL_ENDPOINT"),
+            application_settings.get("DATA_CATALOG_GRAPH"),
+        ).thenRaise(ConnectionError)
+        data_catalog_store = DataCatalogStore()
+
+        assert data_catalog_store.get_handler() is None
+        assert data_catalog_store.version == 0
+    finally:
+        unstub()
+
+
+def test_snapshot(application_settings, i_datacatalog, tmp_path):
+    """Given a catalog loaded from the triple store, the next store loads it from
+    the snapshot file and refreshes it from the triple store in the background."""
+    snapshot_path = str(tmp_path / "datacatalog.nt")
+    try:
+        when(DataCatalogLODHandler)._get_data_catalog_from_store(
+            application_settings.get("SPARQL_ENDPOINT"),
+            application_settings.get("DATA_CATALOG_GRAPH"),
+        ).thenReturn(i_datacatalog)
+        handler = DataCatalogStore(snapshot_path=snapshot_path).get_handler()
+        assert handler is not None
+
+        data_catalog_store = DataCatalogStore(snapshot_path=snapshot_path)
+        when(data_catalog_store).start().thenReturn(None)
+        snapshot_handler = data_catalog_store.get_handler()
+
+        assert snapshot_handler is not None
+        assert snapshot_handler.digest() == handler.digest()
+        assert snapshot_handler.modified_at is not None
+        assert data_catalog_store.version == 1
+        verify(DataCatalogLODHandler, times=1)._get_data_catalog_from_store(...)
+        verify(data_catalog_store, times=1).start()
+    finally:
+        unstub()
+
+
+def test_snapshot_saved_concurrently(i_datacatalog, tmp_path):
+    """The processes that save the snapshot at the same time each write their own
+    temporary file, so the snapshot is always complete."""
+    snapshot_path = tmp_path / "datacatalog.nt"
+    handler = DataCatalogLODHandler(i_datacatalog)
+    stores = [DataCatalogStore(snapshot_path=str(snapshot_path)) for _ in range(4)]
+    threads = [
+        threading.Thread(target=store._save_snapshot, args=(handler,))
+        for store in stores
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(Graph().parse(snapshot_path, format="nt")) == len(i_datacatalog)
+    assert os.listdir(tmp_path) == ["datacatalog.nt"]
+
+
+def test_snapshot_invalid(application_settings, i_datacatalog, tmp_path):
+    """Given a snapshot file that can't be parsed, the catalog is loaded from the
+    triple store (and the snapshot file is written)."""
+    snapshot_path = tmp_path / "datacatalog.nt"
+    snapshot_path.write_text("not N-Triples")
+    try:
+        when(DataCatalogLODHandler)._get_data_catalog_from_store(
+            application_settings.get("SPARQL_ENDPOINT"),
+            application_settings.get("DATA_CATALOG_GRAPH"),
+        ).thenReturn(i_datacatalog)
+        data_catalog_store = DataCatalogStore(snapshot_path=str(snapshot_path))
+
+        assert data_catalog_store.get_handler() is not None
+        verify(DataCatalogLODHandler, times=1)._get_data_catalog_from_store(...)
+        assert len(Graph().parse(snapshot_path, format="nt")) == len(i_datacatalog)
+    finally:
+        unstub()
@@ -1,8 +1,10 @@
 import pytest
+from datetime import datetime, timezone
 from mockito import when, verify, unstub
 from rdflib import Graph
 import util.ld_util
 import apis.dataset.dataset_api
+from apis.dataset.DataCatalogLODHandler import DataCatalogLODHandler
 from models.DatasetApiUriLevel import DatasetApiUriLevel
 from util.mime_type_util import MimeType
 import util.lodview_util
@@ -411,3 +413,37 @@ def test_get_500(application_settings, generic_client, dataset_url, caplog):
 
     finally:
         unstub()
+
+
+def test_get_html_has_no_catalog_validators(flask_test_client, i_datacatalog):
+    """The HTML page of a dataset shows its inverse relations, which are not part
+    of the version of the dataset in the data catalog: the client gets no ETag or
+    Last-Modified for it, so it never gets a 304 for an outdated page."""
+    handler = DataCatalogLODHandler(i_datacatalog)
+    handler.modified_at = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    try:
+        when(apis.dataset.dataset_api.data_catalog_store).get_handler().thenReturn(
+            handler
+        )
+        when(util.lodview_util).json_inverse_relations_for_resource(...).thenReturn([])
+        resp = flask_test_client.get(
+            "/id/dataset/0001", headers={"Accept": MimeType.TURTLE.value}
+        )
+        assert resp.status_code == 200
+        assert resp.headers["ETag"]
+
+        for _ in range(2):  # rendered, then from the response cache
+            resp = flask_test_client.get(
+                "/id/dataset/0001",
+                headers={
+                    "Accept": MimeType.HTML.value,
+                    "If-None-Match": resp.headers.get("ETag", "*"),
+                    "If-Modified-Since": "Wed, 01 Jan 2025 00:00:00 GMT",
+                },
+            )
+            assert resp.status_code == 200
+            assert resp.mimetype == MimeType.HTML.value
+            assert "ETag" not in resp.headers
+            assert "Last-Modified" not in resp.headers
+    finally:
+        unstub()
@@ -0,0 +1,132 @@
+import pytest
+from mockito import when, unstub, verify
+from rdflib import Graph, Literal, URIRef
+from rdflib.namespace import RDF
+from apis.dataset.DataCatalogLODHandler import DataCatalogLODHandler, HYDRA
+import apis.dataset.dataset_api
+import util.lodview_util
+from util.mime_type_util import MimeType
+
+DUMMY_DATA_CATALOG_URI = "http://data.beeldengeluid.nl/id/datacatalog/0001"
+DUMMY_DATASET_URI = "http://data.beeldengeluid.nl/id/dataset/0001"
+
+
+@pytest.mark.parametrize(
+    "mime_type", [mime_type for mime_type in MimeType if mime_type is not MimeType.HTML]
+)
+def test_get_datasets_page(mime_type, flask_test_client, i_datacatalog):
+    handler = DataCatalogLODHandler(i_datacatalog)
+    datasets = handler.get_datasets_for_data_catalog(DUMMY_DATA_CATALOG_URI)
+    collection = URIRef(f"{DUMMY_DATA_CATALOG_URI}/datasets")
+    try:
+        when(apis.dataset.dataset_api.data_catalog_store).get_handler().thenReturn(
+            handler
+        )
+        resp = flask_test_client.get(
+            "/id/datacatalog/0001/datasets?page=2&page_size=2",
+            headers={"Accept": mime_type.value},
+        )
+
+        assert resp.status_code == 200
+        assert resp.mimetype == mime_type.value
+        assert resp.headers["ETag"]
+        g = Graph().parse(data=resp.data, format=mime_type.to_ld_format())
+        assert g.value(collection, HYDRA.totalItems) == Literal(len(datasets))
+        assert set(g.objects(collection, HYDRA.member)) == set(
+            map(URIRef, datasets[2:4])
+        )
+        view = URIRef(f"{collection}?page=2&page_size=2")
+        assert (collection, HYDRA.view, view) in g
+        assert g.value(view, HYDRA.previous) == URIRef(
+            f"{collection}?page=1&page_size=2"
+        )
+        assert g.value(view, HYDRA.next) == URIRef(f"{collection}?page=3&page_size=2")
+        # the triples of the datasets are included
+        for dataset_uri in datasets[2:4]:
+            assert (URIRef(dataset_uri), RDF.type, None) in g
+    finally:
+        unstub()
+
+
+def test_get_datasets_page_html(flask_test_client, i_datacatalog):
+    """The HTML page shows the collection with the datasets of the page, without
+    querying inverse relations for the collection."""
+    handler = DataCatalogLODHandler(i_datacatalog)
+    datasets = handler.get_datasets_for_data_catalog(DUMMY_DATA_CATALOG_URI)
+    try:
+        when(apis.dataset.dataset_api.data_catalog_store).get_handler().thenReturn(
+            handler
+        )
+        when(util.lodview_util).json_inverse_relations_for_resource(...).thenReturn([])
+        resp = flask_test_client.get(
+            "/id/datacatalog/0001/datasets?page=2&page_size=2",
+            headers={"Accept": MimeType.HTML.value},
+        )
+
+        assert resp.status_code == 200
+        assert resp.mimetype == MimeType.HTML.value
+        html = resp.get_data(as_text=True)
+        # the members of the collection are linked
+        for dataset_uri in datasets[2:4]:
+            assert f'href="{dataset_uri}"' in html
+        for dataset_uri in datasets[:2] + datasets[4:]:
+            assert dataset_uri not in html
+        verify(util.lodview_util, times=0).json_inverse_relations_for_resource(...)
+    finally:
+        unstub()
+
+
+def test_get_distributions_page(flask_test_client, i_datacatalog):
+    handler = DataCatalogLODHandler(i_datacatalog)
+    data_downloads = handler.get_data_downloads_for_dataset(DUMMY_DATASET_URI)
+    collection = URIRef(f"{DUMMY_DATASET_URI}/distributions")
+    try:
+        when(apis.dataset.dataset_api.data_catalog_store).get_handler().thenReturn(
+            handler
+        )
+        resp = flask_test_client.get(
+            "/id/dataset/0001/distributions",
+            headers={"Accept": MimeType.TURTLE.value},
+        )
+
+        assert resp.status_code == 200
+        g = Graph().parse(data=resp.data, format="turtle")
+        assert set(g.objects(collection, HYDRA.member)) == set(data_downloads)
+        view = URIRef(f"{collection}?page=1&page_size=100")
+        assert g.value(view, HYDRA.last) == view
+        assert g.value(view, HYDRA.next) is None
+
+        # the client has the page
+        resp = flask_test_client.get(
+            "/id/dataset/0001/distributions",
+            headers={
+                "Accept": MimeType.TURTLE.value,
+                "If-None-Match": resp.headers["ETag"],
+            },
+        )
+        assert resp.status_code == 304
+    finally:
+        unstub()
+
+
+@pytest.mark.parametrize(
+    "query, status_code",
+    [
+        ("page=0", 400),
+        ("page=a", 400),
+        ("page_size=0", 400),
+        ("page_size=1001", 400),
+        ("page=1000", 404),
+    ],
+)
+def test_get_datasets_page_invalid(
+    query, status_code, flask_test_client, i_datacatalog
+):
+    try:
+        when(apis.dataset.dataset_api.data_catalog_store).get_handler().thenReturn(
+            DataCatalogLODHandler(i_datacatalog)
+        )
+        resp = flask_test_client.get(f"/id/datacatalog/0001/datasets?{query}")
+        assert resp.status_code == status_code
+    finally:
+        unstub()
@@ -1,4 +1,5 @@
 import pytest
+from concurrent.futures import Future
 from mockito import when, unstub, verify
 from rdflib import Graph, URIRef
 from rdflib.namespace import RDF, SKOS  # type: ignore
@@ -29,23 +30,26 @@ def test_get_200(mime_type, flask_test_client):
     )
     DUMMY_GRAPH = Graph(bind_namespaces="core")
     DUMMY_GRAPH.add((URIRef(DUMMY_URL), RDF.type, SKOS.Concept))
+    DUMMY_INVERSE_RELATIONS: Future = Future()
 
     try:
-        when(util.ld_util).is_skos_resource(
-            DUMMY_URL, config.get("SPARQL_ENDPOINT", "")
-        ).thenReturn(True)
-        when(util.ld_util).get_resource_from_rdf_store(
+        when(util.ld_util).get_resource_with_type_check_from_rdf_store(
             DUMMY_URL,
             config.get("SPARQL_ENDPOINT"),
             config.get("BENG_LOD_RESOURCE_QUERY", ""),
             config.get("URI_NISV_ORGANISATION"),
-        ).thenReturn(DUMMY_GRAPH)
+            util.ld_util.SKOS_RESOURCE_TYPES,
+        ).thenReturn((True, DUMMY_GRAPH))
 
         if mime_type is MimeType.HTML:
+            when(util.lodview_util).submit_inverse_relations_for_resource(
+                DUMMY_URL, config.get("SPARQL_ENDPOINT")
+            ).thenReturn(DUMMY_INVERSE_RELATIONS)
             when(util.lodview_util).generate_html_page(
                 DUMMY_GRAPH,
                 DUMMY_URL,
                 config.get("SPARQL_ENDPOINT"),
+                inverse_relations=DUMMY_INVERSE_RELATIONS,
             ).thenReturn(DUMMY_PAGE)
         else:
             when(util.lodview_util).get_serialised_graph(
@@ -59,20 +63,22 @@ def test_get_200(mime_type, flask_test_client):
         )
         assert resp.status_code == 200
 
-        verify(util.ld_util, times=1).is_skos_resource(
-            DUMMY_URL, config.get("SPARQL_ENDPOINT", "")
-        )
-        verify(util.ld_util, times=1).get_resource_from_rdf_store(
+        verify(util.ld_util, times=1).get_resource_with_type_check_from_rdf_store(
             DUMMY_URL,
             config.get("SPARQL_ENDPOINT"),
             config.get("BENG_LOD_RESOURCE_QUERY", ""),
             config.get("URI_NISV_ORGANISATION"),
+            util.ld_util.SKOS_RESOURCE_TYPES,
         )
         if mime_type is MimeType.HTML:
+            verify(util.lodview_util, times=1).submit_inverse_relations_for_resource(
+                DUMMY_URL, config.get("SPARQL_ENDPOINT")
+            )
             verify(util.lodview_util, times=1).generate_html_page(
                 DUMMY_GRAPH,
                 DUMMY_URL,
                 config.get("SPARQL_ENDPOINT"),
+                inverse_relations=DUMMY_INVERSE_RELATIONS,
             )
         else:
             verify(util.lodview_util, times=1).get_serialised_graph(
@@ -97,15 +103,13 @@ def test_get_200_with_data(mime_type, flask_test_client, i_gtaa_graph):
     DUMMY_URL = f'{config.get("BENG_DATA_DOMAIN")}{PATH}'
 
     try:
-        when(util.ld_util).is_skos_resource(
-            DUMMY_URL, config.get("SPARQL_ENDPOINT", "")
-        ).thenReturn(True)
-        when(util.ld_util).get_resource_from_rdf_store(
+        when(util.ld_util).get_resource_with_type_check_from_rdf_store(
             DUMMY_URL,
             config.get("SPARQL_ENDPOINT"),
             config.get("BENG_LOD_RESOURCE_QUERY", ""),
             config.get("URI_NISV_ORGANISATION"),
-        ).thenReturn(i_gtaa_graph)
+            util.ld_util.SKOS_RESOURCE_TYPES,
+        ).thenReturn((True, i_gtaa_graph))
 
         resp = flask_test_client.get(
             PATH,
@@ -113,11 +117,12 @@ def test_get_200_with_data(mime_type, flask_test_client, i_gtaa_graph):
         )
         assert resp.status_code == 200
 
-        verify(util.ld_util, times=1).get_resource_from_rdf_store(
+        verify(util.ld_util, times=1).get_resource_with_type_check_from_rdf_store(
             DUMMY_URL,
             config.get("SPARQL_ENDPOINT"),
             config.get("BENG_LOD_RESOURCE_QUERY", ""),
             config.get("URI_NISV_ORGANISATION"),
+            util.ld_util.SKOS_RESOURCE_TYPES,
         )
 
         if mime_type is MimeType.HTML:
@@ -152,14 +157,28 @@ def test_get_404(mime_type, flask_test_client):
     DUMMY_URL = f'{config.get("BENG_DATA_DOMAIN")}{PATH}'
 
     try:
-        when(util.ld_util).is_skos_resource(
-            DUMMY_URL, config.get("SPARQL_ENDPOINT", "")
-        ).thenReturn(False)
+        when(util.ld_util).get_resource_with_type_check_from_rdf_store(
+            DUMMY_URL,
+            config.get("SPARQL_ENDPOINT"),
+            config.get("BENG_LOD_RESOURCE_QUERY", ""),
+            config.get("URI_NISV_ORGANISATION"),
+            util.ld_util.SKOS_RESOURCE_TYPES,
+        ).thenReturn((False, Graph()))
+        inverse_relations: Future = Future()
+        when(util.lodview_util).submit_inverse_relations_for_resource(...).thenReturn(
+            inverse_relations
+        )
         resp = flask_test_client.get(
             PATH,
             headers={"Accept": mime_type.value},
         )
         assert resp.status_code == 404
+        # the inverse relations are only queried for HTML, and not needed for a
+        # resource that doesn't exist
+        verify(
+            util.lodview_util, times=1 if mime_type is MimeType.HTML else 0
+        ).submit_inverse_relations_for_resource(...)
+        assert inverse_relations.cancelled() is (mime_type is MimeType.HTML)
     finally:
         unstub()
 
@@ -176,15 +195,13 @@ def test_get_500(mime_type, flask_test_client, caplog):
     DUMMY_EMPTY_GRAPH = Graph()
 
     try:
-        when(util.ld_util).is_skos_resource(
-            DUMMY_URL, config.get("SPARQL_ENDPOINT", "")
-        ).thenReturn(True)
-        when(util.ld_util).get_resource_from_rdf_store(
+        when(util.ld_util).get_resource_with_type_check_from_rdf_store(
             DUMMY_URL,
             config.get("SPARQL_ENDPOINT"),
             config.get("BENG_LOD_RESOURCE_QUERY", ""),
             config.get("URI_NISV_ORGANISATION"),
-        ).thenReturn(DUMMY_EMPTY_GRAPH)
+            util.ld_util.SKOS_RESOURCE_TYPES,
+        ).thenReturn((True, DUMMY_EMPTY_GRAPH))
 
         resp = flask_test_client.get(
             PATH,
@@ -1,6 +1,33 @@
+from http import HTTPStatus
+from mockito import when, unstub
+from apis.health.DependencyHealth import Dependency, DependencyHealth
 from apis.health.health_api import Health
 
 
 def test_init():
     health_api = Health()
     assert isinstance(health_api, Health)
+
+
+def test_get_cache_stats(flask_test_client):
+    resp = flask_test_client.get("health/cache")
+    assert resp.status_code == 200
+    assert all(
+        key in resp.json["graph"] for key in ["hits", "misses", "entries", "size"]
+    )
+
+
+def test_get_circuit_breakers(flask_test_client):
+    """The health shows the state of the circuit breakers of the SPARQL endpoints
+    (without replicas, the endpoint is its only replica)."""
+    try:
+        when(Dependency).get_health(...).thenReturn(DependencyHealth(HTTPStatus.OK))
+        resp = flask_test_client.get("health")
+        assert resp.status_code == 200
+        for config_key in ("SPARQL_ENDPOINT", "MUZIEKWEB_SPARQL_ENDPOINT"):
+            sparql_endpoint = flask_test_client.application.config[config_key]
+            replica = resp.json[config_key]["replicas"][sparql_endpoint]
+            assert replica["state"] == "closed"
+            assert replica["outstanding"] == 0
+    finally:
+        unstub()
@@ -1,5 +1,6 @@
 import json
 import pytest
+from concurrent.futures import Future
 from flask import Response
 from mockito import when, unstub, verify
 from rdflib import Graph, URIRef
@@ -10,6 +11,7 @@ from models.ResourceApiUriLevel import ResourceApiUriLevel
 import util.ld_util
 from util.mime_type_util import MimeType
 import util.lodview_util
+import util.response_util
 
 
 def test_init():
@@ -44,16 +46,14 @@ def test_get_200(
             IDENTIFIER,
             config.get("BENG_DATA_DOMAIN", ""),
         ).thenReturn(URL)
-        when(util.ld_util).is_nisv_cat_resource(
-            URL, config.get("SPARQL_ENDPOINT", "")
-        ).thenReturn(True)
-        when(util.ld_util).get_resource_from_rdf_store(
+        when(util.ld_util).get_resource_with_type_check_from_rdf_store(
             URL,
             config.get("SPARQL_ENDPOINT", ""),
             config.get("BENG_LOD_RESOURCE_QUERY", ""),
             config.get("URI_NISV_ORGANISATION", ""),
+            util.ld_util.NISV_CAT_RESOURCE_TYPES,
         ).thenReturn(
-            i_program_graph_2
+            (True, i_program_graph_2)
         )  # invocation returns Graph object from fixture
 
         # do the actual request
@@ -68,14 +68,12 @@ def test_get_200(
             IDENTIFIER,
             config.get("BENG_DATA_DOMAIN", ""),
         )
-        verify(util.ld_util, times=1).is_nisv_cat_resource(
-            URL, config.get("SPARQL_ENDPOINT", "")
-        )
-        verify(util.ld_util, times=1).get_resource_from_rdf_store(
+        verify(util.ld_util, times=1).get_resource_with_type_check_from_rdf_store(
             URL,
             config.get("SPARQL_ENDPOINT", ""),
             config.get("BENG_LOD_RESOURCE_QUERY", ""),
             config.get("URI_NISV_ORGANISATION", ""),
+            util.ld_util.NISV_CAT_RESOURCE_TYPES,
         )
 
         # test what comes out. TODO: move this to lodview_util tests.
@@ -118,6 +116,106 @@ def test_get_200(
         unstub()
 
 
+@pytest.mark.parametrize("mime_type", [mime_type for mime_type in MimeType])
+def test_get_200_cached(mime_type, flask_test_client, i_program_graph_2):
+    """Given a representation that was served before, the second request is served
+    from the response cache, without getting the graph again."""
+    CAT_TYPE = "program"
+    IDENTIFIER = "123456"
+    PATH = f"/id/{CAT_TYPE}/{IDENTIFIER}"
+    URL = str(i_program_graph_2.value(predicate=RDF.type, object=SDO.CreativeWork))
+    config = flask_test_client.application.config
+
+    try:
+        when(util.ld_util).generate_lod_resource_uri(
+            ResourceApiUriLevel(CAT_TYPE),
+            IDENTIFIER,
+            config.get("BENG_DATA_DOMAIN", ""),
+        ).thenReturn(URL)
+        when(util.ld_util).get_resource_with_type_check_from_rdf_store(
+            URL,
+            config.get("SPARQL_ENDPOINT", ""),
+            config.get("BENG_LOD_RESOURCE_QUERY", ""),
+            config.get("URI_NISV_ORGANISATION", ""),
+            util.ld_util.NISV_CAT_RESOURCE_TYPES,
+        ).thenReturn((True, i_program_graph_2))
+        inverse_relations: Future = Future()
+        inverse_relations.set_result([])
+        when(util.lodview_util).submit_inverse_relations_for_resource(...).thenReturn(
+            inverse_relations
+        )
+
+        resp1 = flask_test_client.get(PATH, headers={"Accept": mime_type.value})
+        resp2 = flask_test_client.get(PATH, headers={"Accept": mime_type.value})
+
+        assert resp1.status_code == 200
+        assert resp2.status_code == 200
+        assert resp2.data == resp1.data
+        assert resp2.content_type == resp1.content_type
+        verify(util.ld_util, times=1).get_resource_with_type_check_from_rdf_store(
+            URL,
+            config.get("SPARQL_ENDPOINT", ""),
+            config.get("BENG_LOD_RESOURCE_QUERY", ""),
+            config.get("URI_NISV_ORGANISATION", ""),
+            util.ld_util.NISV_CAT_RESOURCE_TYPES,
+        )
+    finally:
+        unstub()
+
+
+def test_get_304(flask_test_client, i_program_graph_2):
+    """Given the ETag of a representation, the client gets 304 Not Modified, also
+    when the response isn't cached anymore, without serializing the graph."""
+    CAT_TYPE = "program"
+    IDENTIFIER = "123456"
+    PATH = f"/id/{CAT_TYPE}/{IDENTIFIER}"
+    URL = str(i_program_graph_2.value(predicate=RDF.type, object=SDO.CreativeWork))
+    config = flask_test_client.application.config
+
+    try:
+        when(util.ld_util).generate_lod_resource_uri(
+            ResourceApiUriLevel(CAT_TYPE),
+            IDENTIFIER,
+            config.get("BENG_DATA_DOMAIN", ""),
+        ).thenReturn(URL)
+        when(util.ld_util).get_resource_with_type_check_from_rdf_store(
+            URL,
+            config.get("SPARQL_ENDPOINT", ""),
+            config.get("BENG_LOD_RESOURCE_QUERY", ""),
+            config.get("URI_NISV_ORGANISATION", ""),
+            util.ld_util.NISV_CAT_RESOURCE_TYPES,
+        ).thenReturn((True, i_program_graph_2))
+        headers = {"Accept": MimeType.TURTLE.value}
+
+        resp = flask_test_client.get(PATH, headers=headers)
+        assert resp.status_code == 200
+        etag = resp.headers["ETag"]
+        assert etag.startswith('W/"')
+
+        # from the response cache
+        resp = flask_test_client.get(PATH, headers={**headers, "If-None-Match": etag})
+        assert resp.status_code == 304
+        assert resp.headers["ETag"] == etag
+        assert resp.data == b""
+
+        # from the graph, without serializing it
+        util.response_util.response_cache.clear()
+        when(util.lodview_util).get_serialised_graph(...).thenReturn(Response())
+        resp = flask_test_client.get(PATH, headers={**headers, "If-None-Match": etag})
+        assert resp.status_code == 304
+        assert resp.headers["ETag"] == etag
+        verify(util.lodview_util, times=0).get_serialised_graph(...)
+
+        # another representation has another ETag
+        resp = flask_test_client.get(
+            PATH,
+            headers={"Accept": MimeType.JSON_LD.value, "If-None-Match": etag},
+        )
+        assert resp.status_code == 200
+    finally:
+        unstub()
+
+
 def test_get_200_mime_type_none(flask_test_client, resource_query_url):
     """Given a flask test client, send a get request with no mime_type.
     Tests the default behaviour for the mime type (JSON-LD is the default).
@@ -141,15 +239,13 @@ def test_get_200_mime_type_none(flask_test_client, resource_query_url):
             DUMMY_IDENTIFIER,
             config.get("BENG_DATA_DOMAIN"),
         ).thenReturn(DUMMY_URL)
-        when(util.ld_util).is_nisv_cat_resource(
-            DUMMY_URL, config.get("SPARQL_ENDPOINT", "")
-        ).thenReturn(True)
-        when(util.ld_util).get_resource_from_rdf_store(
+        when(util.ld_util).get_resource_with_type_check_from_rdf_store(
             DUMMY_URL,
             config.get("SPARQL_ENDPOINT"),
             config.get("BENG_LOD_RESOURCE_QUERY", ""),
             config.get("URI_NISV_ORGANISATION"),
-        ).thenReturn(DUMMY_GRAPH)
+            util.ld_util.NISV_CAT_RESOURCE_TYPES,
+        ).thenReturn((True, DUMMY_GRAPH))
 
         if default_mimetype is MimeType.HTML:
             when(util.lodview_util).generate_html_page(
@@ -176,14 +272,12 @@ def test_get_200_mime_type_none(flask_test_client, resource_query_url):
             DUMMY_IDENTIFIER,
             config.get("BENG_DATA_DOMAIN"),
         )
-        verify(util.ld_util, times=1).is_nisv_cat_resource(
-            DUMMY_URL, config.get("SPARQL_ENDPOINT", "")
-        )
-        verify(util.ld_util, times=1).get_resource_from_rdf_store(
+        verify(util.ld_util, times=1).get_resource_with_type_check_from_rdf_store(
             DUMMY_URL,
             config.get("SPARQL_ENDPOINT"),
             config.get("BENG_LOD_RESOURCE_QUERY", ""),
             config.get("URI_NISV_ORGANISATION"),
+            util.ld_util.NISV_CAT_RESOURCE_TYPES,
         )
 
         if default_mimetype is MimeType.HTML:
@@ -290,17 +384,32 @@ def test_get_404(flask_test_client, resource_query_url):
             DUMMY_IDENTIFIER,
             config.get("BENG_DATA_DOMAIN"),
         ).thenReturn(DUMMY_URL)
-        when(util.ld_util).is_nisv_cat_resource(
-            DUMMY_URL, config.get("SPARQL_ENDPOINT", "")
-        ).thenReturn(False)
+        when(util.ld_util).get_resource_with_type_check_from_rdf_store(
+            DUMMY_URL,
+            config.get("SPARQL_ENDPOINT", ""),
+            config.get("BENG_LOD_RESOURCE_QUERY", ""),
+            config.get("URI_NISV_ORGANISATION", ""),
+            util.ld_util.NISV_CAT_RESOURCE_TYPES,
+        ).thenReturn((False, Graph()))
+        inverse_relations: Future = Future()
+        when(util.lodview_util).submit_inverse_relations_for_resource(...).thenReturn(
+            inverse_relations
+        )
 
         response = flask_test_client.get(
             resource_query_url(CAT_TYPE, DUMMY_IDENTIFIER),
+            headers={"Accept": MimeType.HTML.value},
         )
         assert response.status_code == 404
+        # the inverse relations, queried while getting the resource, are not needed
+        assert inverse_relations.cancelled()
 
-        verify(util.ld_util, times=1).is_nisv_cat_resource(
-            DUMMY_URL, config.get("SPARQL_ENDPOINT", "")
+        verify(util.ld_util, times=1).get_resource_with_type_check_from_rdf_store(
+            DUMMY_URL,
+            config.get("SPARQL_ENDPOINT", ""),
+            config.get("BENG_LOD_RESOURCE_QUERY", ""),
+            config.get("URI_NISV_ORGANISATION", ""),
+            util.ld_util.NISV_CAT_RESOURCE_TYPES,
         )
 
     finally:
@@ -332,28 +441,27 @@ def test_get_500(mime_type, cause, flask_test_client, resource_query_url):
             DUMMY_IDENTIFIER,
             config.get("BENG_DATA_DOMAIN"),
         ).thenReturn(DUMMY_URL)
-        when(util.ld_util).is_nisv_cat_resource(
-            DUMMY_URL, config.get("SPARQL_ENDPOINT", "")
-        ).thenReturn(True)
 
         if mime_type is MimeType.JSON_LD and cause == "not_rdf_graph":
-            when(util.ld_util).get_resource_from_rdf_store(
+            when(util.ld_util).get_resource_with_type_check_from_rdf_store(
                 DUMMY_URL,
                 config.get("SPARQL_ENDPOINT"),
                 config.get("BENG_LOD_RESOURCE_QUERY", ""),
                 config.get("URI_NISV_ORGANISATION"),
-            ).thenReturn(None)
+                util.ld_util.NISV_CAT_RESOURCE_TYPES,
+            ).thenReturn((True, None))
             when(DUMMY_GRAPH).serialize(format=mime_type.to_ld_format()).thenReturn(
                 None
             )  # shouldn't be called, but we want to check this
         elif mime_type is MimeType.JSON_LD and cause == "no_serialized_graph":
-            when(util.ld_util).get_resource_from_rdf_store(
+            when(util.ld_util).get_resource_with_type_check_from_rdf_store(
                 DUMMY_URL,
                 config.get("SPARQL_ENDPOINT"),
                 config.get("BENG_LOD_RESOURCE_QUERY", ""),
                 config.get("URI_NISV_ORGANISATION"),
+                util.ld_util.NISV_CAT_RESOURCE_TYPES,
             ).thenReturn(
-                DUMMY_GRAPH
+                (True, DUMMY_GRAPH)
             )  # note dummy graph is not empty
             when(DUMMY_GRAPH).serialize(format=mime_type.to_ld_format()).thenReturn(
                 None
@@ -370,11 +478,12 @@ def test_get_500(mime_type, cause, flask_test_client, resource_query_url):
             DUMMY_IDENTIFIER,
             config.get("BENG_DATA_DOMAIN"),
         )
-        verify(util.ld_util, times=1).get_resource_from_rdf_store(
+        verify(util.ld_util, times=1).get_resource_with_type_check_from_rdf_store(
             DUMMY_URL,
             config.get("SPARQL_ENDPOINT"),
             config.get("BENG_LOD_RESOURCE_QUERY", ""),
             config.get("URI_NISV_ORGANISATION"),
+            util.ld_util.NISV_CAT_RESOURCE_TYPES,
         )
         verify(DUMMY_GRAPH, times=0 if cause == "not_rdf_graph" else 1).serialize(
             format=mime_type.to_ld_format()
@@ -405,16 +514,14 @@ def test_get_500_html(flask_test_client, resource_query_url):
             DUMMY_IDENTIFIER,
             config.get("BENG_DATA_DOMAIN"),
         ).thenReturn(DUMMY_URL)
-        when(util.ld_util).is_nisv_cat_resource(
-            DUMMY_URL, config.get("SPARQL_ENDPOINT", "")
-        ).thenReturn(True)
-        when(util.ld_util).get_resource_from_rdf_store(
+        when(util.ld_util).get_resource_with_type_check_from_rdf_store(
             DUMMY_URL,
             config.get("SPARQL_ENDPOINT"),
             config.get("BENG_LOD_RESOURCE_QUERY", ""),
             config.get("URI_NISV_ORGANISATION"),
+            util.ld_util.NISV_CAT_RESOURCE_TYPES,
         ).thenReturn(
-            DUMMY_EMPTY_GRAPH
+            (True, DUMMY_EMPTY_GRAPH)
         )  # empty graph will cause 500
 
         response = flask_test_client.get(
@@ -429,11 +536,12 @@ def test_get_500_html(flask_test_client, resource_query_url):
             DUMMY_IDENTIFIER,
             config.get("BENG_DATA_DOMAIN"),
         )
-        verify(util.ld_util, times=1).get_resource_from_rdf_store(
+        verify(util.ld_util, times=1).get_resource_with_type_check_from_rdf_store(
             DUMMY_URL,
             config.get("SPARQL_ENDPOINT", ""),
             config.get("BENG_LOD_RESOURCE_QUERY", ""),
             config.get("URI_NISV_ORGANISATION", ""),
+            util.ld_util.NISV_CAT_RESOURCE_TYPES,
         )
 
     finally:
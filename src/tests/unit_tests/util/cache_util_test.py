@@ -0,0 +1,329 @@
+import pytest
+from mockito import when, unstub
+from rdflib import Graph
+from util.cache_util import Cache, LRUCache, SQLiteCache, caches
+import util.cache_util
+
+
+@pytest.fixture(autouse=True)
+def unregister_test_caches():
+    yield
+    for name in [name for name in caches if name.startswith("test")]:
+        del caches[name]
+
+
+def test_init():
+    cache = LRUCache("test", max_entries=10, ttl_sec=60.0)
+    assert isinstance(cache, LRUCache)
+    assert caches["test"] is cache
+    assert cache.enabled
+    assert not LRUCache("test_disabled", max_entries=0, ttl_sec=60.0).enabled
+
+
+def test_get_set():
+    cache = LRUCache("test", max_entries=10, ttl_sec=60.0)
+    assert cache.get("a") is None
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    cache.delete("a")
+    assert cache.get("a") is None
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+    assert stats["entries"] == 0
+
+
+def test_lru_eviction_by_entries():
+    cache = LRUCache("test", max_entries=2, ttl_sec=0)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # b is now the least recently used
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_lru_eviction_by_size():
+    cache = LRUCache("test", max_entries=10, ttl_sec=0, max_size=5, size_of=len)
+    cache.set("a", "xx")
+    cache.set("b", "xx")
+    cache.set("c", "xx")  # total size would be 6
+
+    assert cache.get("a") is None
+    assert cache.get("b") == "xx"
+    assert cache.stats()["size"] == 4
+
+    cache.set("d", "xxxxxx")  # too big to cache
+    assert cache.get("d") is None
+    assert cache.stats()["entries"] == 2
+
+
+def test_ttl():
+    cache = LRUCache("test", max_entries=10, ttl_sec=60.0)
+    try:
+        when(util.cache_util.time).monotonic().thenReturn(1000.0)
+        cache.set("a", 1)
+        when(util.cache_util.time).monotonic().thenReturn(1059.0)
+        assert cache.get("a") == 1
+        when(util.cache_util.time).monotonic().thenReturn(1061.0)
+        assert cache.get("a") is None
+        assert cache.stats()["entries"] == 0
+    finally:
+        unstub()
+
+
+def test_stale():
+    """An expired entry is kept max_stale_sec seconds longer for get_with_age."""
+    cache = LRUCache("test", max_entries=10, ttl_sec=60.0, max_stale_sec=30.0)
+    try:
+        when(util.cache_util.time).monotonic().thenReturn(1000.0)
+        cache.set("a", 1)
+        when(util.cache_util.time).monotonic().thenReturn(1070.0)
+        assert cache.get("a") is None
+        assert cache.get_with_age("a") == (1, 70.0)
+        assert cache.stats()["stale_hits"] == 2
+        when(util.cache_util.time).monotonic().thenReturn(1091.0)
+        assert cache.get_with_age("a") is None
+        assert cache.stats()["entries"] == 0
+    finally:
+        unstub()
+
+
+def test_disabled():
+    cache = LRUCache("test", max_entries=0, ttl_sec=60.0)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0
+
+
+def _sqlite_cache(
+    tmp_path,
+    name="test_sqlite",
+    max_entries=10,
+    ttl_sec=60.0,
+    recency_resolution_sec=0.0,
+    **kwargs,
+) -> SQLiteCache:
+    return SQLiteCache(
+        name,
+        max_entries=max_entries,
+        ttl_sec=ttl_sec,
+        size_of=len,
+        path=str(tmp_path / "cache.sqlite3"),
+        encode=lambda value: value.encode("utf-8"),
+        decode=lambda data: data.decode("utf-8"),
+        recency_resolution_sec=recency_resolution_sec,
+        **kwargs,
+    )
+
+
+def test_sqlite_get_set(tmp_path):
+    cache = _sqlite_cache(tmp_path)
+    assert cache.get(("a", 1)) is None
+    cache.set(("a", 1), "value")
+    assert cache.get(("a", 1)) == "value"
+    cache.delete(("a", 1))
+    assert cache.get(("a", 1)) is None
+
+    stats = cache.stats()
+    assert stats["backend"] == "SQLiteCache"
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+    assert stats["entries"] == 0
+
+
+def test_sqlite_shared(tmp_path):
+    """Caches with the same database and name (e.g. in two workers) share the
+    entries, caches with another name don't."""
+    cache_worker_1 = _sqlite_cache(tmp_path)
+    cache_worker_2 = _sqlite_cache(tmp_path)
+    other_cache = _sqlite_cache(tmp_path, name="test_sqlite_other")
+
+    cache_worker_1.set("a", "value")
+    assert cache_worker_2.get("a") == "value"
+    assert other_cache.get("a") is None
+
+    cache_worker_2.clear()
+    assert cache_worker_1.get("a") is None
+
+
+def test_sqlite_lru_eviction(tmp_path):
+    cache = _sqlite_cache(tmp_path, max_entries=2, max_size=5)
+    try:
+        for now, key in enumerate(["a", "b"]):
+            when(util.cache_util.time).time().thenReturn(1000.0 + now)
+            cache.set(key, "x")
+        when(util.cache_util.time).time().thenReturn(1002.0)
+        assert cache.get("a") == "x"  # b is now the least recently used
+        when(util.cache_util.time).time().thenReturn(1003.0)
+        cache.set("c", "x")
+
+        assert cache.get("b") is None
+        assert cache.get("a") == "x"
+        assert cache.get("c") == "x"
+
+        when(util.cache_util.time).time().thenReturn(1004.0)
+        cache.set("d", "xxxx")  # total size would be 6
+        assert cache.get("d") == "xxxx"
+        assert cache.stats()["entries"] == 2
+        assert cache.stats()["size"] == 5
+        assert cache.stats()["evictions"] == 2
+    finally:
+        unstub()
+
+
+def test_sqlite_approximate_lru(tmp_path):
+    """A hit within recency_resolution_sec of the last access doesn't write the
+    access time, so it doesn't change the order of eviction."""
+    cache = _sqlite_cache(tmp_path, max_entries=2, recency_resolution_sec=10.0)
+    try:
+        for now, key in enumerate(["a", "b"]):
+            when(util.cache_util.time).time().thenReturn(1000.0 + now)
+            cache.set(key, "x")
+        when(util.cache_util.time).time().thenReturn(1002.0)
+        assert cache.get("a") == "x"  # not written, a is still the least recent
+        when(util.cache_util.time).time().thenReturn(1003.0)
+        cache.set("c", "x")
+        assert cache.get("a") is None
+
+        when(util.cache_util.time).time().thenReturn(1020.0)
+        assert cache.get("b") == "x"  # written, c is now the least recent
+        cache.set("d", "x")
+        assert cache.get("c") is None
+        assert cache.get("b") == "x"
+    finally:
+        unstub()
+
+
+def _count_entries(cache: SQLiteCache):
+    return tuple(
+        cache._connection()
+        .execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache WHERE name = ?",
+            (cache.name,),
+        )
+        .fetchone()
+    )
+
+
+def test_sqlite_stats_are_kept(tmp_path):
+    """The number of entries and their size are kept up to date by every write."""
+    cache = _sqlite_cache(tmp_path)
+    other_cache = _sqlite_cache(tmp_path, name="test_sqlite_other")
+    try:
+        when(util.cache_util.time).time().thenReturn(1000.0)
+        cache.set("a", "x")
+        cache.set("a", "xxx")  # replaced
+        cache.set("b", "xx")
+        other_cache.set("a", "x")
+        assert (cache.stats()["entries"], cache.stats()["size"]) == (2, 5)
+        cache.delete("a")
+        assert (cache.stats()["entries"], cache.stats()["size"]) == (1, 2)
+        when(util.cache_util.time).time().thenReturn(1061.0)
+        cache.set("c", "x")  # b expired
+        assert (cache.stats()["entries"], cache.stats()["size"]) == (1, 1)
+        assert _count_entries(cache) == (1, 1)
+        cache.clear()
+        assert (cache.stats()["entries"], cache.stats()["size"]) == (0, 0)
+        assert (other_cache.stats()["entries"], other_cache.stats()["size"]) == (1, 1)
+    finally:
+        unstub()
+
+
+def test_sqlite_set_within_limits(tmp_path):
+    """Adding an entry within the limits of the cache doesn't scan the entries."""
+    cache = _sqlite_cache(tmp_path, max_entries=2)
+    statements: list = []
+    cache._connection().set_trace_callback(statements.append)
+    cache.set("a", "x")
+    assert not [sql for sql in statements if "COUNT" in sql or "ORDER BY" in sql]
+    cache.set("b", "x")
+    cache.set("c", "x")
+    assert [sql for sql in statements if "ORDER BY accessed" in sql]
+    assert cache.stats()["entries"] == 2
+
+
+def test_sqlite_stats_of_earlier_database(tmp_path):
+    """The entries of a database file without the stats table are counted."""
+    cache = _sqlite_cache(tmp_path)
+    cache.set("a", "xx")
+    connection = cache._connection()
+    connection.execute("DROP TABLE cache_stats")
+    connection.execute("DROP TRIGGER cache_insert")
+    connection.close()
+    cache = _sqlite_cache(tmp_path)
+    assert (cache.stats()["entries"], cache.stats()["size"]) == (1, 2)
+    cache.set("b", "x")
+    assert (cache.stats()["entries"], cache.stats()["size"]) == (2, 3)
+
+
+def test_cache_is_abstract():
+    with pytest.raises(TypeError):
+        Cache("test_abstract", max_entries=1, ttl_sec=0.0)  # type: ignore
+
+
+def test_sqlite_ttl(tmp_path):
+    cache = _sqlite_cache(tmp_path)
+    try:
+        when(util.cache_util.time).time().thenReturn(1000.0)
+        cache.set("a", "value")
+        when(util.cache_util.time).time().thenReturn(1059.0)
+        assert cache.get("a") == "value"
+        when(util.cache_util.time).time().thenReturn(1061.0)
+        assert cache.get("a") is None
+        assert cache.stats()["entries"] == 0
+    finally:
+        unstub()
+
+
+def test_sqlite_stale(tmp_path):
+    cache = _sqlite_cache(tmp_path, max_stale_sec=30.0)
+    try:
+        when(util.cache_util.time).time().thenReturn(1000.0)
+        cache.set("a", "value")
+        when(util.cache_util.time).time().thenReturn(1070.0)
+        assert cache.get("a") is None
+        assert cache.get_with_age("a") == ("value", 70.0)
+        # the stale entry is not removed when another entry is added
+        cache.set("b", "value")
+        assert cache.stats()["entries"] == 2
+        when(util.cache_util.time).time().thenReturn(1091.0)
+        assert cache.get_with_age("a") is None
+    finally:
+        unstub()
+
+
+def test_sqlite_error(tmp_path):
+    """A database that can't be used is handled as a miss."""
+    (tmp_path / "not_a_directory").write_text("")
+    cache = SQLiteCache(
+        "test_sqlite",
+        max_entries=10,
+        ttl_sec=60.0,
+        path=str(tmp_path / "not_a_directory" / "cache.sqlite3"),
+        encode=lambda value: value,
+        decode=lambda data: data,
+    )
+    cache.set("a", b"value")
+    assert cache.get("a") is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_graph_digest():
+    """The digest of a graph is computed once."""
+    g = Graph().parse(
+        data="<http://example.org/a> <http://example.org/b> [ a <http://example.org/C> ] .",
+        format="turtle",
+    )
+    digest = util.cache_util.graph_digest(g)
+    try:
+        when(util.cache_util).to_isomorphic(...).thenRaise(AssertionError)
+        assert util.cache_util.graph_digest(g) == digest
+        with pytest.raises(AssertionError):
+            util.cache_util.graph_digest(Graph())
+    finally:
+        unstub()
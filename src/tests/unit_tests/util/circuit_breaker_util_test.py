@@ -0,0 +1,91 @@
+import pytest
+import time
+from util.circuit_breaker_util import CircuitBreaker, CircuitOpenError, CircuitState
+import util.circuit_breaker_util
+
+DUMMY_SPARQL_ENDPOINT = "http://sparql.beng.example.com/sparql"
+
+
+def test_circuit_opens_after_failures():
+    circuit_breaker = CircuitBreaker(DUMMY_SPARQL_ENDPOINT, failure_threshold=3)
+    for _ in range(2):
+        circuit_breaker.before_request()
+        circuit_breaker.record_failure()
+    assert circuit_breaker.state is CircuitState.CLOSED
+
+    # a success resets the consecutive failures
+    circuit_breaker.record_success(0.1)
+    for _ in range(3):
+        circuit_breaker.before_request()
+        circuit_breaker.record_failure()
+    assert circuit_breaker.state is CircuitState.OPEN
+    assert circuit_breaker.times_opened == 1
+    with pytest.raises(CircuitOpenError):
+        circuit_breaker.before_request()
+
+
+@pytest.mark.parametrize("probe_succeeds", [True, False])
+def test_circuit_half_open_probe(probe_succeeds: bool):
+    """After the reset timeout, a single request probes the endpoint."""
+    circuit_breaker = CircuitBreaker(
+        DUMMY_SPARQL_ENDPOINT, failure_threshold=1, reset_timeout_sec=0.05
+    )
+    circuit_breaker.record_failure()
+    assert circuit_breaker.state is CircuitState.OPEN
+    time.sleep(0.06)
+
+    circuit_breaker.before_request()
+    assert circuit_breaker.state is CircuitState.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        circuit_breaker.before_request()  # the probe is in flight
+
+    if probe_succeeds:
+        circuit_breaker.record_success(0.1)
+        assert circuit_breaker.state is CircuitState.CLOSED
+        circuit_breaker.before_request()
+    else:
+        circuit_breaker.record_failure()
+        assert circuit_breaker.state is CircuitState.OPEN
+        assert circuit_breaker.times_opened == 2
+        with pytest.raises(CircuitOpenError):
+            circuit_breaker.before_request()
+
+
+@pytest.mark.parametrize(
+    "latencies, expected",
+    [
+        ([], 30.0),  # too few samples
+        ([0.1] * 19, 30.0),
+        ([0.1] * 20, 2.0),  # not below the minimum
+        ([1.0] * 98 + [4.0] * 2, 12.0),  # the 99th percentile (4.0) times 3
+        ([20.0] * 20, 30.0),  # not above the maximum
+    ],
+)
+def test_read_timeout(latencies, expected: float):
+    circuit_breaker = CircuitBreaker(
+        DUMMY_SPARQL_ENDPOINT,
+        min_read_timeout_sec=2.0,
+        max_read_timeout_sec=30.0,
+        timeout_percentile=0.99,
+        timeout_factor=3.0,
+        min_samples=20,
+    )
+    for latency in latencies:
+        circuit_breaker.record_success(latency)
+    assert circuit_breaker.read_timeout() == pytest.approx(expected)
+
+
+def test_get_circuit_breaker_per_endpoint():
+    circuit_breaker = util.circuit_breaker_util.get_circuit_breaker(
+        DUMMY_SPARQL_ENDPOINT
+    )
+    assert (
+        util.circuit_breaker_util.get_circuit_breaker(DUMMY_SPARQL_ENDPOINT)
+        is circuit_breaker
+    )
+    assert circuit_breaker.stats()["state"] == CircuitState.CLOSED.value
+    util.circuit_breaker_util.reset_circuit_breakers()
+    assert (
+        util.circuit_breaker_util.get_circuit_breaker(DUMMY_SPARQL_ENDPOINT)
+        is not circuit_breaker
+    )
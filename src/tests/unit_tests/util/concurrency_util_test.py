@@ -0,0 +1,50 @@
+import pytest
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from util.concurrency_util import SingleFlight
+
+
+def test_single_flight_shares_call():
+    """Calls for the same key while the first one is in flight get its result."""
+    single_flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "result"
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        first = executor.submit(single_flight.do, "key", fn)
+        started.wait(5)
+        others = [executor.submit(single_flight.do, "key", fn) for _ in range(3)]
+        while single_flight.shared < 3:
+            time.sleep(0.01)
+        release.set()
+        assert first.result() == "result"
+        assert [other.result() for other in others] == ["result"] * 3
+    assert len(calls) == 1
+
+    # the next call is not in flight anymore
+    assert single_flight.do("key", lambda: "next result") == "next result"
+
+
+def test_single_flight_exception():
+    single_flight = SingleFlight()
+
+    def fn():
+        raise ConnectionError
+
+    with pytest.raises(ConnectionError):
+        single_flight.do("key", fn)
+    assert single_flight.do("key", lambda: "result") == "result"
+
+
+def test_single_flight_keys():
+    single_flight = SingleFlight()
+    assert single_flight.do("a", lambda: single_flight.do("b", lambda: "b")) == "b"
+    assert single_flight.shared == 0
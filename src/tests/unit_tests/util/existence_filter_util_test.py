@@ -0,0 +1,109 @@
+import os
+import pytest
+from mockito import when, unstub, verify
+from config import cfg
+import util.existence_filter_util
+import util.ld_util
+from util.existence_filter_util import BloomFilter
+
+DUMMY_SPARQL_ENDPOINT = "http://sparql.beng.example.com/sparql"
+DUMMY_IRIS = [f"http://data.beeldengeluid.nl/id/program/{i}" for i in range(1000)]
+
+
+def _bindings(iris):
+    return iter([{"s": {"type": "uri", "value": iri}} for iri in iris])
+
+
+@pytest.fixture
+def filter_path(tmp_path):
+    return str(tmp_path / "existence_filter.bin")
+
+
+def test_bloom_filter(filter_path):
+    """An added IRI is always in the filter, also in a filter opened read-only,
+    and (almost) no other IRIs are."""
+    existence_filter = BloomFilter.create(filter_path, 1000, 0.01)
+    added = sum(existence_filter.add(iri) for iri in DUMMY_IRIS)
+    assert existence_filter.add(DUMMY_IRIS[0]) is False
+    # an IRI that is a false positive is not counted
+    assert existence_filter.count == added
+    assert added > 0.95 * len(DUMMY_IRIS)
+    existence_filter.close()
+
+    existence_filter = BloomFilter(filter_path)
+    assert all(iri in existence_filter for iri in DUMMY_IRIS)
+    false_positives = sum(
+        f"http://data.beeldengeluid.nl/id/program/x{i}" in existence_filter
+        for i in range(10000)
+    )
+    assert false_positives < 300  # 1% expected
+
+
+def test_bloom_filter_invalid(filter_path):
+    with open(filter_path, "wb") as f:
+        f.write(b"not a filter" * 10)
+    with pytest.raises(ValueError):
+        BloomFilter(filter_path)
+
+
+def test_build_existence_filter(filter_path):
+    """The IRIs are read in pages, each page after the last IRI of the previous
+    page. Building again adds the new IRIs to the existing filter."""
+    try:
+        when(util.ld_util).sparql_select_bindings(...).thenReturn(
+            _bindings(DUMMY_IRIS[:400])
+        ).thenReturn(_bindings(DUMMY_IRIS[400:800])).thenReturn(_bindings([]))
+        added = util.existence_filter_util.build_existence_filter(
+            filter_path, DUMMY_SPARQL_ENDPOINT, 1000, 0.01, 400
+        )
+        assert 760 < added <= 800
+        verify(util.ld_util, times=3).sparql_select_bindings(...)
+        assert not os.path.exists(f"{filter_path}.building")
+
+        when(util.ld_util).sparql_select_bindings(...).thenReturn(_bindings(DUMMY_IRIS))
+        added = util.existence_filter_util.build_existence_filter(
+            filter_path, DUMMY_SPARQL_ENDPOINT, 1000, 0.01, 2000
+        )
+        assert 180 < added <= 200
+        existence_filter = BloomFilter(filter_path)
+        assert all(iri in existence_filter for iri in DUMMY_IRIS)
+    finally:
+        unstub()
+
+
+def test_iter_resource_iris():
+    """The pages are read until a page has less than page_size IRIs."""
+    try:
+        when(util.ld_util).sparql_select_bindings(...).thenReturn(
+            _bindings(DUMMY_IRIS[:2])
+        ).thenReturn(_bindings(DUMMY_IRIS[2:3]))
+        iris = util.existence_filter_util.iter_resource_iris(DUMMY_SPARQL_ENDPOINT, 2)
+        assert list(iris) == DUMMY_IRIS[:3]
+        verify(util.ld_util, times=2).sparql_select_bindings(...)
+    finally:
+        unstub()
+
+
+def test_sparql_string():
+    assert (
+        util.existence_filter_util._sparql_string('http://example.org/"a"\\')
+        == r'"http://example.org/\"a\"\\"'
+    )
+
+
+def test_may_exist(filter_path, monkeypatch):
+    existence_filter = BloomFilter.create(filter_path, 1000, 0.01)
+    existence_filter.add(DUMMY_IRIS[0])
+    existence_filter.close()
+    monkeypatch.setitem(cfg, "EXISTENCE_FILTER_PATH", filter_path)
+    monkeypatch.setattr(util.existence_filter_util, "_checked_at", 0.0)
+    monkeypatch.setattr(util.existence_filter_util, "_file_id", None)
+    monkeypatch.setattr(util.existence_filter_util, "_existence_filter", None)
+
+    assert util.existence_filter_util.may_exist(DUMMY_IRIS[0]) is True
+    assert util.existence_filter_util.may_exist(DUMMY_IRIS[1]) is False
+
+
+def test_may_exist_without_filter():
+    assert util.existence_filter_util.get_existence_filter() is None
+    assert util.existence_filter_util.may_exist(DUMMY_IRIS[0]) is True
@@ -0,0 +1,297 @@
+import pytest
+import random
+import requests
+import threading
+import time
+from mockito import when, unstub, verify, mock, KWARGS
+from requests.adapters import HTTPAdapter
+from requests.exceptions import (
+    ChunkedEncodingError,
+    ConnectionError,
+    InvalidURL,
+    Timeout,
+)
+from util.circuit_breaker_util import (
+    CircuitOpenError,
+    CircuitState,
+    get_circuit_breaker,
+)
+from config import cfg
+import util.concurrency_util
+import util.http_util
+
+DUMMY_SPARQL_ENDPOINT = "http://sparql.beng.example.com/sparql"
+DUMMY_OTHER_SPARQL_ENDPOINT = "http://sparql.other.example.com/sparql"
+
+
+def test_get_session_is_shared_per_endpoint():
+    session = util.http_util.get_session(DUMMY_SPARQL_ENDPOINT)
+    assert isinstance(session, requests.Session)
+    assert util.http_util.get_session(DUMMY_SPARQL_ENDPOINT) is session
+    assert util.http_util.get_session(DUMMY_OTHER_SPARQL_ENDPOINT) is not session
+
+
+def test_get_session_pool_and_retries(application_settings):
+    session = util.http_util.get_session(DUMMY_SPARQL_ENDPOINT)
+    adapter = session.get_adapter(DUMMY_SPARQL_ENDPOINT)
+    assert isinstance(adapter, HTTPAdapter)
+    assert adapter._pool_maxsize == application_settings.get("SPARQL_POOL_SIZE", 10)
+    assert adapter.max_retries.total == application_settings.get("SPARQL_RETRIES", 2)
+
+
+def test_sparql_get():
+    try:
+        resp = mock({"status_code": 200, "text": ""})
+        params = {"query": "ASK { ?s ?p ?o }"}
+        when(requests.Session).get(DUMMY_SPARQL_ENDPOINT, **KWARGS).thenReturn(resp)
+
+        assert util.http_util.sparql_get(DUMMY_SPARQL_ENDPOINT, params) is resp
+
+        verify(requests.Session, times=1).get(
+            DUMMY_SPARQL_ENDPOINT,
+            params=params,
+            headers=None,
+            timeout=util.http_util.get_timeout(DUMMY_SPARQL_ENDPOINT),
+            stream=False,
+        )
+    finally:
+        unstub()
+
+
+def test_sparql_get_circuit_breaker():
+    """After CIRCUIT_BREAKER_FAILURES failures, no more requests are sent."""
+    circuit_breaker = get_circuit_breaker(DUMMY_SPARQL_ENDPOINT)
+    try:
+        when(requests.Session).get(DUMMY_SPARQL_ENDPOINT, **KWARGS).thenRaise(
+            ConnectionError
+        )
+        for _ in range(circuit_breaker.failure_threshold):
+            with pytest.raises(ConnectionError):
+                util.http_util.sparql_get(DUMMY_SPARQL_ENDPOINT, {})
+        with pytest.raises(CircuitOpenError):
+            util.http_util.sparql_get(DUMMY_SPARQL_ENDPOINT, {})
+        verify(requests.Session, times=circuit_breaker.failure_threshold).get(
+            DUMMY_SPARQL_ENDPOINT, **KWARGS
+        )
+        # the other endpoints are not affected
+        assert get_circuit_breaker(DUMMY_OTHER_SPARQL_ENDPOINT).state is (
+            CircuitState.CLOSED
+        )
+    finally:
+        unstub()
+
+
+@pytest.mark.parametrize(
+    "error", [ConnectionError, ChunkedEncodingError, InvalidURL, ValueError]
+)
+def test_sparql_get_half_open_probe_fails(error):
+    """Given a half-open circuit, a probe that fails with any error opens the
+    circuit again, so a later probe can close it."""
+    circuit_breaker = get_circuit_breaker(DUMMY_SPARQL_ENDPOINT)
+    for _ in range(circuit_breaker.failure_threshold):
+        circuit_breaker.record_failure()
+    circuit_breaker.reset_timeout_sec = 0.0  # the next request is a probe
+    try:
+        resp = mock({"status_code": 200, "text": ""})
+        when(requests.Session).get(DUMMY_SPARQL_ENDPOINT, **KWARGS).thenRaise(
+            error
+        ).thenReturn(resp)
+        with pytest.raises(error):
+            util.http_util.sparql_get(DUMMY_SPARQL_ENDPOINT, {})
+        assert circuit_breaker.state is CircuitState.OPEN
+
+        assert util.http_util.sparql_get(DUMMY_SPARQL_ENDPOINT, {}) is resp
+        assert circuit_breaker.state is CircuitState.CLOSED
+    finally:
+        unstub()
+
+
+@pytest.mark.parametrize("status_code, failures", [(200, 0), (400, 0), (503, 1)])
+def test_sparql_get_records_status(status_code: int, failures: int):
+    try:
+        resp = mock({"status_code": status_code, "text": ""})
+        when(requests.Session).get(DUMMY_SPARQL_ENDPOINT, **KWARGS).thenReturn(resp)
+        util.http_util.sparql_get(DUMMY_SPARQL_ENDPOINT, {})
+        assert get_circuit_breaker(DUMMY_SPARQL_ENDPOINT).failures == failures
+    finally:
+        unstub()
+
+
+DUMMY_REPLICAS = [
+    "http://replica1.beng.example.com/sparql",
+    "http://replica2.beng.example.com/sparql",
+]
+
+
+@pytest.fixture()
+def replicas(monkeypatch):
+    monkeypatch.setitem(
+        cfg, "SPARQL_ENDPOINT_REPLICAS", {DUMMY_SPARQL_ENDPOINT: DUMMY_REPLICAS}
+    )
+    return DUMMY_REPLICAS
+
+
+@pytest.mark.parametrize("open_circuit", [False, True])
+def test_sparql_get_replicas(replicas, monkeypatch, open_circuit: bool):
+    """The request is sent to the replica with the least outstanding requests, or
+    to the replica with a closed circuit."""
+    if open_circuit:
+        circuit_breaker = get_circuit_breaker(replicas[0])
+        for _ in range(circuit_breaker.failure_threshold):
+            circuit_breaker.record_failure()
+    else:
+        monkeypatch.setitem(util.http_util._outstanding, replicas[0], 1)
+    try:
+        resp = mock({"status_code": 200, "text": ""})
+        when(requests.Session).get(replicas[1], **KWARGS).thenReturn(resp)
+        assert util.http_util.sparql_get(DUMMY_SPARQL_ENDPOINT, {}) is resp
+        verify(requests.Session, times=1).get(replicas[1], **KWARGS)
+    finally:
+        unstub()
+
+
+def _hedge_after(replica: str, latency: float):
+    circuit_breaker = get_circuit_breaker(replica)
+    for _ in range(circuit_breaker.min_samples):
+        circuit_breaker.record_success(latency)
+
+
+@pytest.fixture()
+def hedged_replicas(replicas, monkeypatch):
+    monkeypatch.setitem(cfg, "SPARQL_HEDGED_REQUESTS", True)
+    monkeypatch.setattr(random, "random", lambda: 0.0)  # the first replica first
+    return replicas
+
+
+def test_sparql_get_hedged(hedged_replicas):
+    """When the first replica is slower than usual, the request is also sent to the
+    second replica, whose response is used, and the late response of the first
+    replica is closed."""
+    _hedge_after(hedged_replicas[0], 0.01)
+    release = threading.Event()
+    closed = threading.Event()
+    slow_resp = mock({"status_code": 200, "text": ""})
+    hedged_resp = mock({"status_code": 200, "text": ""})
+
+    def slow_answer(*args, **kwargs):
+        release.wait(5)
+        return slow_resp
+
+    try:
+        when(requests.Session).get(hedged_replicas[0], **KWARGS).thenAnswer(slow_answer)
+        when(requests.Session).get(hedged_replicas[1], **KWARGS).thenReturn(hedged_resp)
+        when(slow_resp).close().thenAnswer(closed.set)
+        assert util.http_util.sparql_get(DUMMY_SPARQL_ENDPOINT, {}) is hedged_resp
+        release.set()
+        assert closed.wait(5)
+    finally:
+        release.set()
+        unstub()
+
+
+def test_sparql_get_hedged_first_fails(hedged_replicas):
+    """When the first replica is slower than usual and then times out, the response
+    of the second replica is used."""
+    _hedge_after(hedged_replicas[0], 0.01)
+    hedged = threading.Event()
+    hedged_resp = mock({"status_code": 200, "text": ""})
+
+    def slow_answer(*args, **kwargs):
+        assert hedged.wait(5)
+        raise Timeout()
+
+    def hedged_answer(*args, **kwargs):
+        hedged.set()
+        return hedged_resp
+
+    try:
+        when(requests.Session).get(hedged_replicas[0], **KWARGS).thenAnswer(slow_answer)
+        when(requests.Session).get(hedged_replicas[1], **KWARGS).thenAnswer(
+            hedged_answer
+        )
+        assert util.http_util.sparql_get(DUMMY_SPARQL_ENDPOINT, {}) is hedged_resp
+    finally:
+        hedged.set()
+        unstub()
+
+
+def test_sparql_get_hedged_first_wins(hedged_replicas):
+    """When the first replica answers before the second, its response is used and
+    the late response of the second replica is closed."""
+    _hedge_after(hedged_replicas[0], 0.01)
+    hedged = threading.Event()
+    release = threading.Event()
+    closed = threading.Event()
+    slow_resp = mock({"status_code": 200, "text": ""})
+    hedged_resp = mock({"status_code": 200, "text": ""})
+
+    def slow_answer(*args, **kwargs):
+        assert hedged.wait(5)
+        return slow_resp
+
+    def hedged_answer(*args, **kwargs):
+        hedged.set()
+        release.wait(5)
+        return hedged_resp
+
+    try:
+        when(requests.Session).get(hedged_replicas[0], **KWARGS).thenAnswer(slow_answer)
+        when(requests.Session).get(hedged_replicas[1], **KWARGS).thenAnswer(
+            hedged_answer
+        )
+        when(hedged_resp).close().thenAnswer(closed.set)
+        assert util.http_util.sparql_get(DUMMY_SPARQL_ENDPOINT, {}) is slow_resp
+        release.set()
+        assert closed.wait(5)
+    finally:
+        hedged.set()
+        release.set()
+        unstub()
+
+
+def test_sparql_get_hedged_fast_response(hedged_replicas):
+    """No hedged request is sent when the first replica answers in time."""
+    _hedge_after(hedged_replicas[0], 0.2)
+    resp = mock({"status_code": 200, "text": ""})
+    try:
+        when(requests.Session).get(hedged_replicas[0], **KWARGS).thenReturn(resp)
+        when(requests.Session).get(hedged_replicas[1], **KWARGS).thenReturn(resp)
+        assert util.http_util.sparql_get(DUMMY_SPARQL_ENDPOINT, {}) is resp
+        time.sleep(0.3)
+        verify(requests.Session, times=0).get(hedged_replicas[1], **KWARGS)
+    finally:
+        unstub()
+
+
+def test_sparql_get_hedged_queued(hedged_replicas, monkeypatch):
+    """The hedge delay counts from the start of the first request, so a request
+    that waits for a free worker is not hedged."""
+    monkeypatch.setitem(cfg, "SPARQL_HEDGING_WORKERS", 1)
+    _hedge_after(hedged_replicas[0], 0.2)
+    resp = mock({"status_code": 200, "text": ""})
+    busy = util.concurrency_util.get_hedging_executor().submit(time.sleep, 0.5)
+    try:
+        when(requests.Session).get(hedged_replicas[0], **KWARGS).thenReturn(resp)
+        when(requests.Session).get(hedged_replicas[1], **KWARGS).thenReturn(resp)
+        assert util.http_util.sparql_get(DUMMY_SPARQL_ENDPOINT, {}) is resp
+        assert busy.done()
+        verify(requests.Session, times=0).get(hedged_replicas[1], **KWARGS)
+    finally:
+        unstub()
+
+
+def test_sparql_get_hedged_fails_over(hedged_replicas):
+    """When the first replica fails fast, the request is sent to the second replica
+    right away instead of after the hedge delay."""
+    _hedge_after(hedged_replicas[0], 10.0)
+    resp = mock({"status_code": 200, "text": ""})
+    try:
+        when(requests.Session).get(hedged_replicas[0], **KWARGS).thenRaise(
+            ConnectionError()
+        )
+        when(requests.Session).get(hedged_replicas[1], **KWARGS).thenReturn(resp)
+        start = time.monotonic()
+        assert util.http_util.sparql_get(DUMMY_SPARQL_ENDPOINT, {}) is resp
+        assert time.monotonic() - start < 5.0
+    finally:
+        unstub()
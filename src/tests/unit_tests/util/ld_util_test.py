@@ -1,14 +1,25 @@
+import json
+import threading
+import time
 import pytest
 import requests
+from concurrent.futures import Future, ThreadPoolExecutor
 from enum import Enum
-from rdflib import Graph
+from rdflib import Graph, BNode, Literal
+from rdflib.namespace import is_ncname
 from rdflib.compare import to_isomorphic
 from requests.exceptions import ConnectionError
 from typing import List, Tuple, Union
 from mockito import when, unstub, mock, verify, KWARGS
+from config import cfg
 from models.DatasetApiUriLevel import DatasetApiUriLevel
 from models.ResourceApiUriLevel import ResourceApiUriLevel
+import util.cache_util
+import util.concurrency_util
+import util.existence_filter_util
+import util.http_util
 import util.ld_util
+import util.query_util
 
 DUMMY_BENG_DATA_DOMAIN = "http://data.beeldengeluid.nl/"  # see setting_example.py
 DUMMY_RESOURCE_ID = "1234"
@@ -21,6 +32,7 @@ DUMMY_CONSTRUCT_QUERY = (
     "?s ?p ?o FILTER(!ISBLANK(?o)) }"
 )
 DUMMY_SELECT_QUERY = "SELECT ?s ?p ?o WHERE { ?s ?p ?o }"
+DUMMY_ASK_QUERY = f"ASK {{ <{DUMMY_RESOURCE_URI}> a ?type }}"
 DUMMY_QUERY_FILENAME = "this/is/a/dummy/filename/that/is/not/used.txt"
 
 generate_lod_resource_uri_cases: List[
@@ -104,24 +116,30 @@ def test_get_lod_resource_from_rdf_store_success(
     nisv_organisation_uri,
 ):
     try:
-        resp = mock({"status_code": 200, "text": query_results_select})
-        when(requests).get(sparql_endpoint, **KWARGS).thenReturn(resp)
-        when(util.ld_util).get_query_from_file(query_fname).thenReturn(
+        resp = mock({"status_code": 200})
+        when(resp).iter_content(**KWARGS).thenReturn(
+            [query_results_select.encode("utf-8")]
+        )
+        when(requests.Session).get(sparql_endpoint, **KWARGS).thenReturn(resp)
+        when(util.query_util).get_query(query_fname, resource_url).thenReturn(
             DUMMY_SELECT_QUERY
         )
-        when(util.ld_util).sparql_select_query(
-            sparql_endpoint, DUMMY_SELECT_QUERY, format="json"
-        ).thenReturn(query_results_select)
         lod_graph = util.ld_util.get_resource_from_rdf_store(
             resource_url, sparql_endpoint, query_fname, nisv_organisation_uri
         )
 
         # returns a Graph object when successful, otherwise returns None
         assert isinstance(lod_graph, Graph)
-        verify(util.ld_util, times=1).get_query_from_file(query_fname)
-        verify(util.ld_util, times=1).sparql_select_query(
-            sparql_endpoint, DUMMY_SELECT_QUERY, format="json"
+        assert len(lod_graph) > 0
+        verify(util.query_util, times=1).get_query(query_fname, resource_url)
+        verify(requests.Session, times=1).get(
+            sparql_endpoint,
+            params={"query": DUMMY_SELECT_QUERY},
+            headers={"Accept": "application/sparql-results+json"},
+            timeout=util.http_util.get_timeout(sparql_endpoint),
+            stream=True,
         )
+        verify(resp, times=1).close()
     finally:
         unstub()
 
@@ -144,21 +162,21 @@ def test_get_lod_resource_from_rdf_store_connection_error(
     nisv_organisation_uri,
 ):
     try:
-        when(util.ld_util).get_query_from_file(query_fname).thenReturn(
+        when(util.query_util).get_query(query_fname, resource_url).thenReturn(
             DUMMY_SELECT_QUERY
         )
-        when(requests).get(sparql_endpoint, **KWARGS).thenRaise(ConnectionError)
+        when(requests.Session).get(sparql_endpoint, **KWARGS).thenRaise(ConnectionError)
 
         lod_graph = util.ld_util.get_resource_from_rdf_store(
             resource_url, sparql_endpoint, query_fname, nisv_organisation_uri
         )
         assert isinstance(lod_graph, Graph)
 
-        # requests.get is only called when there is a resource_url and sparql_endpoint
+        # the endpoint is only queried when there is a resource_url and sparql_endpoint
         if resource_url and sparql_endpoint:
-            verify(requests, atleast=1).get(sparql_endpoint, **KWARGS)
+            verify(requests.Session, atleast=1).get(sparql_endpoint, **KWARGS)
         else:
-            verify(requests, times=0).get(sparql_endpoint, **KWARGS)
+            verify(requests.Session, times=0).get(sparql_endpoint, **KWARGS)
     finally:
         unstub()
 
@@ -170,7 +188,7 @@ def test_sparql_construct_query(program_rdf_xml, sparql_endpoint, query):
     try:
         resp = mock({"status_code": 200, "text": program_rdf_xml})
         when(resp).raise_for_status().thenReturn(None)
-        when(requests).get(sparql_endpoint, **KWARGS).thenReturn(resp)
+        when(requests.Session).get(sparql_endpoint, **KWARGS).thenReturn(resp)
         g1 = util.ld_util.sparql_construct_query(sparql_endpoint, query)
         g2 = Graph()
         g2.parse(data=program_rdf_xml, format="xml")
@@ -195,7 +213,7 @@ def test_sparql_construct_entity_parsing_error(
     with pytest.raises(SAXParseException) as e_info:
         resp = mock({"status_code": 200, "text": program_12_entity_problem_xml})
         when(resp).raise_for_status().thenReturn(None)
-        when(requests).get(sparql_endpoint, **KWARGS).thenReturn(resp)
+        when(requests.Session).get(sparql_endpoint, **KWARGS).thenReturn(resp)
         util.ld_util.sparql_construct_query(sparql_endpoint, query)
 
     assert "undefined entity" in str(e_info.value)
@@ -219,9 +237,495 @@ def test_sparql_construct_entity_parsing_ok(
             }
         )
         when(resp).raise_for_status().thenReturn(None)
-        when(requests).get(sparql_endpoint, **KWARGS).thenReturn(resp)
+        when(requests.Session).get(sparql_endpoint, **KWARGS).thenReturn(resp)
         g = util.ld_util.sparql_construct_query(sparql_endpoint, query)
         assert len(g) > 0
 
     finally:
         unstub()
+
+
+@pytest.mark.parametrize(
+    "resource_types, exists",
+    [
+        (util.ld_util.NISV_CAT_RESOURCE_TYPES, True),
+        (util.ld_util.SKOS_RESOURCE_TYPES, False),
+        (None, True),
+    ],
+)
+def test_get_resource_with_type_check_from_rdf_store(
+    query_results_select, resource_types, exists
+):
+    """Given the results for a CreativeWork, the type check is done on the graph
+    that results from a single SELECT query."""
+    try:
+        when(util.query_util).get_query(
+            DUMMY_QUERY_FILENAME, DUMMY_RESOURCE_URI
+        ).thenReturn(DUMMY_SELECT_QUERY)
+        when(util.ld_util).sparql_select_bindings(
+            DUMMY_SPARQL_ENDPOINT, DUMMY_SELECT_QUERY
+        ).thenReturn(iter(json.loads(query_results_select)["results"]["bindings"]))
+
+        is_resource, lod_graph = (
+            util.ld_util.get_resource_with_type_check_from_rdf_store(
+                DUMMY_RESOURCE_URI,
+                DUMMY_SPARQL_ENDPOINT,
+                DUMMY_QUERY_FILENAME,
+                DUMMY_URI_NISV_ORGANISATION,
+                resource_types,
+            )
+        )
+        assert is_resource is exists
+        assert len(lod_graph) > 0
+        verify(util.ld_util, times=1).sparql_select_bindings(
+            DUMMY_SPARQL_ENDPOINT, DUMMY_SELECT_QUERY
+        )
+    finally:
+        unstub()
+
+
+def test_get_resource_with_type_check_from_rdf_store_not_found():
+    """A resource that doesn't exist is not queried again, while it is in the
+    not found cache."""
+    try:
+        when(util.query_util).get_query(
+            DUMMY_QUERY_FILENAME, DUMMY_RESOURCE_URI
+        ).thenReturn(DUMMY_SELECT_QUERY)
+        when(util.ld_util).sparql_select_bindings(
+            DUMMY_SPARQL_ENDPOINT, DUMMY_SELECT_QUERY
+        ).thenReturn(iter([]))
+
+        for _ in range(2):
+            is_resource, lod_graph = (
+                util.ld_util.get_resource_with_type_check_from_rdf_store(
+                    DUMMY_RESOURCE_URI,
+                    DUMMY_SPARQL_ENDPOINT,
+                    DUMMY_QUERY_FILENAME,
+                    DUMMY_URI_NISV_ORGANISATION,
+                    util.ld_util.NISV_CAT_RESOURCE_TYPES,
+                )
+            )
+            assert is_resource is False
+            assert len(lod_graph) == 0
+        verify(util.ld_util, times=1).sparql_select_bindings(
+            DUMMY_SPARQL_ENDPOINT, DUMMY_SELECT_QUERY
+        )
+        # the saved queries
+        assert util.cache_util.not_found_cache.hits == 1
+    finally:
+        unstub()
+
+
+def test_get_resource_with_type_check_from_rdf_store_connection_error():
+    """When the endpoint can't be reached, the resource is not reported as missing
+    (no 404), but an empty graph is returned."""
+    try:
+        when(util.query_util).get_query(
+            DUMMY_QUERY_FILENAME, DUMMY_RESOURCE_URI
+        ).thenReturn(DUMMY_SELECT_QUERY)
+        when(requests.Session).get(DUMMY_SPARQL_ENDPOINT, **KWARGS).thenRaise(
+            ConnectionError
+        )
+
+        is_resource, lod_graph = (
+            util.ld_util.get_resource_with_type_check_from_rdf_store(
+                DUMMY_RESOURCE_URI,
+                DUMMY_SPARQL_ENDPOINT,
+                DUMMY_QUERY_FILENAME,
+                DUMMY_URI_NISV_ORGANISATION,
+                util.ld_util.NISV_CAT_RESOURCE_TYPES,
+            )
+        )
+        assert is_resource is True
+        assert len(lod_graph) == 0
+    finally:
+        unstub()
+
+
+def _results_from_graph(rdf_graph: Graph) -> dict:
+    """Returns the SPARQL JSON results for the triples in the graph, with node IDs
+    that are not valid NCNames, like the ones the triple store returns."""
+
+    def binding(node) -> dict:
+        if isinstance(node, BNode):
+            return {
+                "type": "bnode",
+                "value": f"_:http://data.rdlabs.beeldengeluid.nl/cat/{node}",
+            }
+        if isinstance(node, Literal):
+            value = {"type": "literal", "value": str(node)}
+            if node.language:
+                value["xml:lang"] = node.language
+            elif node.datatype:
+                value["datatype"] = str(node.datatype)
+            return value
+        return {"type": "uri", "value": str(node)}
+
+    return {
+        "head": {"vars": ["s", "p", "o"]},
+        "results": {
+            "bindings": [
+                {"s": binding(s), "p": binding(p), "o": binding(o)}
+                for s, p, o in rdf_graph
+            ]
+        },
+    }
+
+
+def test_convert_results_to_graph(rdf_from_ld_util):
+    """Given the SPARQL results for the triples in the compare graph, the converted
+    graph is the same graph (up to the blank node IDs), the blank node IDs are
+    valid and the same results always give the same blank node IDs."""
+    results = _results_from_graph(rdf_from_ld_util)
+    assert any(isinstance(s, BNode) for s in rdf_from_ld_util.subjects())
+
+    bindings = results["results"]["bindings"]
+    g1 = util.ld_util._convert_results_to_graph(bindings, DUMMY_RESOURCE_URI)
+    g2 = util.ld_util._convert_results_to_graph(bindings, DUMMY_RESOURCE_URI)
+
+    assert to_isomorphic(g1) == to_isomorphic(rdf_from_ld_util)
+    assert set(g1) == set(g2)
+    assert all(is_ncname(str(s)) for s in g1.subjects() if isinstance(s, BNode))
+    # the graph can be serialized and parsed without losing triples
+    assert to_isomorphic(
+        Graph().parse(data=g1.serialize(format="turtle"), format="turtle")
+    ) == to_isomorphic(g1)
+
+
+def test_convert_results_to_graph_select_results(query_results_select):
+    results = json.loads(query_results_select)
+    g = util.ld_util._convert_results_to_graph(
+        results["results"]["bindings"], DUMMY_RESOURCE_URI
+    )
+
+    assert len(g) > 0
+    assert all(is_ncname(str(o)) for o in g.objects() if isinstance(o, BNode))
+    assert to_isomorphic(
+        Graph().parse(data=g.serialize(format="turtle"), format="turtle")
+    ) == to_isomorphic(g)
+
+
+def test_get_resource_from_rdf_store_cached(query_results_select):
+    """The second time a resource is requested, the graph comes from the cache."""
+    try:
+        when(util.query_util).get_query(
+            DUMMY_QUERY_FILENAME, DUMMY_RESOURCE_URI
+        ).thenReturn(DUMMY_SELECT_QUERY)
+        when(util.ld_util).sparql_select_bindings(
+            DUMMY_SPARQL_ENDPOINT, DUMMY_SELECT_QUERY
+        ).thenReturn(iter(json.loads(query_results_select)["results"]["bindings"]))
+        hits = util.cache_util.graph_cache.hits
+
+        g1 = util.ld_util.get_resource_from_rdf_store(
+            DUMMY_RESOURCE_URI,
+            DUMMY_SPARQL_ENDPOINT,
+            DUMMY_QUERY_FILENAME,
+            DUMMY_URI_NISV_ORGANISATION,
+        )
+        g2 = util.ld_util.get_resource_from_rdf_store(
+            DUMMY_RESOURCE_URI,
+            DUMMY_SPARQL_ENDPOINT,
+            DUMMY_QUERY_FILENAME,
+            DUMMY_URI_NISV_ORGANISATION,
+        )
+        assert len(g1) > 0
+        assert g2 is g1
+        assert util.cache_util.graph_cache.hits == hits + 1
+        verify(util.ld_util, times=1).sparql_select_bindings(
+            DUMMY_SPARQL_ENDPOINT, DUMMY_SELECT_QUERY
+        )
+    finally:
+        unstub()
+
+
+def test_get_inverse_relations_from_rdf_store_cached():
+    try:
+        when(util.query_util).get_query(...).thenReturn(DUMMY_SELECT_QUERY)
+        when(util.ld_util).sparql_select_bindings(
+            DUMMY_SPARQL_ENDPOINT, DUMMY_SELECT_QUERY
+        ).thenReturn(iter([]))
+
+        g1 = util.ld_util.get_inverse_relations_from_rdf_store(
+            DUMMY_RESOURCE_URI, DUMMY_SPARQL_ENDPOINT
+        )
+        g2 = util.ld_util.get_inverse_relations_from_rdf_store(
+            DUMMY_RESOURCE_URI, DUMMY_SPARQL_ENDPOINT
+        )
+        assert g2 is g1
+        verify(util.ld_util, times=1).sparql_select_bindings(
+            DUMMY_SPARQL_ENDPOINT, DUMMY_SELECT_QUERY
+        )
+    finally:
+        unstub()
+
+
+@pytest.mark.parametrize("exists", [True, False])
+def test_is_nisv_cat_resource(exists: bool):
+    """Only a negative outcome of the ASK query is cached."""
+    try:
+        when(util.query_util).get_query(...).thenReturn(DUMMY_ASK_QUERY)
+        when(util.ld_util).sparql_ask_query(
+            DUMMY_SPARQL_ENDPOINT, DUMMY_ASK_QUERY
+        ).thenReturn(exists)
+
+        for _ in range(2):
+            assert (
+                util.ld_util.is_nisv_cat_resource(
+                    DUMMY_RESOURCE_URI, DUMMY_SPARQL_ENDPOINT
+                )
+                is exists
+            )
+        verify(util.ld_util, times=2 if exists else 1).sparql_ask_query(
+            DUMMY_SPARQL_ENDPOINT, DUMMY_ASK_QUERY
+        )
+    finally:
+        unstub()
+
+
+def test_get_resource_with_type_check_from_rdf_store_existence_filter():
+    """A resource that is not in the existence filter is not queried."""
+    try:
+        when(util.existence_filter_util).may_exist(DUMMY_RESOURCE_URI).thenReturn(False)
+        when(util.ld_util).sparql_select_bindings(...).thenReturn(iter([]))
+
+        is_resource, lod_graph = (
+            util.ld_util.get_resource_with_type_check_from_rdf_store(
+                DUMMY_RESOURCE_URI,
+                DUMMY_SPARQL_ENDPOINT,
+                DUMMY_QUERY_FILENAME,
+                DUMMY_URI_NISV_ORGANISATION,
+                util.ld_util.NISV_CAT_RESOURCE_TYPES,
+            )
+        )
+        assert is_resource is False
+        assert len(lod_graph) == 0
+        verify(util.ld_util, times=0).sparql_select_bindings(...)
+    finally:
+        unstub()
+
+
+def test_refresh_resource_graph():
+    """The graph is queried again, also when it is cached."""
+    refreshed = []
+    cached_graph = Graph().add((BNode(), BNode(), Literal("cached")))
+    util.cache_util.graph_cache.set(
+        (
+            "resource",
+            DUMMY_RESOURCE_URI,
+            DUMMY_SPARQL_ENDPOINT,
+            DUMMY_QUERY_FILENAME,
+            DUMMY_URI_NISV_ORGANISATION,
+        ),
+        cached_graph,
+    )
+    try:
+        when(util.query_util).get_query(
+            DUMMY_QUERY_FILENAME, DUMMY_RESOURCE_URI
+        ).thenReturn(DUMMY_SELECT_QUERY)
+        when(util.ld_util).sparql_select_bindings(
+            DUMMY_SPARQL_ENDPOINT, DUMMY_SELECT_QUERY
+        ).thenReturn(iter([]))
+        future = util.ld_util.refresh_resource_graph(
+            DUMMY_RESOURCE_URI,
+            DUMMY_SPARQL_ENDPOINT,
+            DUMMY_QUERY_FILENAME,
+            DUMMY_URI_NISV_ORGANISATION,
+            lambda: refreshed.append(True),
+        )
+        future.result()
+        assert refreshed == [True]
+        verify(util.ld_util, times=1).sparql_select_bindings(
+            DUMMY_SPARQL_ENDPOINT, DUMMY_SELECT_QUERY
+        )
+    finally:
+        unstub()
+
+
+def test_refresh_resource_graph_error():
+    """When querying fails, the refresh is not reported as done."""
+    refreshed = []
+    try:
+        when(util.query_util).get_query(
+            DUMMY_QUERY_FILENAME, DUMMY_RESOURCE_URI
+        ).thenReturn(DUMMY_SELECT_QUERY)
+        when(util.ld_util).sparql_select_bindings(
+            DUMMY_SPARQL_ENDPOINT, DUMMY_SELECT_QUERY
+        ).thenRaise(ConnectionError)
+        future = util.ld_util.refresh_resource_graph(
+            DUMMY_RESOURCE_URI,
+            DUMMY_SPARQL_ENDPOINT,
+            DUMMY_QUERY_FILENAME,
+            DUMMY_URI_NISV_ORGANISATION,
+            lambda: refreshed.append(True),
+        )
+        future.result()
+        assert refreshed == []
+        assert not util.ld_util._refreshing
+    finally:
+        unstub()
+
+
+def test_get_resource_graph_single_flight(query_results_select):
+    """Concurrent requests for the same resource share one query and graph."""
+    started = threading.Event()
+    release = threading.Event()
+    shared = util.ld_util._in_flight.shared
+
+    def answer(*args):
+        started.set()
+        release.wait(5)
+        return iter(json.loads(query_results_select)["results"]["bindings"])
+
+    args = (
+        DUMMY_RESOURCE_URI,
+        DUMMY_SPARQL_ENDPOINT,
+        DUMMY_QUERY_FILENAME,
+        DUMMY_URI_NISV_ORGANISATION,
+    )
+    try:
+        when(util.query_util).get_query(
+            DUMMY_QUERY_FILENAME, DUMMY_RESOURCE_URI
+        ).thenReturn(DUMMY_SELECT_QUERY)
+        when(util.ld_util).sparql_select_bindings(
+            DUMMY_SPARQL_ENDPOINT, DUMMY_SELECT_QUERY
+        ).thenAnswer(answer)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            first = executor.submit(util.ld_util._get_resource_graph, *args)
+            started.wait(5)
+            second = executor.submit(util.ld_util._get_resource_graph, *args)
+            while util.ld_util._in_flight.shared == shared:
+                time.sleep(0.01)
+            release.set()
+            assert first.result() is second.result()
+        verify(util.ld_util, times=1).sparql_select_bindings(
+            DUMMY_SPARQL_ENDPOINT, DUMMY_SELECT_QUERY
+        )
+    finally:
+        unstub()
+
+
+def test_get_resources_from_rdf_store(query_results_select):
+    """Given a batch size of 1, every resource is queried in its own batch. A
+    resource without results is skipped, a cached graph is not queried again."""
+    other_uri = f"{DUMMY_RESOURCE_URI}5"
+    queries = []
+
+    def answer(sparql_endpoint, query):
+        queries.append(query)
+        if f"<{DUMMY_RESOURCE_URI}>" not in query:
+            return iter([])
+        bindings = json.loads(query_results_select)["results"]["bindings"]
+        for binding in bindings:
+            binding["resource_iri"] = {"type": "uri", "value": DUMMY_RESOURCE_URI}
+        return iter(bindings)
+
+    resources = [
+        (DUMMY_RESOURCE_URI, util.ld_util.NISV_CAT_RESOURCE_TYPES),
+        (other_uri, util.ld_util.NISV_CAT_RESOURCE_TYPES),
+    ]
+    try:
+        when(util.query_util).get_query_template(DUMMY_QUERY_FILENAME).thenReturn(
+            util.query_util.QueryTemplate(
+                "SELECT ?s ?p ?o WHERE { ?resource_iri ?p ?o }"
+            )
+        )
+        when(util.ld_util).sparql_select_bindings(
+            DUMMY_SPARQL_ENDPOINT, ...
+        ).thenAnswer(answer)
+
+        for expected_queries in (2, 3):
+            results = list(
+                util.ld_util.get_resources_from_rdf_store(
+                    resources,
+                    DUMMY_SPARQL_ENDPOINT,
+                    DUMMY_QUERY_FILENAME,
+                    DUMMY_URI_NISV_ORGANISATION,
+                    1,
+                )
+            )
+            assert [resource_url for resource_url, _ in results] == [DUMMY_RESOURCE_URI]
+            assert len(results[0][1]) > 0
+            assert len(queries) == expected_queries
+        assert f"<{other_uri}>" in queries[-1]
+    finally:
+        unstub()
+
+
+@pytest.mark.parametrize(
+    "max_rows, rows, expected_offsets",
+    [
+        (100000, 1, []),  # the results don't fill the LIMIT
+        (100000, 7, [0, 2, 4, 6]),  # the page at offset 6 is not full
+        (100000, 10, [0, 2, 4, 6, 8, 10, 12, 14]),  # two rounds of pages
+        (4, 10, [0, 2]),  # truncated
+        (2, 10, []),  # no more than the LIMIT
+    ],
+)
+def test_sparql_select_all_bindings(
+    monkeypatch, max_rows: int, rows: int, expected_offsets: List[int]
+):
+    """Given results that fill the LIMIT of 2, the results are queried in pages of
+    2 (4 at a time), until a page is not full or max_rows is reached (the pages
+    after a page that is not full are cancelled, if they didn't start yet)."""
+    monkeypatch.setitem(cfg, "QUERY_PAGING_WORKERS", 4)
+    monkeypatch.setitem(cfg, "QUERY_PAGING_MAX_ROWS", max_rows)
+    query = "SELECT ?s WHERE { ?s ?p ?o } LIMIT 2"
+    offsets = []
+
+    def answer(sparql_endpoint, page_query):
+        offset = 0
+        if page_query != query:
+            offset = int(page_query.rsplit("OFFSET ", 1)[1])
+            offsets.append(offset)
+        return iter([{"n": n} for n in range(offset, min(offset + 2, rows))])
+
+    try:
+        when(util.ld_util).sparql_select_bindings(
+            DUMMY_SPARQL_ENDPOINT, ...
+        ).thenAnswer(answer)
+        bindings = list(
+            util.ld_util.sparql_select_all_bindings(DUMMY_SPARQL_ENDPOINT, query)
+        )
+        assert len(offsets) == len(set(offsets))
+        assert {o for o in expected_offsets if o <= rows} <= set(offsets)
+        assert set(offsets) <= set(expected_offsets)
+        all_rows = {binding["n"] for binding in bindings}
+        assert all_rows == set(range(min(rows, max(max_rows, 2))))
+    finally:
+        unstub()
+
+
+def test_sparql_select_all_bindings_cancels_pages(monkeypatch):
+    """Given a page that is not full, the pages after it that didn't start yet
+    are cancelled."""
+    monkeypatch.setitem(cfg, "QUERY_PAGING_WORKERS", 4)
+    query = "SELECT ?s WHERE { ?s ?p ?o } LIMIT 2"
+    pages: List[Future] = []
+
+    class StartsTwoPages:
+        """Runs the first two pages, the other pages wait for a worker."""
+
+        def submit(self, fn, *args):
+            page: Future = Future()
+            if len(pages) < 2:
+                page.set_result(fn(*args))
+            pages.append(page)
+            return page
+
+    def answer(sparql_endpoint, page_query):
+        rows = 2 if page_query == query or page_query.endswith("OFFSET 0") else 1
+        return iter([{"n": n} for n in range(rows)])
+
+    try:
+        when(util.concurrency_util).get_paging_executor().thenReturn(StartsTwoPages())
+        when(util.ld_util).sparql_select_bindings(
+            DUMMY_SPARQL_ENDPOINT, ...
+        ).thenAnswer(answer)
+        bindings = list(
+            util.ld_util.sparql_select_all_bindings(DUMMY_SPARQL_ENDPOINT, query)
+        )
+        assert len(bindings) == 5
+        assert len(pages) == 4
+        assert [page.cancelled() for page in pages] == [False, False, True, True]
+    finally:
+        unstub()
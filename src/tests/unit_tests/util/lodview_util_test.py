@@ -1,7 +1,9 @@
 import pytest
+from concurrent.futures import Future
 from rdflib import Graph, URIRef, Literal, BNode
 from rdflib.namespace import RDF, RDFS, SKOS, SDO, DCTERMS  # type: ignore
-from mockito import unstub
+from mockito import when, unstub, verify
+import util.ld_util
 import util.lodview_util
 
 DUMMY_BENG_DATA_DOMAIN = "http://data.beeldengeluid.nl/"  # see setting_example.py
@@ -204,6 +206,76 @@ def test_get_lod_view_resource(
         assert resource_id_in_header in html_content  # resource IRI should be in header
 
 
+def test_get_lod_view_resource_with_inverse_relations(
+    flask_test_client,
+    application_settings,
+    program_rdf_graph,
+):
+    """Given an app context and a Future for the inverse relations, generate a full
+    HTML page for the lod view page, without querying the SPARQL endpoint."""
+    with flask_test_client.application.app_context():
+        resource_iri = str(
+            program_rdf_graph.value(predicate=RDF.type, object=SDO.CreativeWork)
+        )
+        inverse_relations: Future = Future()
+        inverse_relations.set_result([])
+        try:
+            when(util.ld_util).ask_for_inverse_relations(...).thenReturn(True)
+            when(util.ld_util).get_inverse_relations_from_rdf_store(...).thenReturn(
+                Graph()
+            )
+            html_content = util.lodview_util.get_lod_view_resource(
+                program_rdf_graph,
+                resource_iri,
+                application_settings.get("SPARQL_ENDPOINT", ""),
+                inverse_relations=inverse_relations,
+            )
+            assert "<!doctype html>" in html_content
+            verify(util.ld_util, times=0).ask_for_inverse_relations(...)
+            verify(util.ld_util, times=0).get_inverse_relations_from_rdf_store(...)
+        finally:
+            unstub()
+
+
+def test_submit_inverse_relations_for_resource(application_settings):
+    """Given a stubbed inverse relations query, check that the Future returns the
+    JSON structure for the inverse relations."""
+    sparql_endpoint = application_settings.get("SPARQL_ENDPOINT", "")
+    inverse_graph = Graph()
+    inverse_graph.add(
+        (
+            URIRef(f"{DUMMY_BENG_DATA_DOMAIN}id/program/1"),
+            SDO.hasPart,
+            URIRef(DUMMY_RESOURCE_URI),
+        )
+    )
+    try:
+        when(util.ld_util).get_inverse_relations_from_rdf_store(
+            DUMMY_RESOURCE_URI, sparql_endpoint
+        ).thenReturn(inverse_graph)
+        when(util.ld_util).ask_for_inverse_relations(...).thenReturn(True)
+
+        future = util.lodview_util.submit_inverse_relations_for_resource(
+            DUMMY_RESOURCE_URI, sparql_endpoint
+        )
+        json_inverse_relations = future.result(timeout=5)
+
+        assert json_inverse_relations == (
+            util.lodview_util.json_inverse_relations_from_rdf_graph(
+                inverse_graph, DUMMY_RESOURCE_URI
+            )
+        )
+        assert len(json_inverse_relations) == 1
+        assert json_inverse_relations[0]["p"]["uri"] == str(SDO.hasPart)
+        assert json_inverse_relations[0]["count"] == 1
+        assert json_inverse_relations[0]["resources"][0]["s"]["uri"] == (
+            f"{DUMMY_BENG_DATA_DOMAIN}id/program/1"
+        )
+        verify(util.ld_util, times=0).ask_for_inverse_relations(...)
+    finally:
+        unstub()
+
+
 @pytest.mark.parametrize(
     "iri,expected",
     [
@@ -236,6 +308,24 @@ def test_json_parts_from_IRI(iri: str, expected: dict):
     assert result == expected
 
 
+def test_json_parts_from_IRI_does_not_bind_prefixes():
+    """No prefix is bound in the (possibly cached and shared) graph for an IRI in
+    a namespace without a prefix."""
+    g = Graph()
+    namespaces = list(g.namespaces())
+    assert util.lodview_util.json_parts_from_IRI(g, "http://example.org/ns#p") == {
+        "uri": "http://example.org/ns#p",
+        "prefix": "",
+        "namespace": "http://example.org/ns#",
+        "property": "p",
+    }
+    datatype = util.lodview_util.json_for_datatype(
+        g, URIRef("http://example.org/types#t")
+    )
+    assert datatype["datatype"]["prefix"] == ""
+    assert list(g.namespaces()) == namespaces
+
+
 @pytest.mark.parametrize(
     "label_type", [RDFS.label, SKOS.prefLabel, SDO.name, DCTERMS.title]
 )
@@ -0,0 +1,158 @@
+import pytest
+from mockito import when, unstub, verify
+import util.query_util
+from util.query_util import QueryTemplate
+
+DUMMY_RESOURCE_URI = "http://data.beeldengeluid.nl/id/program/1234"
+DUMMY_QUERY_FILENAME = "this/is/a/dummy/filename/that/is/not/used.rq"
+
+
+@pytest.mark.parametrize(
+    "iri, expected",
+    [
+        (DUMMY_RESOURCE_URI, f"<{DUMMY_RESOURCE_URI}>"),
+        (
+            "http://example.org/a> ?p ?o } #",
+            "<http://example.org/a%3E%20?p%20?o%20%7D%20#>",
+        ),
+        ('http://example.org/"quoted"', "<http://example.org/%22quoted%22>"),
+        ("http://example.org/a\nb", "<http://example.org/a%0Ab>"),
+    ],
+)
+def test_sparql_iri(iri: str, expected: str):
+    assert util.query_util.sparql_iri(iri) == expected
+
+
+def test_query_template_bind():
+    query_template = QueryTemplate(
+        "SELECT * WHERE { ?resource_iri ?p ?o . ?s ?p1 ?resource_iri }"
+    )
+    assert query_template.has_placeholder
+    assert query_template.bind(DUMMY_RESOURCE_URI) == (
+        f"SELECT * WHERE {{ <{DUMMY_RESOURCE_URI}> ?p ?o . ?s ?p1 <{DUMMY_RESOURCE_URI}> }}"
+    )
+    # a variable that starts with resource_iri is not the placeholder
+    assert not QueryTemplate("ASK { ?resource_iri_2 ?p ?o }").has_placeholder
+
+
+def test_query_template_bind_values():
+    """The results of the query tell to which resource they belong, and the LIMIT
+    is per resource."""
+    query_template = QueryTemplate(
+        "PREFIX sdo: <https://schema.org/>\n"
+        "SELECT DISTINCT ?s ?p ?o WHERE {\n ?resource_iri ?p ?o } LIMIT 100"
+    )
+    other_uri = f"{DUMMY_RESOURCE_URI}_2"
+    assert query_template.bind_values([DUMMY_RESOURCE_URI, other_uri]) == (
+        "PREFIX sdo: <https://schema.org/>\n"
+        "SELECT DISTINCT ?resource_iri ?s ?p ?o WHERE {\n"
+        f"    VALUES ?resource_iri {{ <{DUMMY_RESOURCE_URI}> <{other_uri}> }}\n"
+        " ?resource_iri ?p ?o } LIMIT 200"
+    )
+    with pytest.raises(ValueError):
+        QueryTemplate("ASK { ?resource_iri ?p ?o }").bind_values([DUMMY_RESOURCE_URI])
+
+
+@pytest.mark.parametrize(
+    "query, expected",
+    [
+        ("SELECT ?s WHERE { ?s ?p ?o } LIMIT 1000\n", 1000),
+        ("SELECT ?s WHERE { ?s ?p ?o } LIMIT 10 OFFSET 20", None),
+        ("SELECT ?s WHERE { ?s ?p ?o }", None),
+    ],
+)
+def test_query_limit(query: str, expected):
+    assert util.query_util.query_limit(query) == expected
+
+
+@pytest.mark.parametrize(
+    "query, expected",
+    [
+        (
+            "SELECT DISTINCT ?s ?p ?o WHERE { ?s ?p ?o } LIMIT 1000",
+            "SELECT DISTINCT ?s ?p ?o WHERE { ?s ?p ?o } "
+            "ORDER BY ?s ?p ?o\nLIMIT 1000 OFFSET 2000",
+        ),
+        (
+            "SELECT ?s WHERE { ?s ?p ?o } ORDER BY DESC(?s) LIMIT 1000",
+            "SELECT ?s WHERE { ?s ?p ?o } ORDER BY DESC(?s) LIMIT 1000 OFFSET 2000",
+        ),
+        (
+            "SELECT DISTINCT ?s ?p\n{ ?s ?p ?o } LIMIT 1000",
+            "SELECT DISTINCT ?s ?p\n{ ?s ?p ?o } ORDER BY ?s ?p\nLIMIT 1000 OFFSET 2000",
+        ),
+    ],
+)
+def test_page_query(query: str, expected: str):
+    assert util.query_util.page_query(query, 2000) == expected
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "SELECT ?s WHERE { ?s ?p ?o }",
+        "SELECT * WHERE { ?s ?p ?o } LIMIT 1000",
+        "ASK { ?s ?p ?o }",
+    ],
+)
+def test_page_query_invalid(query: str):
+    with pytest.raises(ValueError):
+        util.query_util.page_query(query, 0)
+
+
+def test_load_queries(application_settings):
+    """All configured query files can be loaded and bound."""
+    util.query_util.load_queries(application_settings)
+    for setting in util.query_util.QUERY_SETTINGS:
+        filepath = application_settings.get(setting)
+        if filepath:
+            query = util.query_util.get_query(filepath, DUMMY_RESOURCE_URI)
+            assert f"<{DUMMY_RESOURCE_URI}>" in query
+            assert "?resource_iri" not in query
+
+
+@pytest.mark.parametrize(
+    "setting",
+    [
+        "BENG_LOD_RESOURCE_QUERY",
+        "INVERSE_RELATIONS_QUERY",
+        "MUZIEKWEB_LOD_RESOURCE_QUERY",
+    ],
+)
+def test_page_configured_queries(setting: str, application_settings):
+    """The configured SELECT queries can be paged and bound to multiple IRIs."""
+    query_template = util.query_util.load_query_template(application_settings[setting])
+    query = query_template.bind(DUMMY_RESOURCE_URI)
+    limit = util.query_util.query_limit(query)
+    assert limit is not None
+    assert util.query_util.page_query(query, limit).endswith(
+        f"LIMIT {limit} OFFSET {limit}"
+    )
+    assert "VALUES ?resource_iri" in query_template.bind_values([DUMMY_RESOURCE_URI])
+
+
+@pytest.mark.parametrize(
+    "query", ["", "   \n", "SELECT * WHERE { <http://example.org/> ?p ?o }"]
+)
+def test_load_query_template_invalid(query: str):
+    try:
+        when(util.query_util).read_query_file(DUMMY_QUERY_FILENAME).thenReturn(query)
+        with pytest.raises(ValueError):
+            util.query_util.load_query_template(DUMMY_QUERY_FILENAME)
+    finally:
+        unstub()
+
+
+def test_get_query_template_reads_file_once():
+    try:
+        when(util.query_util).read_query_file(DUMMY_QUERY_FILENAME).thenReturn(
+            "ASK { ?resource_iri ?p ?o }"
+        )
+        query_template = util.query_util.get_query_template(DUMMY_QUERY_FILENAME)
+        assert util.query_util.get_query_template(DUMMY_QUERY_FILENAME) is (
+            query_template
+        )
+        verify(util.query_util, times=1).read_query_file(DUMMY_QUERY_FILENAME)
+    finally:
+        util.query_util._registry.pop(DUMMY_QUERY_FILENAME, None)
+        unstub()
@@ -0,0 +1,200 @@
+import gzip
+import pytest
+from concurrent.futures import Future
+from datetime import datetime, timezone
+from flask import Flask, Response
+from mockito import when, unstub
+from rdflib import Graph
+from rdflib.namespace import RDF
+from util.mime_type_util import MimeType
+import util.response_util
+
+DUMMY_RESOURCE_URI = "http://data.beeldengeluid.nl/id/program/1234"
+DUMMY_BODY = "<http://data.beeldengeluid.nl/id/program/1234> a <https://schema.org/CreativeWork> ."
+
+
+def test_cache_response():
+    response = Response(DUMMY_BODY, mimetype=MimeType.TURTLE.value)
+    assert (
+        util.response_util.cache_response(DUMMY_RESOURCE_URI, MimeType.TURTLE, response)
+        is response
+    )
+
+    cached_response = util.response_util.get_cached_response(
+        DUMMY_RESOURCE_URI, MimeType.TURTLE
+    )
+    assert isinstance(cached_response, Response)
+    assert cached_response is not response
+    assert cached_response.get_data(as_text=True) == DUMMY_BODY
+    assert cached_response.content_type == response.content_type
+
+    # another representation of the resource is not cached
+    assert (
+        util.response_util.get_cached_response(DUMMY_RESOURCE_URI, MimeType.JSON_LD)
+        is None
+    )
+
+
+def test_cache_response_error():
+    error_response = ({"message": "Resource not found"}, 404, None)
+    assert (
+        util.response_util.cache_response(
+            DUMMY_RESOURCE_URI, MimeType.TURTLE, error_response
+        )
+        is error_response
+    )
+    util.response_util.cache_response(
+        DUMMY_RESOURCE_URI,
+        MimeType.TURTLE,
+        Response(DUMMY_BODY, mimetype=MimeType.TURTLE.value, status=500),
+    )
+    assert (
+        util.response_util.get_cached_response(DUMMY_RESOURCE_URI, MimeType.TURTLE)
+        is None
+    )
+
+
+def test_graph_etag():
+    """The ETag is the same for the same triples, with other blank node IDs, and
+    differs per mime type."""
+    data = f"<{DUMMY_RESOURCE_URI}> <https://schema.org/hasPart> [ a <https://schema.org/Clip> ] ."
+    g1 = Graph().parse(data=data, format="turtle")
+    g2 = Graph().parse(data=data, format="turtle")
+    assert set(g1.subjects(RDF.type)) != set(g2.subjects(RDF.type))
+    etag = util.response_util.graph_etag(g1, MimeType.TURTLE)
+    assert util.response_util.graph_etag(g2, MimeType.TURTLE) == etag
+    assert util.response_util.graph_etag(g1, MimeType.JSON_LD) != etag
+
+
+@pytest.mark.parametrize(
+    "compressed",
+    [(), (("gzip", b"\x1f\x8b\n"),), (("br", b"\n\n"), ("gzip", b"\x1f\x8b"))],
+)
+def test_encode_decode(compressed):
+    cached_response = util.response_util.CachedResponse(
+        b"line 1\nline 2\n", "text/turtle; charset=utf-8", "0123abcd", compressed
+    )
+    assert (
+        util.response_util._decode(util.response_util._encode(cached_response))
+        == cached_response
+    )
+
+
+def test_conditional_response():
+    etag = util.response_util.version_etag(DUMMY_RESOURCE_URI, MimeType.TURTLE, "v1")
+    app = Flask(__name__)
+
+    def render():
+        return Response(DUMMY_BODY, mimetype=MimeType.TURTLE.value)
+
+    with app.test_request_context(headers={"If-None-Match": f'W/"{etag}"'}):
+        pending: Future = Future()
+        response = util.response_util.conditional_response(
+            DUMMY_RESOURCE_URI, MimeType.TURTLE, etag, render, pending=pending
+        )
+        assert response.status_code == 304
+        assert pending.cancelled()
+
+    with app.test_request_context(headers={"If-None-Match": '"another-etag"'}):
+        response = util.response_util.conditional_response(
+            DUMMY_RESOURCE_URI, MimeType.TURTLE, etag, render
+        )
+        assert response.status_code == 200
+        assert response.headers["ETag"] == f'W/"{etag}"'
+
+        # the cached response has the same ETag
+        cached_response = util.response_util.get_cached_response(
+            DUMMY_RESOURCE_URI, MimeType.TURTLE
+        )
+        assert cached_response.status_code == 200
+        assert cached_response.headers["ETag"] == f'W/"{etag}"'
+
+
+def test_get_cached_response_not_modified_since():
+    etag = util.response_util.version_etag(DUMMY_RESOURCE_URI, MimeType.TURTLE, "v1")
+    last_modified = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    util.response_util.cache_response(
+        DUMMY_RESOURCE_URI,
+        MimeType.TURTLE,
+        Response(DUMMY_BODY, mimetype=MimeType.TURTLE.value),
+        "v1",
+        etag,
+        last_modified,
+    )
+    app = Flask(__name__)
+    headers = {"If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT"}
+    with app.test_request_context(headers=headers):
+        response = util.response_util.get_cached_response(
+            DUMMY_RESOURCE_URI, MimeType.TURTLE, "v1", last_modified
+        )
+        assert response.status_code == 304
+        assert response.last_modified == last_modified
+
+    headers = {"If-Modified-Since": "Sun, 31 Dec 2023 00:00:00 GMT"}
+    with app.test_request_context(headers=headers):
+        response = util.response_util.get_cached_response(
+            DUMMY_RESOURCE_URI, MimeType.TURTLE, "v1", last_modified
+        )
+        assert response.status_code == 200
+        assert response.get_data(as_text=True) == DUMMY_BODY
+
+
+def test_get_cached_response_stale():
+    """A stale response is only returned with a refresh, which gets the function
+    to remove the stale response when the refresh is done."""
+    util.response_util.cache_response(
+        DUMMY_RESOURCE_URI,
+        MimeType.TURTLE,
+        Response(DUMMY_BODY, mimetype=MimeType.TURTLE.value),
+    )
+    cache = util.response_util.response_cache
+    refreshes: list = []
+    try:
+        when(cache).is_stale(...).thenReturn(True)
+        assert (
+            util.response_util.get_cached_response(DUMMY_RESOURCE_URI, MimeType.TURTLE)
+            is None
+        )
+
+        response = util.response_util.get_cached_response(
+            DUMMY_RESOURCE_URI, MimeType.TURTLE, refresh=refreshes.append
+        )
+        assert response.get_data(as_text=True) == DUMMY_BODY
+        assert response.headers["Warning"] == util.response_util.STALE_WARNING
+        assert int(response.headers["Age"]) >= 0
+        assert len(refreshes) == 1
+    finally:
+        unstub()
+
+    refreshes[0]()
+    assert cache.get_with_age((DUMMY_RESOURCE_URI, MimeType.TURTLE.value, "")) is None
+
+
+def test_cache_response_compressed():
+    """The response is compressed once, when it is cached, and served in the
+    content coding that the client accepts."""
+    body = DUMMY_BODY * 100
+    app = Flask(__name__)
+    with app.test_request_context(headers={"Accept-Encoding": "gzip"}):
+        response = util.response_util.cache_response(
+            DUMMY_RESOURCE_URI,
+            MimeType.TURTLE,
+            Response(body, mimetype=MimeType.TURTLE.value),
+        )
+        assert response.content_encoding == "gzip"
+        assert "Accept-Encoding" in response.vary
+        assert gzip.decompress(response.get_data()).decode("utf-8") == body
+
+        cached_response = util.response_util.get_cached_response(
+            DUMMY_RESOURCE_URI, MimeType.TURTLE
+        )
+        assert cached_response.content_encoding == "gzip"
+        assert cached_response.get_data() == response.get_data()
+
+    with app.test_request_context(headers={"Accept-Encoding": "identity"}):
+        cached_response = util.response_util.get_cached_response(
+            DUMMY_RESOURCE_URI, MimeType.TURTLE
+        )
+        assert cached_response.content_encoding is None
+        assert "Accept-Encoding" in cached_response.vary
+        assert cached_response.get_data(as_text=True) == body
@@ -0,0 +1,63 @@
+import json
+import pytest
+from typing import List
+import util.sparql_results_util
+
+
+def _chunks(data: bytes, chunk_size: int) -> List[bytes]:
+    return [data[i : i + chunk_size] for i in range(0, len(data), chunk_size)]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 64 * 1024])
+def test_iter_bindings(query_results_select, chunk_size: int):
+    """Given the results in chunks of any size (also splitting UTF-8 characters and
+    numbers), the bindings are the same as the bindings from json.loads."""
+    chunks = _chunks(query_results_select.encode("utf-8"), chunk_size)
+    bindings = list(util.sparql_results_util.iter_bindings(chunks))
+    assert bindings == json.loads(query_results_select)["results"]["bindings"]
+
+
+def test_iter_bindings_is_incremental(query_results_select):
+    """The first binding is yielded before the last chunk is read."""
+    chunks = _chunks(query_results_select.encode("utf-8"), 64)
+    chunks_read = []
+
+    def read_chunks():
+        for chunk in chunks:
+            chunks_read.append(chunk)
+            yield chunk
+
+    first_binding = next(util.sparql_results_util.iter_bindings(read_chunks()))
+    assert first_binding == json.loads(query_results_select)["results"]["bindings"][0]
+    assert len(chunks_read) < len(chunks)
+
+
+@pytest.mark.parametrize(
+    "results, expected",
+    [
+        ('{"head": {"vars": ["s"]}, "results": {"bindings": []}}', []),
+        (
+            '{"results": {"distinct": false, "bindings": [{"n": 12345}]}}',
+            [{"n": 12345}],
+        ),
+        ('{"head": {"vars": ["bindings"]}, "boolean": true}', []),
+        (' \n{ "results" : { "bindings" : [ { } , { } ] } } \n', [{}, {}]),
+    ],
+)
+def test_iter_bindings_structure(results: str, expected: list):
+    chunks = _chunks(results.encode("utf-8"), 3)
+    assert list(util.sparql_results_util.iter_bindings(chunks)) == expected
+
+
+@pytest.mark.parametrize(
+    "results",
+    [
+        "",
+        "[]",
+        '{"results": {"bindings": [{"s": 1} {"s": 2}]}}',
+        '{"results": {"bindings": [{"s": 1}',
+    ],
+)
+def test_iter_bindings_invalid(results: str):
+    with pytest.raises(ValueError):
+        list(util.sparql_results_util.iter_bindings([results.encode("utf-8")]))
@@ -6,6 +6,8 @@ ERROR_RESPONSES = {
     },
     "not_found": {"msg": "Resource not found", "code": 404},
     "internal_server_error": {"msg": "Internal server error", "code": 500},
+    "bad_gateway": {"msg": "Bad gateway", "code": 502},
+    "gateway_timeout": {"msg": "Gateway timeout", "code": 504},
 }
 
 
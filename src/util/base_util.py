@@ -44,12 +44,35 @@ def validate_config(config, validate_file_paths=True):
                 "pong",
                 "health",
                 "link",
+                "batch",
             ], "ENABLED_ENDPOINTS: invalid endpoint ID"
 
+        assert __check_setting(
+            config, "BATCH_MAX_IDENTIFIERS", int, optional=True
+        ), "BATCH_MAX_IDENTIFIERS"
+        assert __check_setting(
+            config, "BATCH_QUERY_SIZE", int, optional=True
+        ), "BATCH_QUERY_SIZE"
+
         assert __check_setting(config, "DATA_CATALOG_GRAPH", str), "DATA_CATALOG_GRAPH"
         assert validators.url(
             config["DATA_CATALOG_GRAPH"]
         ), "DATA_CATALOG_GRAPH invalid URL"
+        assert __check_setting(
+            config, "DATA_CATALOG_LOAD_AT_STARTUP", bool, optional=True
+        ), "DATA_CATALOG_LOAD_AT_STARTUP"
+        assert __check_setting(
+            config, "DATA_CATALOG_REFRESH_SEC", float, optional=True
+        ), "DATA_CATALOG_REFRESH_SEC"
+        assert __check_setting(
+            config, "DATA_CATALOG_SNAPSHOT_PATH", str, optional=True
+        ), "DATA_CATALOG_SNAPSHOT_PATH"
+        assert __check_setting(
+            config, "LISTING_PAGE_SIZE", int, optional=True
+        ), "LISTING_PAGE_SIZE"
+        assert __check_setting(
+            config, "LISTING_MAX_PAGE_SIZE", int, optional=True
+        ), "LISTING_MAX_PAGE_SIZE"
 
         assert __check_setting(config, "SPARQL_ENDPOINT", str), "SPARQL_ENDPOINT"
         assert validators.url(config["SPARQL_ENDPOINT"]), "SPARQL_ENDPOINT invalid URL"
@@ -61,6 +84,119 @@ def validate_config(config, validate_file_paths=True):
             config["SPARQL_ENDPOINT_HEALTH_URL"]
         ), "SPARQL_ENDPOINT_HEALTH_URL invalid URL"
 
+        assert __check_setting(
+            config, "SPARQL_POOL_SIZE", int, optional=True
+        ), "SPARQL_POOL_SIZE"
+        assert __check_setting(
+            config, "SPARQL_CONNECT_TIMEOUT_SEC", float, optional=True
+        ), "SPARQL_CONNECT_TIMEOUT_SEC"
+        assert __check_setting(
+            config, "SPARQL_READ_TIMEOUT_SEC", float, optional=True
+        ), "SPARQL_READ_TIMEOUT_SEC"
+        assert __check_setting(
+            config, "SPARQL_RETRIES", int, optional=True
+        ), "SPARQL_RETRIES"
+        assert __check_setting(
+            config, "SPARQL_RETRY_BACKOFF_SEC", float, optional=True
+        ), "SPARQL_RETRY_BACKOFF_SEC"
+        assert __check_setting(
+            config, "SPARQL_ENDPOINT_REPLICAS", dict, optional=True
+        ), "SPARQL_ENDPOINT_REPLICAS"
+        assert __check_setting(
+            config, "SPARQL_HEDGED_REQUESTS", bool, optional=True
+        ), "SPARQL_HEDGED_REQUESTS"
+        assert __check_setting(
+            config, "SPARQL_HEDGE_PERCENTILE", float, optional=True
+        ), "SPARQL_HEDGE_PERCENTILE"
+        assert __check_setting(
+            config, "SPARQL_HEDGING_WORKERS", int, optional=True
+        ), "SPARQL_HEDGING_WORKERS"
+        assert __check_setting(
+            config, "CIRCUIT_BREAKER_FAILURES", int, optional=True
+        ), "CIRCUIT_BREAKER_FAILURES"
+        assert __check_setting(
+            config, "CIRCUIT_BREAKER_RESET_SEC", float, optional=True
+        ), "CIRCUIT_BREAKER_RESET_SEC"
+        assert __check_setting(
+            config, "SPARQL_MIN_READ_TIMEOUT_SEC", float, optional=True
+        ), "SPARQL_MIN_READ_TIMEOUT_SEC"
+        assert __check_setting(
+            config, "SPARQL_TIMEOUT_PERCENTILE", float, optional=True
+        ), "SPARQL_TIMEOUT_PERCENTILE"
+        assert __check_setting(
+            config, "SPARQL_TIMEOUT_FACTOR", float, optional=True
+        ), "SPARQL_TIMEOUT_FACTOR"
+        assert __check_setting(
+            config, "CONCURRENT_QUERY_WORKERS", int, optional=True
+        ), "CONCURRENT_QUERY_WORKERS"
+        assert __check_setting(
+            config, "QUERY_PAGING_WORKERS", int, optional=True
+        ), "QUERY_PAGING_WORKERS"
+        assert __check_setting(
+            config, "QUERY_PAGING_MAX_ROWS", int, optional=True
+        ), "QUERY_PAGING_MAX_ROWS"
+        assert __check_setting(
+            config, "GRAPH_CACHE_MAX_ENTRIES", int, optional=True
+        ), "GRAPH_CACHE_MAX_ENTRIES"
+        assert __check_setting(
+            config, "GRAPH_CACHE_MAX_TRIPLES", int, optional=True
+        ), "GRAPH_CACHE_MAX_TRIPLES"
+        assert __check_setting(
+            config, "GRAPH_CACHE_TTL_SEC", float, optional=True
+        ), "GRAPH_CACHE_TTL_SEC"
+        assert __check_setting(
+            config, "RESPONSE_CACHE_MAX_ENTRIES", int, optional=True
+        ), "RESPONSE_CACHE_MAX_ENTRIES"
+        assert __check_setting(
+            config, "RESPONSE_CACHE_MAX_BYTES", int, optional=True
+        ), "RESPONSE_CACHE_MAX_BYTES"
+        assert __check_setting(
+            config, "RESPONSE_CACHE_TTL_SEC", float, optional=True
+        ), "RESPONSE_CACHE_TTL_SEC"
+        assert __check_setting(
+            config, "RESPONSE_CACHE_MAX_STALE_SEC", float, optional=True
+        ), "RESPONSE_CACHE_MAX_STALE_SEC"
+        assert __check_setting(
+            config, "COMPRESSION_MIN_BYTES", int, optional=True
+        ), "COMPRESSION_MIN_BYTES"
+        assert __check_setting(
+            config, "GZIP_COMPRESS_LEVEL", int, optional=True
+        ), "GZIP_COMPRESS_LEVEL"
+        assert __check_setting(
+            config, "BROTLI_QUALITY", int, optional=True
+        ), "BROTLI_QUALITY"
+        assert __check_setting(
+            config, "NOT_FOUND_CACHE_MAX_ENTRIES", int, optional=True
+        ), "NOT_FOUND_CACHE_MAX_ENTRIES"
+        assert __check_setting(
+            config, "NOT_FOUND_CACHE_TTL_SEC", float, optional=True
+        ), "NOT_FOUND_CACHE_TTL_SEC"
+        assert __check_setting(
+            config, "EXISTENCE_FILTER_PATH", str, optional=True
+        ), "EXISTENCE_FILTER_PATH"
+        assert __check_setting(
+            config, "EXISTENCE_FILTER_CAPACITY", int, optional=True
+        ), "EXISTENCE_FILTER_CAPACITY"
+        assert __check_setting(
+            config, "EXISTENCE_FILTER_ERROR_RATE", float, optional=True
+        ), "EXISTENCE_FILTER_ERROR_RATE"
+        assert __check_setting(
+            config, "EXISTENCE_FILTER_PAGE_SIZE", int, optional=True
+        ), "EXISTENCE_FILTER_PAGE_SIZE"
+        assert __check_setting(
+            config, "SHARED_CACHE_BACKEND", str, optional=True
+        ), "SHARED_CACHE_BACKEND"
+        assert config.get("SHARED_CACHE_BACKEND", "memory") in [
+            "memory",
+            "sqlite",
+        ], "SHARED_CACHE_BACKEND: invalid backend"
+        assert __check_setting(
+            config, "SHARED_CACHE_PATH", str, optional=True
+        ), "SHARED_CACHE_PATH"
+        assert __check_setting(
+            config, "SHARED_CACHE_RECENCY_SEC", float, optional=True
+        ), "SHARED_CACHE_RECENCY_SEC"
+
         assert __check_setting(config, "BENG_DATA_DOMAIN", str), "BENG_DATA_DOMAIN"
         assert validators.url(
             config["BENG_DATA_DOMAIN"]
@@ -0,0 +1,477 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+import weakref
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+from rdflib import Graph
+from rdflib.compare import to_isomorphic
+from config import cfg
+
+logger = logging.getLogger()
+
+# all caches by name, this is what app.config["GLOBAL_CACHE"] refers to. The registry
+# and the counters are per process, the entries of an SQLiteCache are shared.
+caches: Dict[str, "Cache"] = {}
+
+
+class Cache(ABC):
+    """Base class for the caches. A cache evicts the least recently used entries
+    when there are more than max_entries entries, or when the total size of the
+    entries is more than max_size. Entries expire ttl_sec seconds after they were
+    added, but are kept max_stale_sec seconds longer for get_with_age (to serve
+    stale data while it is refreshed). The counters are kept per process.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: int,
+        ttl_sec: float,
+        max_size: int = 0,
+        size_of: Optional[Callable[[Any], int]] = None,
+        max_stale_sec: float = 0.0,
+    ):
+        """:param name: the cache is registered in caches under this name.
+        :param max_entries: max. number of entries, 0 disables the cache.
+        :param ttl_sec: seconds an entry stays valid, 0 means no expiry.
+        :param max_size: max. total size of the entries, 0 means no size limit.
+        :param size_of: returns the size of a value, by default every value is 1.
+        :param max_stale_sec: seconds an expired entry is kept for get_with_age.
+        """
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_sec = ttl_sec
+        self.max_stale_sec = max_stale_sec
+        self.max_size = max_size
+        self._size_of = size_of or (lambda value: 1)
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        caches[name] = self
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Returns the value for the key, or None if it isn't cached (or expired)."""
+        entry = self.get_with_age(key)
+        if entry is None or self.is_stale(entry[1]):
+            return None
+        return entry[0]
+
+    @abstractmethod
+    def get_with_age(self, key: Hashable) -> Optional[Tuple[Any, float]]:
+        """Returns the value for the key and its age in seconds, also when it is
+        stale (see is_stale), or None if it isn't cached."""
+
+    def is_stale(self, age: float) -> bool:
+        return self.ttl_sec > 0 and age > self.ttl_sec
+
+    def _is_expired(self, age: float) -> bool:
+        return self.ttl_sec > 0 and age > self.ttl_sec + self.max_stale_sec
+
+    def _count(self, age: Optional[float]):
+        if age is None:
+            self.misses += 1
+        elif self.is_stale(age):
+            self.stale_hits += 1
+        else:
+            self.hits += 1
+
+    @abstractmethod
+    def set(self, key: Hashable, value: Any):
+        """Adds the value, evicting the least recently used entries if needed.
+        A value that is bigger than max_size on its own is not cached."""
+
+    @abstractmethod
+    def delete(self, key: Hashable):
+        pass
+
+    @abstractmethod
+    def clear(self):
+        pass
+
+    @abstractmethod
+    def _entries_and_size(self) -> Tuple[int, int]:
+        pass
+
+    def _too_big(self, key: Hashable, size: int) -> bool:
+        if self.max_size and size > self.max_size:
+            logger.debug(f"Not caching {key} in {self.name}: too big ({size})")
+            return True
+        return False
+
+    def stats(self) -> dict:
+        """Returns the counters and the current number of entries and size."""
+        entries, size = self._entries_and_size()
+        return {
+            "backend": type(self).__name__,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": entries,
+            "size": size,
+            "max_entries": self.max_entries,
+            "max_size": self.max_size,
+            "ttl_sec": self.ttl_sec,
+            "max_stale_sec": self.max_stale_sec,
+        }
+
+
+class LRUCache(Cache):
+    """A thread safe in-process cache."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._entries: OrderedDict[Hashable, Tuple[Any, float, int]] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get_with_age(self, key: Hashable) -> Optional[Tuple[Any, float]]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            age = time.monotonic() - entry[1] if entry is not None else None
+            if age is not None and self._is_expired(age):
+                self._remove(key)
+                age = None
+            self._count(age)
+            if entry is None or age is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0], age
+
+    def set(self, key: Hashable, value: Any):
+        if not self.enabled:
+            return
+        size = self._size_of(value)
+        if self._too_big(key, size):
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, time.monotonic(), size)
+            self._size += size
+            while len(self._entries) > self.max_entries or (
+                self.max_size and self._size > self.max_size
+            ):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _entries_and_size(self) -> Tuple[int, int]:
+        with self._lock:
+            return len(self._entries), self._size
+
+    def _remove(self, key: Hashable):
+        _, _, size = self._entries.pop(key)
+        self._size -= size
+
+
+class SQLiteCache(Cache):
+    """A cache in an SQLite database file, shared by the (gunicorn worker) processes
+    on a host. The limits apply to all processes together, so the memory used
+    doesn't grow with the number of workers. The values are stored as bytes, see
+    encode and decode. Errors of the database are logged and handled as a miss,
+    so the cache never breaks a request.
+    The eviction is an approximate LRU: a hit only writes the time it was accessed
+    if that is more than recency_resolution_sec ago, so the hits of the processes
+    don't all wait for the write lock of the database. The number of entries and
+    their size are kept per cache, so a write only scans the entries to evict
+    when a limit is exceeded.
+    """
+
+    def __init__(
+        self,
+        *args,
+        path: str,
+        encode: Callable[[Any], bytes],
+        decode: Callable[[bytes], Any],
+        recency_resolution_sec: float = 10.0,
+        **kwargs,
+    ):
+        """:param path: the database file, shared by the processes.
+        :param encode: returns the bytes to store for a value.
+        :param decode: returns the value for the stored bytes.
+        :param recency_resolution_sec: seconds within which the access time of an
+            entry isn't updated again.
+        """
+        super().__init__(*args, **kwargs)
+        self.path = path
+        self.recency_resolution_sec = recency_resolution_sec
+        self._encode = encode
+        self._decode = decode
+        self._local = threading.local()  # a connection per thread
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                self._create_schema(connection)
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            self._local.connection = connection
+        return connection
+
+    @staticmethod
+    def _create_schema(connection: sqlite3.Connection):
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS cache (name TEXT NOT NULL, "
+            "key TEXT NOT NULL, value BLOB NOT NULL, size INTEGER NOT NULL, "
+            "created REAL NOT NULL, accessed REAL NOT NULL, "
+            "PRIMARY KEY (name, key))"
+        )
+        connection.execute(
+            "CREATE INDEX IF NOT EXISTS cache_accessed ON cache (name, accessed)"
+        )
+        connection.execute(
+            "CREATE INDEX IF NOT EXISTS cache_created ON cache (name, created)"
+        )
+        # the number of entries and their size per cache, kept up to date by
+        # triggers, so a write doesn't count all entries to check the limits
+        has_stats = connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'cache_stats'"
+        ).fetchone()
+        if has_stats is None:
+            connection.execute(
+                "CREATE TABLE cache_stats (name TEXT PRIMARY KEY, "
+                "entries INTEGER NOT NULL, size INTEGER NOT NULL)"
+            )
+            # the entries of a database file of an earlier version
+            connection.execute(
+                "INSERT INTO cache_stats "
+                "SELECT name, COUNT(*), SUM(size) FROM cache GROUP BY name"
+            )
+        connection.execute(
+            "CREATE TRIGGER IF NOT EXISTS cache_insert AFTER INSERT ON cache BEGIN "
+            "INSERT OR IGNORE INTO cache_stats VALUES (new.name, 0, 0); "
+            "UPDATE cache_stats SET entries = entries + 1, size = size + new.size "
+            "WHERE name = new.name; END"
+        )
+        connection.execute(
+            "CREATE TRIGGER IF NOT EXISTS cache_delete AFTER DELETE ON cache BEGIN "
+            "UPDATE cache_stats SET entries = entries - 1, size = size - old.size "
+            "WHERE name = old.name; END"
+        )
+        connection.execute(
+            "CREATE TRIGGER IF NOT EXISTS cache_update AFTER UPDATE OF size ON cache "
+            "BEGIN UPDATE cache_stats SET size = size + new.size - old.size "
+            "WHERE name = new.name; END"
+        )
+
+    def _stats_row(self, connection: sqlite3.Connection) -> Tuple[int, int]:
+        row = connection.execute(
+            "SELECT entries, size FROM cache_stats WHERE name = ?", (self.name,)
+        ).fetchone()
+        return (row[0], row[1]) if row is not None else (0, 0)
+
+    @staticmethod
+    def _db_key(key: Hashable) -> str:
+        return repr(key)
+
+    def get_with_age(self, key: Hashable) -> Optional[Tuple[Any, float]]:
+        if not self.enabled:
+            return None
+        try:
+            connection = self._connection()
+            row = connection.execute(
+                "SELECT value, created, accessed FROM cache WHERE name = ? AND key = ?",
+                (self.name, self._db_key(key)),
+            ).fetchone()
+            now = time.time()
+            age = now - row[1] if row is not None else None
+            if age is not None and self._is_expired(age):
+                self.delete(key)
+                age = None
+            self._count(age)
+            if row is None or age is None:
+                return None
+            if now - row[2] > self.recency_resolution_sec:
+                connection.execute(
+                    "UPDATE cache SET accessed = ? WHERE name = ? AND key = ?",
+                    (now, self.name, self._db_key(key)),
+                )
+            return self._decode(row[0]), age
+        except (sqlite3.Error, OSError):
+            logger.exception(f"Getting {key} from cache {self.name} failed.")
+            self.misses += 1
+            return None
+
+    def set(self, key: Hashable, value: Any):
+        if not self.enabled:
+            return
+        data = self._encode(value)
+        size = self._size_of(value)
+        if self._too_big(key, size):
+            return
+        try:
+            connection = self._connection()
+            now = time.time()
+            # one write transaction at a time for all processes, eviction included
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                # an update (not a delete and insert), so the triggers count it once
+                connection.execute(
+                    "INSERT INTO cache VALUES (?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (name, key) DO UPDATE SET value = excluded.value, "
+                    "size = excluded.size, created = excluded.created, "
+                    "accessed = excluded.accessed",
+                    (self.name, self._db_key(key), data, size, now, now),
+                )
+                if self.ttl_sec > 0:
+                    # only the expired entries are read, from the index on created
+                    connection.execute(
+                        "DELETE FROM cache WHERE name = ? AND created < ?",
+                        (self.name, now - self.ttl_sec - self.max_stale_sec),
+                    )
+                self._evict(connection)
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+        except (sqlite3.Error, OSError):
+            logger.exception(f"Adding {key} to cache {self.name} failed.")
+
+    def _evict(self, connection: sqlite3.Connection):
+        # the entries are only scanned (in LRU order) when a limit is exceeded
+        entries, total_size = self._stats_row(connection)
+        if entries <= self.max_entries and not (
+            self.max_size and total_size > self.max_size
+        ):
+            return
+        rowids = []
+        for rowid, size in connection.execute(
+            "SELECT rowid, size FROM cache WHERE name = ? ORDER BY accessed",
+            (self.name,),
+        ):
+            if entries <= self.max_entries and not (
+                self.max_size and total_size > self.max_size
+            ):
+                break
+            rowids.append((rowid,))
+            entries -= 1
+            total_size -= size
+        connection.executemany("DELETE FROM cache WHERE rowid = ?", rowids)
+        self.evictions += len(rowids)
+
+    def delete(self, key: Hashable):
+        try:
+            self._connection().execute(
+                "DELETE FROM cache WHERE name = ? AND key = ?",
+                (self.name, self._db_key(key)),
+            )
+        except (sqlite3.Error, OSError):
+            logger.exception(f"Deleting {key} from cache {self.name} failed.")
+
+    def clear(self):
+        try:
+            self._connection().execute("DELETE FROM cache WHERE name = ?", (self.name,))
+        except (sqlite3.Error, OSError):
+            logger.exception(f"Clearing cache {self.name} failed.")
+
+    def _entries_and_size(self) -> Tuple[int, int]:
+        try:
+            return self._stats_row(self._connection())
+        except (sqlite3.Error, OSError):
+            logger.exception(f"Getting the size of cache {self.name} failed.")
+            return 0, 0
+
+
+def create_shared_cache(
+    name: str,
+    max_entries: int,
+    ttl_sec: float,
+    max_size: int,
+    size_of: Callable[[Any], int],
+    encode: Callable[[Any], bytes],
+    decode: Callable[[bytes], Any],
+    max_stale_sec: float = 0.0,
+) -> Cache:
+    """Creates a cache that is shared by the processes on the host when
+    SHARED_CACHE_BACKEND is "sqlite", otherwise an in-process cache."""
+    if cfg.get("SHARED_CACHE_BACKEND", "memory") == "sqlite":
+        return SQLiteCache(
+            name,
+            max_entries=max_entries,
+            ttl_sec=ttl_sec,
+            max_size=max_size,
+            size_of=size_of,
+            max_stale_sec=max_stale_sec,
+            path=cfg.get("SHARED_CACHE_PATH", "/tmp/beng-lod-server/cache.sqlite3"),
+            encode=encode,
+            decode=decode,
+            recency_resolution_sec=cfg.get("SHARED_CACHE_RECENCY_SEC", 10.0),
+        )
+    return LRUCache(
+        name,
+        max_entries=max_entries,
+        ttl_sec=ttl_sec,
+        max_size=max_size,
+        size_of=size_of,
+        max_stale_sec=max_stale_sec,
+    )
+
+
+# resource and inverse relations graphs, the size is the number of triples
+graph_cache = LRUCache(
+    "graph",
+    max_entries=cfg.get("GRAPH_CACHE_MAX_ENTRIES", 1000),
+    ttl_sec=cfg.get("GRAPH_CACHE_TTL_SEC", 300.0),
+    max_size=cfg.get("GRAPH_CACHE_MAX_TRIPLES", 2000000),
+    size_of=len,
+)
+
+# the digests of the graphs, kept as long as the graph is (e.g. in the graph cache)
+_graph_digests: "weakref.WeakKeyDictionary[Graph, str]" = weakref.WeakKeyDictionary()
+_graph_digests_lock = threading.Lock()
+
+
+def graph_digest(rdf_graph: Graph) -> str:
+    """Returns the digest of the graph, which is the same for the same triples
+    (blank nodes included), also in another process. It is computed once per graph,
+    so the graph must not be changed afterwards (like the graphs in graph_cache).
+    """
+    with _graph_digests_lock:
+        digest = _graph_digests.get(rdf_graph)
+    if digest is None:
+        digest = format(to_isomorphic(rdf_graph).graph_digest(), "x")
+        with _graph_digests_lock:
+            _graph_digests[rdf_graph] = digest
+    return digest
+
+
+# resources that were found not to exist, so probing for them doesn't cost a query
+# for every request. The hits are the number of queries to the triple store saved.
+not_found_cache = create_shared_cache(
+    "not_found",
+    max_entries=cfg.get("NOT_FOUND_CACHE_MAX_ENTRIES", 10000),
+    ttl_sec=cfg.get("NOT_FOUND_CACHE_TTL_SEC", 60.0),
+    max_size=0,
+    size_of=lambda value: 1,
+    encode=lambda value: b"",
+    decode=lambda data: True,
+)
@@ -0,0 +1,172 @@
+import logging
+import math
+import threading
+import time
+from collections import deque
+from enum import Enum
+from typing import Deque, Dict, Optional
+from requests.exceptions import ConnectionError
+from config import cfg
+
+logger = logging.getLogger()
+
+
+class CircuitOpenError(ConnectionError):
+    """Raised instead of sending a request to an endpoint while its circuit is open.
+    It is a ConnectionError, so it is handled like an endpoint that can't be reached.
+    """
+
+
+class CircuitState(Enum):
+    CLOSED = "closed"  # requests are sent
+    OPEN = "open"  # requests fail fast, until the reset timeout has passed
+    HALF_OPEN = "half-open"  # a single probe request is sent
+
+
+class CircuitBreaker:
+    """Tracks the failures and the latencies of the requests to an endpoint.
+    After failure_threshold consecutive failures, the circuit opens and requests
+    fail fast for reset_timeout_sec. Then one probe request is let through: when it
+    succeeds the circuit closes, when it fails the circuit opens again.
+
+    The read timeout adapts to the endpoint: it is the latency percentile of the
+    recent requests times timeout_factor, between min_read_timeout_sec and
+    max_read_timeout_sec.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout_sec: float = 30.0,
+        min_read_timeout_sec: float = 2.0,
+        max_read_timeout_sec: float = 30.0,
+        timeout_percentile: float = 0.99,
+        timeout_factor: float = 3.0,
+        latency_window: int = 100,
+        min_samples: int = 20,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_sec = reset_timeout_sec
+        self.min_read_timeout_sec = min_read_timeout_sec
+        self.max_read_timeout_sec = max_read_timeout_sec
+        self.timeout_percentile = timeout_percentile
+        self.timeout_factor = timeout_factor
+        self.min_samples = min_samples
+        self._latencies: Deque[float] = deque(maxlen=latency_window)
+        self._lock = threading.Lock()
+        self.state = CircuitState.CLOSED
+        self.failures = 0  # consecutive failures
+        self.times_opened = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+    def before_request(self):
+        """Call before sending a request.
+        raises a CircuitOpenError if the request must not be sent."""
+        with self._lock:
+            if self.state is CircuitState.CLOSED:
+                return
+            if self.state is CircuitState.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout_sec:
+                    raise CircuitOpenError(f"The circuit for {self.name} is open")
+                self.state = CircuitState.HALF_OPEN
+                logger.info(f"The circuit for {self.name} is half-open.")
+            if self._probing:
+                raise CircuitOpenError(f"The circuit for {self.name} is half-open")
+            self._probing = True
+
+    def record_success(self, latency_sec: float):
+        with self._lock:
+            self._latencies.append(latency_sec)
+            self.failures = 0
+            self._probing = False
+            if self.state is not CircuitState.CLOSED:
+                logger.info(f"The circuit for {self.name} is closed.")
+                self.state = CircuitState.CLOSED
+
+    def record_failure(self, latency_sec: Optional[float] = None):
+        """Records a failed request.
+        :param latency_sec: optional, the time until the request timed out, so
+            the read timeout grows when the endpoint gets slower.
+        """
+        with self._lock:
+            if latency_sec is not None:
+                self._latencies.append(latency_sec)
+            self.failures += 1
+            self._probing = False
+            if self.state is CircuitState.HALF_OPEN or (
+                self.state is CircuitState.CLOSED
+                and self.failures >= self.failure_threshold
+            ):
+                logger.warning(
+                    f"The circuit for {self.name} is open, after "
+                    f"{self.failures} failures."
+                )
+                self.state = CircuitState.OPEN
+                self._opened_at = time.monotonic()
+                self.times_opened += 1
+
+    def is_available(self) -> bool:
+        """Returns False while the circuit is open, before the reset timeout."""
+        return (
+            self.state is not CircuitState.OPEN
+            or time.monotonic() - self._opened_at >= self.reset_timeout_sec
+        )
+
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        """Returns the percentile (0.0-1.0) of the recent latencies, or None if
+        there are fewer than min_samples latencies."""
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if len(latencies) < self.min_samples:
+            return None
+        index = min(len(latencies) - 1, math.ceil(percentile * len(latencies)) - 1)
+        return latencies[index]
+
+    def read_timeout(self) -> float:
+        """Returns the read timeout in seconds for the next request."""
+        latency = self.latency_percentile(self.timeout_percentile)
+        if latency is None:
+            return self.max_read_timeout_sec
+        timeout = latency * self.timeout_factor
+        return min(self.max_read_timeout_sec, max(self.min_read_timeout_sec, timeout))
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state.value,
+            "failures": self.failures,
+            "timesOpened": self.times_opened,
+            "readTimeoutSec": round(self.read_timeout(), 3),
+        }
+
+
+_circuit_breakers: Dict[str, CircuitBreaker] = {}
+_circuit_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(sparql_endpoint: str) -> CircuitBreaker:
+    """Returns the (per process) circuit breaker for the SPARQL endpoint."""
+    circuit_breaker = _circuit_breakers.get(sparql_endpoint)
+    if circuit_breaker is None:
+        with _circuit_breakers_lock:
+            circuit_breaker = _circuit_breakers.get(sparql_endpoint)
+            if circuit_breaker is None:
+                circuit_breaker = CircuitBreaker(
+                    sparql_endpoint,
+                    failure_threshold=cfg.get("CIRCUIT_BREAKER_FAILURES", 5),
+                    reset_timeout_sec=cfg.get("CIRCUIT_BREAKER_RESET_SEC", 30.0),
+                    min_read_timeout_sec=cfg.get("SPARQL_MIN_READ_TIMEOUT_SEC", 2.0),
+                    max_read_timeout_sec=cfg.get("SPARQL_READ_TIMEOUT_SEC", 30.0),
+                    timeout_percentile=cfg.get("SPARQL_TIMEOUT_PERCENTILE", 0.99),
+                    timeout_factor=cfg.get("SPARQL_TIMEOUT_FACTOR", 3.0),
+                )
+                _circuit_breakers[sparql_endpoint] = circuit_breaker
+    return circuit_breaker
+
+
+def reset_circuit_breakers():
+    """Forgets the state of all circuit breakers."""
+    with _circuit_breakers_lock:
+        _circuit_breakers.clear()
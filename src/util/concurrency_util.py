@@ -0,0 +1,91 @@
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Hashable, TypeVar
+from config import cfg
+
+logger = logging.getLogger()
+
+T = TypeVar("T")
+
+# bounded pools (per process) for running SPARQL queries next to the request thread
+_executors: Dict[str, ThreadPoolExecutor] = {}
+_executor_lock = threading.Lock()
+
+
+def _get_pool(name: str, workers_setting: str) -> ThreadPoolExecutor:
+    # the pools are created on first use, so each (gunicorn worker) process gets
+    # its own pools
+    executor = _executors.get(name)
+    if executor is None:
+        with _executor_lock:
+            executor = _executors.get(name)
+            if executor is None:
+                max_workers = cfg.get(workers_setting, 4)
+                logger.info(f"Creating {name} thread pool with {max_workers} workers.")
+                executor = _executors[name] = ThreadPoolExecutor(
+                    max_workers=max_workers, thread_name_prefix=name
+                )
+    return executor
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Returns the thread pool that is shared by the request threads."""
+    return _get_pool("sparql-query", "CONCURRENT_QUERY_WORKERS")
+
+
+def get_paging_executor() -> ThreadPoolExecutor:
+    """Returns the thread pool for the pages of the results of a query. It is not
+    the shared pool, because a query in the shared pool waits for its pages: they
+    would wait for a worker that the waiting queries hold."""
+    return _get_pool("sparql-page", "QUERY_PAGING_WORKERS")
+
+
+def get_hedging_executor() -> ThreadPoolExecutor:
+    """Returns the thread pool for hedged SPARQL requests, the requests that are sent
+    to two replicas of an endpoint at once (see http_util.sparql_get)."""
+    return _get_pool("sparql-hedge", "SPARQL_HEDGING_WORKERS")
+
+
+def shutdown_executors():
+    """Cancels the queued work of the thread pools, waits for the running work and
+    forgets the pools (new pools are created on next use)."""
+    with _executor_lock:
+        executors = list(_executors.values())
+        _executors.clear()
+    for executor in executors:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+class SingleFlight:
+    """Deduplicates concurrent calls: while a call for a key is in flight, other
+    calls for the same key wait for it and get its result (or its exception),
+    instead of doing the same work again."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+        self.shared = 0  # the number of calls that got the result of another call
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        """Returns fn(), or the result of the call for the key that is in flight."""
+        with self._lock:
+            call = self._calls.get(key)
+            in_flight = call is not None
+            if call is None:
+                call = self._calls[key] = Future()
+            else:
+                self.shared += 1
+        if in_flight:
+            return call.result()
+
+        try:
+            result = fn()
+            call.set_result(result)
+            return result
+        except BaseException as e:
+            call.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
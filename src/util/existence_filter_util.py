@@ -0,0 +1,260 @@
+"""The existence filter is a Bloom filter with the IRIs of all catalog resources
+and GTAA terms, so the existence check can answer "certainly doesn't exist"
+without asking the triple store. It is built offline, from the src directory:
+
+    python -m util.existence_filter_util [--rebuild]
+
+An existing filter file is updated in place (IRIs are only added, so the
+running workers keep using it), --rebuild writes a new file and swaps it in.
+"""
+
+import argparse
+import hashlib
+import logging
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Iterator, Optional
+from rdflib.namespace import SDO, SKOS  # type: ignore
+from config import cfg
+import util.ld_util
+import util.query_util
+
+logger = logging.getLogger()
+
+# magic, number of bits, number of hashes, number of IRIs added
+_HEADER = struct.Struct("<8sQIQ4x")
+_MAGIC = b"BLOOMF01"
+
+# rdf:types of the IRIs in the filter, the types in BENG_IS_CAT_NISV_RESOURCE and
+# BENG_IS_SKOS_RESOURCE
+RESOURCE_TYPES = (
+    SDO.CreativeWork,
+    SDO.CreativeWorkSeries,
+    SDO.CreativeWorkSeason,
+    SDO.Clip,
+    SKOS.Concept,
+    SKOS.ConceptScheme,
+)
+
+# seconds between two checks whether the filter file was replaced
+FILE_CHECK_INTERVAL_SEC = 10.0
+
+
+class BloomFilter:
+    """A Bloom filter in a memory-mapped file, shared by the processes that open it.
+    It never gives a false negative: if an IRI was added, it is in the filter.
+    """
+
+    def __init__(self, path: str, writable: bool = False):
+        """Opens (memory-maps) an existing filter file.
+        raises a ValueError when the file is not a filter file."""
+        self.path = path
+        with open(path, "r+b" if writable else "rb") as f:
+            self._mmap = mmap.mmap(
+                f.fileno(),
+                0,
+                access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ,
+            )
+        if len(self._mmap) < _HEADER.size:
+            raise ValueError(f"Not a filter file: {path}")
+        magic, self.num_bits, self.num_hashes, _ = _HEADER.unpack_from(self._mmap)
+        if magic != _MAGIC or len(self._mmap) < _HEADER.size + self.num_bits // 8:
+            raise ValueError(f"Not a filter file: {path}")
+
+    @classmethod
+    def create(cls, path: str, capacity: int, error_rate: float) -> "BloomFilter":
+        """Creates an empty filter file, sized for capacity IRIs with the
+        error_rate as the chance of a false positive, and opens it for writing."""
+        num_bits = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        num_bits = max(64, (num_bits + 7) // 8 * 8)
+        num_hashes = max(1, round(num_bits / capacity * math.log(2)))
+        with open(path, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, num_bits, num_hashes, 0))
+            f.truncate(_HEADER.size + num_bits // 8)
+        return cls(path, writable=True)
+
+    @property
+    def count(self) -> int:
+        """The number of IRIs added, not counting the IRIs that were (false
+        positives) in the filter already."""
+        return _HEADER.unpack_from(self._mmap)[3]
+
+    def _bit_indexes(self, item: str) -> Iterator[int]:
+        # double hashing, the same in every process (unlike hash())
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def __contains__(self, item: str) -> bool:
+        for bit in self._bit_indexes(item):
+            if not self._mmap[_HEADER.size + (bit >> 3)] & (1 << (bit & 7)):
+                return False
+        return True
+
+    def add(self, item: str) -> bool:
+        """Adds the IRI. Returns False if it was in the filter already (or was a
+        false positive)."""
+        added = False
+        for bit in self._bit_indexes(item):
+            offset = _HEADER.size + (bit >> 3)
+            byte = self._mmap[offset]
+            if not byte & (1 << (bit & 7)):
+                self._mmap[offset] = byte | (1 << (bit & 7))
+                added = True
+        if added:
+            _HEADER.pack_into(
+                self._mmap, 0, _MAGIC, self.num_bits, self.num_hashes, self.count + 1
+            )
+        return added
+
+    def flush(self):
+        self._mmap.flush()
+
+    def close(self):
+        self._mmap.close()
+
+
+_lock = threading.Lock()
+_existence_filter: Optional[BloomFilter] = None
+_file_id: Optional[tuple] = None
+_checked_at = 0.0
+
+
+def get_existence_filter() -> Optional[BloomFilter]:
+    """Returns the existence filter of EXISTENCE_FILTER_PATH, or None if there
+    is no (valid) filter file. The file is opened again when it was replaced.
+    """
+    global _existence_filter, _file_id, _checked_at
+    path = cfg.get("EXISTENCE_FILTER_PATH", "")
+    if not path:
+        return None
+    now = time.monotonic()
+    if now - _checked_at < FILE_CHECK_INTERVAL_SEC:
+        return _existence_filter
+    with _lock:
+        if now - _checked_at < FILE_CHECK_INTERVAL_SEC:
+            return _existence_filter
+        _checked_at = now
+        try:
+            stat = os.stat(path)
+            file_id = (stat.st_dev, stat.st_ino)
+            if file_id != _file_id:
+                _existence_filter = BloomFilter(path)
+                _file_id = file_id
+                logger.info(
+                    f"Existence filter {path} loaded "
+                    f"({_existence_filter.count} IRIs)."
+                )
+        except (OSError, ValueError):
+            logger.exception(f"Loading the existence filter {path} failed.")
+            _existence_filter, _file_id = None, None
+        return _existence_filter
+
+
+def may_exist(resource_url: str) -> bool:
+    """Returns False if the resource certainly doesn't exist, True if it may exist
+    (or there is no existence filter)."""
+    existence_filter = get_existence_filter()
+    return existence_filter is None or resource_url in existence_filter
+
+
+def _sparql_string(value: str) -> str:
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def iter_resource_iris(sparql_endpoint: str, page_size: int) -> Iterator[str]:
+    """Yields the IRIs of all resources with one of the RESOURCE_TYPES, in pages
+    of page_size IRIs. Every page continues after the last IRI of the previous page,
+    so the endpoint doesn't have to skip the IRIs of all previous pages.
+    """
+    types = " ".join(util.query_util.sparql_iri(str(t)) for t in RESOURCE_TYPES)
+    last_iri = ""
+    while True:
+        query = (
+            f"SELECT DISTINCT ?s WHERE {{ VALUES ?type {{ {types} }} ?s a ?type . "
+            f"FILTER (isIRI(?s) && STR(?s) > {_sparql_string(last_iri)}) }} "
+            f"ORDER BY STR(?s) LIMIT {page_size}"
+        )
+        iris = [
+            binding["s"]["value"]
+            for binding in util.ld_util.sparql_select_bindings(sparql_endpoint, query)
+        ]
+        yield from iris
+        if len(iris) < page_size:
+            return
+        last_iri = iris[-1]
+
+
+def build_existence_filter(
+    path: str,
+    sparql_endpoint: str,
+    capacity: int,
+    error_rate: float,
+    page_size: int,
+    rebuild: bool = False,
+) -> int:
+    """Adds the IRIs of all resources to the filter file. An existing file is
+    updated in place, unless rebuild is True or it is full (more than capacity
+    IRIs): then a new file is built next to it and swapped in when it is complete.
+    :returns: the number of IRIs added.
+    """
+    existence_filter = None
+    if os.path.exists(path) and not rebuild:
+        existence_filter = BloomFilter(path, writable=True)
+        if existence_filter.count >= capacity:
+            logger.info(f"The existence filter {path} is full, rebuilding it.")
+            existence_filter.close()
+            existence_filter = None
+
+    build_path = path if existence_filter else f"{path}.building"
+    if existence_filter is None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        existence_filter = BloomFilter.create(build_path, capacity, error_rate)
+
+    added = 0
+    try:
+        for i, iri in enumerate(iter_resource_iris(sparql_endpoint, page_size)):
+            added += existence_filter.add(iri)
+            if (i + 1) % page_size == 0:
+                logger.info(f"{i + 1} IRIs read, {added} added.")
+        existence_filter.flush()
+    finally:
+        existence_filter.close()
+    if build_path != path:
+        os.replace(build_path, path)
+    logger.info(f"Existence filter {path} built, {added} IRIs added.")
+    return added
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Builds or updates the existence filter (EXISTENCE_FILTER_PATH)."
+    )
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="build a new filter, instead of adding to the existing one",
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    path = cfg.get("EXISTENCE_FILTER_PATH", "")
+    if not path:
+        parser.error("EXISTENCE_FILTER_PATH is not set in the config.")
+    build_existence_filter(
+        path,
+        cfg.get("SPARQL_ENDPOINT", ""),
+        cfg.get("EXISTENCE_FILTER_CAPACITY", 20000000),
+        cfg.get("EXISTENCE_FILTER_ERROR_RATE", 0.01),
+        cfg.get("EXISTENCE_FILTER_PAGE_SIZE", 10000),
+        args.rebuild,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+import logging
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import Dict, List, Optional, Tuple
+import requests
+from requests.adapters import HTTPAdapter
+from requests.exceptions import RequestException, Timeout
+from urllib3.util.retry import Retry
+from config import cfg
+from util.circuit_breaker_util import get_circuit_breaker
+import util.concurrency_util
+
+logger = logging.getLogger()
+
+# one connection pooling session per SPARQL endpoint (per process)
+_sessions: Dict[str, requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+# the number of requests per SPARQL endpoint (replica) that wait for a response
+_outstanding: Dict[str, int] = defaultdict(int)
+_outstanding_lock = threading.Lock()
+
+
+def _create_session() -> requests.Session:
+    """Creates a session that keeps connections to the endpoint alive and retries
+    failed requests, with a backoff, on connection errors and 502/503/504 responses.
+    """
+    retry = Retry(
+        total=cfg.get("SPARQL_RETRIES", 2),
+        backoff_factor=cfg.get("SPARQL_RETRY_BACKOFF_SEC", 0.2),
+        status_forcelist=(502, 503, 504),
+        allowed_methods=("GET",),
+        raise_on_status=False,  # the caller raises the HTTPError (raise_for_status)
+    )
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=cfg.get("SPARQL_POOL_SIZE", 10),
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_session(sparql_endpoint: str) -> requests.Session:
+    """Returns the (shared) session for the SPARQL endpoint."""
+    session = _sessions.get(sparql_endpoint)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(sparql_endpoint)
+            if session is None:
+                logger.info(f"Creating connection pool for '{sparql_endpoint}'")
+                session = _create_session()
+                _sessions[sparql_endpoint] = session
+    return session
+
+
+def get_timeout(sparql_endpoint: str) -> Tuple[float, float]:
+    """Returns the (connect, read) timeout in seconds for SPARQL requests. The read
+    timeout adapts to the latencies of the endpoint, see CircuitBreaker.read_timeout.
+    """
+    return (
+        cfg.get("SPARQL_CONNECT_TIMEOUT_SEC", 3.05),
+        get_circuit_breaker(sparql_endpoint).read_timeout(),
+    )
+
+
+def get_replicas(sparql_endpoint: str) -> List[str]:
+    """Returns the URLs of the replicas of the SPARQL endpoint (see
+    SPARQL_ENDPOINT_REPLICAS), or the endpoint itself if it has no replicas."""
+    return cfg.get("SPARQL_ENDPOINT_REPLICAS", {}).get(sparql_endpoint) or [
+        sparql_endpoint
+    ]
+
+
+def get_replica_stats(sparql_endpoint: str) -> Dict[str, dict]:
+    """Returns the circuit breaker state and outstanding requests per replica."""
+    return {
+        replica: dict(
+            get_circuit_breaker(replica).stats(), outstanding=_outstanding[replica]
+        )
+        for replica in get_replicas(sparql_endpoint)
+    }
+
+
+def _choose_replicas(sparql_endpoint: str) -> List[str]:
+    # the replicas with a closed circuit first, then the least outstanding requests
+    # (ties are broken at random, to spread the requests of an idle worker)
+    with _outstanding_lock:
+        return sorted(
+            get_replicas(sparql_endpoint),
+            key=lambda replica: (
+                not get_circuit_breaker(replica).is_available(),
+                _outstanding[replica],
+                random.random(),
+            ),
+        )
+
+
+def _hedge_delay(replicas: List[str]) -> Optional[float]:
+    # a hedged request is sent when the first replica takes longer than usual
+    if not cfg.get("SPARQL_HEDGED_REQUESTS", False) or len(replicas) < 2:
+        return None
+    return get_circuit_breaker(replicas[0]).latency_percentile(
+        cfg.get("SPARQL_HEDGE_PERCENTILE", 0.95)
+    )
+
+
+def sparql_get(
+    sparql_endpoint: str,
+    params: dict,
+    headers: Optional[dict] = None,
+    stream: bool = False,
+) -> requests.Response:
+    """Sends a GET request to the SPARQL endpoint, using the endpoint's connection pool.
+    If the endpoint has replicas, the request is sent to the replica with the least
+    outstanding requests. With SPARQL_HEDGED_REQUESTS, the request is also sent to a
+    second replica when the first takes longer than its SPARQL_HEDGE_PERCENTILE
+    latency, and the first response is used. When the first replica fails before
+    that, the request is sent to the second one right away.
+    Failures (connection errors, timeouts and 5xx responses) are recorded by the
+    circuit breaker of the replica, and while its circuit is open no request is sent.
+    raises a ConnectionError when the sparql endpoint can not be reached (a
+    CircuitOpenError when the circuit is open), or
+    raises a Timeout when the sparql endpoint does not respond in time.
+    :param sparql_endpoint - the endpoint to be queried
+    :param params - the request parameters, e.g. the query
+    :param headers - optional, the request headers
+    :param stream - optional, if True the response body is read when it is used
+        (the caller must close the response)
+    """
+    replicas = _choose_replicas(sparql_endpoint)
+    hedge_delay = _hedge_delay(replicas)
+    if hedge_delay is None:
+        return _replica_get(replicas[0], params, headers, stream)
+    return _hedged_get(replicas[:2], hedge_delay, params, headers, stream)
+
+
+def _hedged_get(
+    replicas: List[str],
+    hedge_delay: float,
+    params: dict,
+    headers: Optional[dict],
+    stream: bool,
+) -> requests.Response:
+    executor = util.concurrency_util.get_hedging_executor()
+    started = threading.Event()
+
+    def first_get() -> requests.Response:
+        started.set()
+        return _replica_get(replicas[0], params, headers, stream)
+
+    first = executor.submit(first_get)
+    first.add_done_callback(lambda _: started.set())  # also when it is cancelled
+    # the delay counts from the start of the first request, not from when it was
+    # queued for a worker
+    started.wait()
+    if wait([first], timeout=hedge_delay).done:
+        error = first.exception()
+        if error is None:
+            return first.result()
+        if not isinstance(error, RequestException):
+            raise error
+        # the first replica failed fast, fail over right away
+        logger.debug(f"Request to {replicas[0]} failed, sending it to {replicas[1]}")
+        return _replica_get(replicas[1], params, headers, stream)
+
+    logger.debug(f"Hedging the request to {replicas[0]} with {replicas[1]}")
+    pending = {
+        first,
+        executor.submit(_replica_get, replicas[1], params, headers, stream),
+    }
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        responses = [future for future in done if future.exception() is None]
+        if responses:
+            # the response of the other request is not used
+            for future in responses[1:] + list(pending):
+                future.add_done_callback(_close_response)
+            return responses[0].result()
+    # both requests failed
+    return first.result()
+
+
+def _close_response(future: Future):
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+def _replica_get(
+    replica: str, params: dict, headers: Optional[dict], stream: bool
+) -> requests.Response:
+    circuit_breaker = get_circuit_breaker(replica)
+    circuit_breaker.before_request()
+    timeout = get_timeout(replica)
+    with _outstanding_lock:
+        _outstanding[replica] += 1
+    start = time.monotonic()
+    try:
+        resp = get_session(replica).get(
+            replica,
+            params=params,
+            headers=headers,
+            timeout=timeout,
+            stream=stream,
+        )
+    except Timeout:
+        circuit_breaker.record_failure(time.monotonic() - start)
+        raise
+    except BaseException:
+        # any other error fails the request too (and releases a half-open probe)
+        circuit_breaker.record_failure()
+        raise
+    finally:
+        with _outstanding_lock:
+            _outstanding[replica] -= 1
+    if resp.status_code >= 500:
+        circuit_breaker.record_failure()
+    else:
+        circuit_breaker.record_success(time.monotonic() - start)
+    return resp
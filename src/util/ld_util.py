@@ -1,22 +1,55 @@
+import hashlib
+import itertools
 import logging
+import threading
 import requests
 import validators
-import json
-from requests.exceptions import ConnectionError, HTTPError
+from collections import defaultdict
+from requests.exceptions import (
+    ChunkedEncodingError,
+    ConnectionError,
+    HTTPError,
+    Timeout,
+)
+from concurrent.futures import Future
 from rdflib import Graph, URIRef, BNode, Literal
 from rdflib.namespace import RDF, SDO, SKOS  # type: ignore
 from rdflib.namespace import is_ncname
-from typing import Optional
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 from urllib.parse import urlparse, urlunparse
 from enum import Enum
 from models.DatasetApiUriLevel import DatasetApiUriLevel
 from models.ResourceApiUriLevel import ResourceApiUriLevel
 from config import cfg
+import util.cache_util
+import util.concurrency_util
+import util.existence_filter_util
+import util.http_util
 import util.ns_util
-from util.base_util import relative_from_repo_root
+import util.query_util
+import util.sparql_results_util
 
 logger = logging.getLogger()
 
+# rdf:types checked by the BENG_IS_CAT_NISV_RESOURCE and BENG_IS_SKOS_RESOURCE queries
+NISV_CAT_RESOURCE_TYPES = (
+    SDO.CreativeWork,
+    SDO.CreativeWorkSeries,
+    SDO.CreativeWorkSeason,
+    SDO.Clip,
+)
+SKOS_RESOURCE_TYPES = (SKOS.Concept, SKOS.ConceptScheme)
+
+# bytes read at a time from the response of a SELECT query
+SPARQL_RESULTS_CHUNK_SIZE = 64 * 1024
+
+# the queries for resource and inverse relations graphs that are in flight
+_in_flight = util.concurrency_util.SingleFlight()
+
+# the resources of which the graph is being refreshed, see refresh_resource_graph
+_refreshing: Set[tuple] = set()
+_refreshing_lock = threading.Lock()
+
 
 def generate_lod_resource_uri(
     level: Enum, identifier: str, beng_data_domain: str
@@ -57,14 +90,18 @@ def generate_muziekweb_lod_resource_uri(path: str, muziekweb_data_domain: str) -
 
 def is_muziekweb_resource(resource_url: str, sparql_endpoint: str) -> bool:
     """Check with the triple store whether the resource exists."""
-    query = f"ASK {{ {{ <{resource_url}> ?p ?o }} }}"
-    params = {"query": query, "format": "application/json"}
-    resp = requests.get(sparql_endpoint, params=params)
-    resp.raise_for_status()
-    if resp.status_code == 200:
-        if resp.json().get("boolean"):
-            return True
-    return False
+
+    def ask() -> bool:
+        query = f"ASK {{ {{ {util.query_util.sparql_iri(resource_url)} ?p ?o }} }}"
+        params = {"query": query, "format": "application/json"}
+        resp = util.http_util.sparql_get(sparql_endpoint, params=params)
+        resp.raise_for_status()
+        if resp.status_code == 200:
+            if resp.json().get("boolean"):
+                return True
+        return False
+
+    return _check_exists(("muziekweb", resource_url, sparql_endpoint), ask)
 
 
 # ============ Add/remove triples from a graph ===========
@@ -121,18 +158,44 @@ def remove_additional_type_skos_concept(resource_uri: str, rdf_graph: Graph):
 # ========== Functions that get data from the RDF store ========
 
 
+def _check_exists(cache_key: tuple, check: Callable[[], bool]) -> bool:
+    """Returns the outcome of the existence check, unless the resource was found
+    not to exist recently. Only the negative outcomes are cached (see
+    not_found_cache), so probing for resources that don't exist doesn't cost a
+    round trip to the triple store for every request."""
+    if util.cache_util.not_found_cache.get(cache_key) is not None:
+        logger.debug(f"Resource {cache_key[1]} does not exist (cached).")
+        return False
+    exists = check()
+    if not exists:
+        util.cache_util.not_found_cache.set(cache_key, True)
+    return exists
+
+
 def is_skos_resource(resource_url: str, sparql_endpoint: str) -> bool:
     """Check with the triple store whether the resource exists."""
-    query_str = get_query_from_file(cfg.get("BENG_IS_SKOS_RESOURCE", ""))
-    query = query_str.replace("?resource_iri", f"<{resource_url}>")
-    return sparql_ask_query(sparql_endpoint, query)
+    if not util.existence_filter_util.may_exist(resource_url):
+        return False
+    query = util.query_util.get_query(
+        cfg.get("BENG_IS_SKOS_RESOURCE", ""), resource_url
+    )
+    return _check_exists(
+        ("skos", resource_url, sparql_endpoint),
+        lambda: sparql_ask_query(sparql_endpoint, query),
+    )
 
 
 def is_nisv_cat_resource(resource_url: str, sparql_endpoint: str) -> bool:
     """Check with the triple store whether the resource exists."""
-    query_str = get_query_from_file(cfg.get("BENG_IS_CAT_NISV_RESOURCE", ""))
-    query = query_str.replace("?resource_iri", f"<{resource_url}>")
-    return sparql_ask_query(sparql_endpoint, query)
+    if not util.existence_filter_util.may_exist(resource_url):
+        return False
+    query = util.query_util.get_query(
+        cfg.get("BENG_IS_CAT_NISV_RESOURCE", ""), resource_url
+    )
+    return _check_exists(
+        ("nisv_cat", resource_url, sparql_endpoint),
+        lambda: sparql_ask_query(sparql_endpoint, query),
+    )
 
 
 def get_resource_from_rdf_store(
@@ -158,38 +221,301 @@ def get_resource_from_rdf_store(
         return g
 
     try:
-        query_str = get_query_from_file(query_fname)
-        query = query_str.replace("?resource_iri", f"<{resource_url}>")
-
-        # get the results
-        query_result = sparql_select_query(sparql_endpoint, query, format="json")
-        results = json.loads(query_result)
-
-        # Note we have to add the resource_url for the triples that miss the subject 's'
-        g += _convert_results_to_graph(results, resource_url)
-
+        g = _get_resource_graph(
+            resource_url, sparql_endpoint, query_fname, organisation_uri
+        )
         if len(g) == 0:
             logger.error("Graph was empty")
-        else:
-            # add the publisher triple (if not already present)
-            # add_publisher(resource_url, organisation_uri, g)
-
-            # add structured data triples
-            add_structured_data_publisher(resource_url, organisation_uri, g)
-
-            # remove sdo:additionalType triple (for skos:Concepts)
-            remove_additional_type_skos_concept(resource_url, g)
-
-        # add the missing namespaces and return the graph
-        return util.ns_util.bind_namespaces_to_graph(g)
+        return g
 
     except ConnectionError as e:
         logger.exception(e)
     except HTTPError as e:
         logger.exception(e)
+    except Timeout as e:
+        logger.exception(e)
+    return g
+
+
+def get_resource_with_type_check_from_rdf_store(
+    resource_url: str,
+    sparql_endpoint: str,
+    query_fname: str,
+    organisation_uri: str,
+    resource_types: Optional[Iterable[URIRef]] = None,
+) -> Tuple[bool, Graph]:
+    """Combines the existence check (the ASK in is_nisv_cat_resource,
+    is_skos_resource or is_muziekweb_resource) with getting the resource, so that
+    a dereference costs a single round trip to the SPARQL endpoint. The resource
+    query returns all triples for the resource, including the rdf:type triples,
+    so the check is done on the resulting graph.
+
+    :param resource_url: the resource URI to be retrieved.
+    :param sparql_endpoint: the SPARQL endpoint URL.
+    :param query_fname: filename of the query to be used.
+    :param organisation_uri: URI for the publishing organisation.
+    :param resource_types: the resource exists if it has one of these rdf:types.
+        If None, the resource exists if there are any triples for it.
+    :returns: a tuple (exists, graph). Exists is only False when the endpoint
+        answered and the resource was not found. When the endpoint could not be
+        queried, exists is True and the graph is empty.
+    """
+    g = Graph(bind_namespaces="core")
+    if not resource_url:
+        return False, g
+    if not sparql_endpoint or validators.url(sparql_endpoint) is False:
+        logger.error(f"Invalid SPARQL endpoint: '{sparql_endpoint}'")
+        return True, g
+
+    # the existence filter only has the catalog resources and the GTAA terms
+    if resource_types in (
+        NISV_CAT_RESOURCE_TYPES,
+        SKOS_RESOURCE_TYPES,
+    ) and not util.existence_filter_util.may_exist(resource_url):
+        logger.debug(f"Resource {resource_url} does not exist (existence filter).")
+        return False, g
+
+    # a resource that was not found recently is not queried again
+    cache_key = (
+        "type_check",
+        resource_url,
+        sparql_endpoint,
+        tuple(resource_types) if resource_types is not None else None,
+    )
+    if util.cache_util.not_found_cache.get(cache_key) is not None:
+        logger.debug(f"Resource {resource_url} does not exist (cached).")
+        return False, g
+
+    try:
+        g = _get_resource_graph(
+            resource_url, sparql_endpoint, query_fname, organisation_uri
+        )
+    except (ConnectionError, HTTPError, Timeout) as e:
+        logger.exception(e)
+        return True, g
+    exists = has_resource_type(g, resource_url, resource_types)
+    if not exists:
+        util.cache_util.not_found_cache.set(cache_key, True)
+    return exists, g
+
+
+def _get_resource_graph(
+    resource_url: str,
+    sparql_endpoint: str,
+    query_fname: str,
+    organisation_uri: str,
+    refresh: bool = False,
+) -> Graph:
+    """Queries the SPARQL endpoint for the resource and returns the graph.
+    The graph is cached, so a cached graph must not be changed by the caller.
+    raises a ConnectionError, HTTPError or Timeout when querying fails.
+    :param refresh: query the endpoint, also when the graph is cached.
+    """
+    cache_key = (
+        "resource",
+        resource_url,
+        sparql_endpoint,
+        query_fname,
+        organisation_uri,
+    )
+    cached_graph = None if refresh else util.cache_util.graph_cache.get(cache_key)
+    if cached_graph is not None:
+        return cached_graph
+    # concurrent requests for the resource share the query and the graph
+    return _in_flight.do(
+        cache_key,
+        lambda: _query_resource_graph(
+            cache_key, resource_url, sparql_endpoint, query_fname, organisation_uri
+        ),
+    )
+
+
+def _query_resource_graph(
+    cache_key: tuple,
+    resource_url: str,
+    sparql_endpoint: str,
+    query_fname: str,
+    organisation_uri: str,
+) -> Graph:
+    g = Graph(bind_namespaces="core")
+    query = util.query_util.get_query(query_fname, resource_url)
+
+    # get the results
+    # the triples are added while the results are read from the response
+    bindings = sparql_select_all_bindings(sparql_endpoint, query)
+
+    # Note we have to add the resource_url for the triples that miss the subject 's'
+    g += _convert_results_to_graph(bindings, resource_url)
+    g = _finish_resource_graph(cache_key, g, resource_url, organisation_uri)
+    # the digest (for the ETag) is computed once, for all requests of the graph
+    util.cache_util.graph_digest(g)
+    return g
+
+
+def _finish_resource_graph(
+    cache_key: tuple, g: Graph, resource_url: str, organisation_uri: str
+) -> Graph:
+    """Adds and removes triples for the resource graph from the query and caches it."""
+    if len(g) > 0:
+        # add the publisher triple (if not already present)
+        # add_publisher(resource_url, organisation_uri, g)
+
+        # add structured data triples
+        add_structured_data_publisher(resource_url, organisation_uri, g)
+
+        # remove sdo:additionalType triple (for skos:Concepts)
+        remove_additional_type_skos_concept(resource_url, g)
+
+    # add the missing namespaces and return the graph
+    g = util.ns_util.bind_namespaces_to_graph(g)
+    if len(g) > 0:
+        util.cache_util.graph_cache.set(cache_key, g)
     return g
 
 
+def get_resources_from_rdf_store(
+    resources: List[Tuple[str, Optional[Iterable[URIRef]]]],
+    sparql_endpoint: str,
+    query_fname: str,
+    organisation_uri: str,
+    batch_size: int,
+) -> Iterator[Tuple[str, Graph]]:
+    """Yields the resource URI and graph of each of the resources that exist, like
+    get_resource_with_type_check_from_rdf_store does for one resource. The resources
+    are queried in batches of batch_size resources, one query per batch (see
+    QueryTemplate.bind_values), and the next batch is queried while the current
+    batch is consumed. Cached graphs are not queried again.
+    raises a ConnectionError, HTTPError or Timeout when querying fails.
+
+    :param resources: the resource URIs, each with the rdf:types of which the
+        resource must have one (None: the resource exists if it has any triples).
+    """
+    batches = [
+        resources[i : i + batch_size] for i in range(0, len(resources), batch_size)
+    ]
+    executor = util.concurrency_util.get_executor()
+
+    def submit(batch: List[Tuple[str, Optional[Iterable[URIRef]]]]) -> Future:
+        resource_urls = [
+            resource_url
+            for resource_url, resource_types in batch
+            if resource_types not in (NISV_CAT_RESOURCE_TYPES, SKOS_RESOURCE_TYPES)
+            or util.existence_filter_util.may_exist(resource_url)
+        ]
+        return executor.submit(
+            _get_resource_graphs,
+            resource_urls,
+            sparql_endpoint,
+            query_fname,
+            organisation_uri,
+        )
+
+    next_batch = submit(batches[0]) if batches else None
+    for i, batch in enumerate(batches):
+        graphs = next_batch.result() if next_batch is not None else {}
+        next_batch = submit(batches[i + 1]) if i + 1 < len(batches) else None
+        for resource_url, resource_types in batch:
+            g = graphs.get(resource_url)
+            if g is not None and has_resource_type(g, resource_url, resource_types):
+                yield resource_url, g
+
+
+def _get_resource_graphs(
+    resource_urls: List[str],
+    sparql_endpoint: str,
+    query_fname: str,
+    organisation_uri: str,
+) -> Dict[str, Graph]:
+    """Returns the graphs of the resources, from the cache or from one query for
+    all resources that are not cached."""
+    graphs: Dict[str, Graph] = {}
+    cache_keys = {
+        resource_url: (
+            "resource",
+            resource_url,
+            sparql_endpoint,
+            query_fname,
+            organisation_uri,
+        )
+        for resource_url in resource_urls
+    }
+    for resource_url, cache_key in cache_keys.items():
+        cached_graph = util.cache_util.graph_cache.get(cache_key)
+        if cached_graph is not None:
+            graphs[resource_url] = cached_graph
+    to_query = [url for url in resource_urls if url not in graphs]
+    if not to_query:
+        return graphs
+
+    query = util.query_util.get_query_template(query_fname).bind_values(to_query)
+    bindings_per_resource: Dict[str, List[dict]] = defaultdict(list)
+    for binding in sparql_select_all_bindings(sparql_endpoint, query):
+        resource_url = binding.get("resource_iri", {}).get("value", "")
+        bindings_per_resource[resource_url].append(binding)
+
+    for resource_url in to_query:
+        g = Graph(bind_namespaces="core")
+        g += _convert_results_to_graph(
+            bindings_per_resource.get(resource_url, []), resource_url
+        )
+        graphs[resource_url] = _finish_resource_graph(
+            cache_keys[resource_url], g, resource_url, organisation_uri
+        )
+    return graphs
+
+
+def refresh_resource_graph(
+    resource_url: str,
+    sparql_endpoint: str,
+    query_fname: str,
+    organisation_uri: str,
+    on_refreshed: Optional[Callable[[], None]] = None,
+) -> Optional[Future]:
+    """Gets the graph for the resource again in the background, replacing the
+    cached graph, e.g. while a stale response for the resource is served.
+    :param on_refreshed: called when the endpoint answered (also when the resource
+        doesn't exist anymore), not when querying failed.
+    :returns: the future of the refresh, or None if the resource is being
+        refreshed already.
+    """
+    refresh_key = (resource_url, sparql_endpoint, query_fname, organisation_uri)
+    with _refreshing_lock:
+        if refresh_key in _refreshing:
+            return None
+        _refreshing.add(refresh_key)
+
+    def refresh():
+        try:
+            _get_resource_graph(*refresh_key, refresh=True)
+            if on_refreshed is not None:
+                on_refreshed()
+        except (ConnectionError, HTTPError, Timeout):
+            logger.exception(f"Refreshing the graph for {resource_url} failed.")
+        finally:
+            with _refreshing_lock:
+                _refreshing.discard(refresh_key)
+
+    return util.concurrency_util.get_executor().submit(refresh)
+
+
+def has_resource_type(
+    rdf_graph: Graph,
+    resource_url: str,
+    resource_types: Optional[Iterable[URIRef]] = None,
+) -> bool:
+    """Check in the graph whether the resource has one of the rdf:types.
+    :param rdf_graph: the graph for the resource.
+    :param resource_url: the resource URI.
+    :param resource_types: the rdf:types, if None any triple for the resource will do.
+    """
+    if resource_types is None:
+        return (URIRef(resource_url), None, None) in rdf_graph
+    return any(
+        (URIRef(resource_url), RDF.type, resource_type) in rdf_graph
+        for resource_type in resource_types
+    )
+
+
 def get_inverse_relations_from_rdf_store(
     resource_url: str, sparql_endpoint: str
 ) -> Graph:
@@ -197,7 +523,7 @@ def get_inverse_relations_from_rdf_store(
     Given the query, the graph includes labels.
     :param resource_url: the resource URI as object of a relation.
     :param sparql_endpoint: the SPARQL endpoint URL.
-    :returns: RDF data as a Graph.
+    :returns: RDF data as a Graph (the graph is cached, so don't change it).
     """
     g = Graph(bind_namespaces="core")
     if not resource_url:
@@ -205,38 +531,51 @@ def get_inverse_relations_from_rdf_store(
     if not sparql_endpoint or validators.url(sparql_endpoint) is False:
         return g
 
-    try:
-        query_str = get_query_from_file(cfg.get("INVERSE_RELATIONS_QUERY", ""))
-        query = query_str.replace("?resource_iri", f"<{resource_url}>")
-        query_result = sparql_select_query(sparql_endpoint, query, format="json")
-        results = json.loads(query_result)
-
-        # Note we have to add the resource_url for the triples that miss the object 'o'
-        g += _convert_inverse_relations_results_to_graph(results, resource_url)
-
-        if len(g) == 0:
-            logger.error("Graph was empty")
-        else:
-            logger.debug(
-                f"Graph contains {len(g)} triples for inverse relations of {resource_url}"
-            )
-
-        # add the missing namespaces and return the graph
-        return util.ns_util.bind_namespaces_to_graph(g)
+    cache_key = ("inverse_relations", resource_url, sparql_endpoint)
+    cached_graph = util.cache_util.graph_cache.get(cache_key)
+    if cached_graph is not None:
+        return cached_graph
 
+    try:
+        # concurrent requests for the resource share the query and the graph
+        return _in_flight.do(
+            cache_key,
+            lambda: _query_inverse_relations_graph(
+                cache_key, resource_url, sparql_endpoint
+            ),
+        )
     except ConnectionError as e:
         logger.exception(e)
     except HTTPError as e:
         logger.exception(e)
+    except Timeout as e:
+        logger.exception(e)
     return g
 
 
-def get_query_from_file(filepath: str) -> str:
-    """Return the query read from the query file."""
-    query_string = ""
-    with open(relative_from_repo_root(filepath), encoding="utf-8") as qf:
-        query_string = qf.read()
-    return query_string
+def _query_inverse_relations_graph(
+    cache_key: tuple, resource_url: str, sparql_endpoint: str
+) -> Graph:
+    g = Graph(bind_namespaces="core")
+    query = util.query_util.get_query(
+        cfg.get("INVERSE_RELATIONS_QUERY", ""), resource_url
+    )
+    bindings = sparql_select_all_bindings(sparql_endpoint, query)
+
+    # Note we have to add the resource_url for the triples that miss the object 'o'
+    g += _convert_inverse_relations_results_to_graph(bindings, resource_url)
+
+    if len(g) == 0:
+        logger.error("Graph was empty")
+    else:
+        logger.debug(
+            f"Graph contains {len(g)} triples for inverse relations of {resource_url}"
+        )
+
+    # add the missing namespaces and return the graph
+    g = util.ns_util.bind_namespaces_to_graph(g)
+    util.cache_util.graph_cache.set(cache_key, g)
+    return g
 
 
 def sparql_select_query(
@@ -246,7 +585,8 @@ def sparql_select_query(
     session: Optional[requests.Session] = None,
 ) -> str:
     """Sends a SPARQL SELECT query to the SPARQL endpoint and returns the result in a string in the specified format
-    raises a ConnectionError when the sparql endpoint can not be reached, or
+    raises a ConnectionError when the sparql endpoint can not be reached,
+    raises a Timeout when the sparql endpoint does not respond in time, or
     raises an HTTPError when the request was not successful.
     :param sparql_endpoint - the endpoint to be queried
     :param query - the SELECT query
@@ -263,7 +603,7 @@ def sparql_select_query(
             },
         )
     else:
-        resp = requests.get(
+        resp = util.http_util.sparql_get(
             sparql_endpoint,
             params={"query": query},
             headers={
@@ -276,12 +616,95 @@ def sparql_select_query(
     return result_string
 
 
+def sparql_select_bindings(sparql_endpoint: str, query: str) -> Iterator[dict]:
+    """Sends a SPARQL SELECT query to the SPARQL endpoint and yields the bindings
+    of the JSON results while the response is read, instead of loading the whole
+    response first. The request is sent when the first binding is requested.
+    raises a ConnectionError when the sparql endpoint can not be reached or the
+    connection breaks while reading the response,
+    raises a Timeout when the sparql endpoint does not respond in time, or
+    raises an HTTPError when the request was not successful.
+    :param sparql_endpoint - the endpoint to be queried
+    :param query - the SELECT query"""
+    resp = util.http_util.sparql_get(
+        sparql_endpoint,
+        params={"query": query},
+        headers={"Accept": "application/sparql-results+json"},
+        stream=True,
+    )
+    try:
+        resp.raise_for_status()
+        yield from util.sparql_results_util.iter_bindings(
+            resp.iter_content(chunk_size=SPARQL_RESULTS_CHUNK_SIZE)
+        )
+    except ChunkedEncodingError as e:
+        raise ConnectionError(e)
+    finally:
+        resp.close()
+
+
+def sparql_select_all_bindings(sparql_endpoint: str, query: str) -> Iterator[dict]:
+    """Like sparql_select_bindings, but when the results fill the LIMIT at the end
+    of the query, the results are queried again in pages of LIMIT results (see
+    query_util.page_query), QUERY_PAGING_WORKERS pages at a time, until a page is
+    not full or QUERY_PAGING_MAX_ROWS results are queried. The first page is queried
+    again, because the unordered results of the query can't be continued, so a
+    binding can be yielded twice.
+    raises a ConnectionError, HTTPError or Timeout when querying fails."""
+    page_size = util.query_util.query_limit(query)
+    count = 0
+    for binding in sparql_select_bindings(sparql_endpoint, query):
+        count += 1
+        yield binding
+    max_rows = cfg.get("QUERY_PAGING_MAX_ROWS", 100000)
+    if page_size is None or count < page_size or max_rows <= page_size:
+        return
+    try:
+        util.query_util.page_query(query, 0)
+    except ValueError:
+        logger.warning(f"The results fill the LIMIT, but can't be paged: {query}")
+        return
+    yield from _select_pages(sparql_endpoint, query, page_size, max_rows)
+
+
+def _select_pages(
+    sparql_endpoint: str, query: str, page_size: int, max_rows: int
+) -> Iterator[dict]:
+    executor = util.concurrency_util.get_paging_executor()
+    offsets = iter(range(0, max_rows, page_size))
+
+    def select_page(offset: int) -> List[dict]:
+        page = util.query_util.page_query(query, offset)
+        return list(sparql_select_bindings(sparql_endpoint, page))
+
+    while True:
+        offsets_in_parallel = list(
+            itertools.islice(offsets, cfg.get("QUERY_PAGING_WORKERS", 4))
+        )
+        if not offsets_in_parallel:
+            logger.warning(f"Results truncated at {max_rows} rows: {query}")
+            return
+        pages = [executor.submit(select_page, offset) for offset in offsets_in_parallel]
+        try:
+            for page in pages:
+                bindings = page.result()
+                yield from bindings
+                if len(bindings) < page_size:
+                    return
+        finally:
+            # after the last page (or an error), the pages that didn't start yet
+            # are not queried
+            for page in pages:
+                page.cancel()
+
+
 def sparql_construct_query(sparql_endpoint: str, query: str) -> Graph:
     """Sends a SPARQL CONSTRUCT query to the SPARQL endpoint and returns the result parsed into a Graph.
-    raises a ConnectionError when the sparql endpoint can not be reached, or
+    raises a ConnectionError when the sparql endpoint can not be reached,
+    raises a Timeout when the sparql endpoint does not respond in time, or
     raises an HTTPError when the request was not successful."""
     g = Graph()
-    resp = requests.get(sparql_endpoint, params={"query": query})
+    resp = util.http_util.sparql_get(sparql_endpoint, params={"query": query})
     resp.raise_for_status()
     if resp.status_code == 200:
         g.parse(data=resp.text, format="xml")
@@ -290,9 +713,12 @@ def sparql_construct_query(sparql_endpoint: str, query: str) -> Graph:
 
 def sparql_ask_query(sparql_endpoint: str, query: str) -> bool:
     """Sends a SPARQL ASK query to the SPARQL endpoint and returns True or False.
-    raises a ConnectionError when the sparql endpoint can not be reached, or
+    raises a ConnectionError when the sparql endpoint can not be reached,
+    raises a Timeout when the sparql endpoint does not respond in time, or
     raises an HTTPError when the request was not successful."""
-    resp = requests.get(sparql_endpoint, params={"query": query, "format": "json"})
+    resp = util.http_util.sparql_get(
+        sparql_endpoint, params={"query": query, "format": "json"}
+    )
     resp.raise_for_status()
     if resp.status_code == 200:
         if resp.json().get("boolean"):
@@ -300,6 +726,18 @@ def sparql_ask_query(sparql_endpoint: str, query: str) -> bool:
     return False
 
 
+def _bnode_for_node_id(node_id: str) -> BNode:
+    """Returns the blank node for a node ID in the SPARQL results. Node IDs that
+    are not a valid NCName (e.g. "_:http://...") can't be serialized, so they are
+    replaced by a valid ID derived from the node ID. The same node ID always gives
+    the same blank node, so the triples of a blank node stay together.
+    """
+    if is_ncname(node_id):
+        return BNode(node_id)
+    logger.debug(f"is_ncname: invalid nodeID: {node_id}")
+    return BNode("N" + hashlib.sha1(node_id.encode("utf-8")).hexdigest())
+
+
 def _result_binding_to_triple(result_binding: dict) -> tuple:
     """Convert a SPARQL result binding to an RDF triple (s, p, o).
     :param result_binding: the SPARQL result binding as a dictionary.
@@ -315,10 +753,7 @@ def _result_binding_to_triple(result_binding: dict) -> tuple:
     if s_type == "uri":
         s = URIRef(s_value)
     elif s_type == "bnode":
-        if is_ncname(s_value) == 0:
-            # log it but no exception. nodeids are handled later.
-            logger.debug(f"is_ncname: s_value is invalid nodeID: {s_value}")
-        s = BNode(s_value)
+        s = _bnode_for_node_id(s_value)
 
     # predicate
     p_value = result_binding.get("p", {}).get("value", "")
@@ -330,10 +765,7 @@ def _result_binding_to_triple(result_binding: dict) -> tuple:
     if o_type == "uri":
         o = URIRef(o_value)
     elif o_type == "bnode":
-        if is_ncname(o_value) == 0:
-            # log it but no exception. nodeids are handled later.
-            logger.debug(f"is_ncname: o_value is invalid nodeID: {o_value}")
-        o = BNode(o_value)
+        o = _bnode_for_node_id(o_value)
     elif o_type == "literal":
         lang = result_binding.get("o", {}).get("xml:lang", None)
         datatype = result_binding.get("o", {}).get("datatype", None)
@@ -347,14 +779,14 @@ def _result_binding_to_triple(result_binding: dict) -> tuple:
     return (s, p, o)
 
 
-def _convert_results_to_graph(results: dict, resource_url: str) -> Graph:
+def _convert_results_to_graph(bindings: Iterable[dict], resource_url: str) -> Graph:
     """Convert SPARQL SELECT query results to an RDF Graph.
-    :param results: the SPARQL SELECT query results as a dictionary.
+    :param bindings: the bindings in the SPARQL SELECT query results.
     :param resource_url: the main resource URL to use when subject 's' is missing.
     :returns: an RDF Graph containing the triples.
     """
     g = Graph()
-    for row in results.get("results", {}).get("bindings", []):
+    for row in bindings:
         try:
             s, p, o = _result_binding_to_triple(row)
             if not s:
@@ -364,21 +796,19 @@ def _convert_results_to_graph(results: dict, resource_url: str) -> Graph:
                 g.add((s, p, o))
         except Exception as exc:
             logger.error(str(exc))
-
-    logger.debug("serialize to turtle and parse, to remove invalid blank node ids.")
-    return Graph().parse(data=g.serialize(format="turtle"), format="turtle")
+    return g
 
 
 def _convert_inverse_relations_results_to_graph(
-    results: dict, resource_url: str
+    bindings: Iterable[dict], resource_url: str
 ) -> Graph:
     """Convert SPARQL SELECT query results to an RDF Graph.
-    :param results: the SPARQL SELECT query results as a dictionary.
+    :param bindings: the bindings in the SPARQL SELECT query results.
     :param resource_url: the resource URL to use when object 'o' is missing.
     :returns: an RDF Graph containing the triples.
     """
     g = Graph()
-    for row in results.get("results", {}).get("bindings", []):
+    for row in bindings:
         try:
             s, p, o = _result_binding_to_triple(row)
             if not o:
@@ -411,6 +841,7 @@ def get_album_art_from_rdf_graph(rdf_graph: Graph, resource_url: str) -> Optiona
 
 def ask_for_inverse_relations(resource_url: str, sparql_endpoint: str) -> bool:
     """Ask the endpoint whether or not there are inverse relations."""
-    query_str = get_query_from_file(cfg.get("INVERSE_RELATIONS_ASK", ""))
-    query = query_str.replace("?resource_iri", f"<{resource_url}>")
+    query = util.query_util.get_query(
+        cfg.get("INVERSE_RELATIONS_ASK", ""), resource_url
+    )
     return sparql_ask_query(sparql_endpoint, query)
@@ -2,12 +2,14 @@ import itertools
 import logging
 import json
 from collections import Counter
+from concurrent.futures import Future
 from flask import render_template, Response
 from rdflib import Graph, URIRef, Literal, BNode
-from rdflib.namespace import RDF, RDFS, SDO, SKOS, DCTERMS, OWL  # type: ignore
-from typing import Optional, List
+from rdflib.namespace import RDF, RDFS, SDO, SKOS, DCTERMS, OWL, split_uri  # type: ignore
+from typing import Optional, List, Tuple
 from util.mime_type_util import MimeType
 from util.APIUtil import APIUtil
+import util.concurrency_util
 import util.ld_util
 from util.ns_util import SCHEMA, MUZIEKWEB_VOCAB, SKOSXL
 from config import cfg
@@ -25,16 +27,28 @@ def json_ld_structured_data_for_resource(rdf_graph: Graph) -> str:
 # ========= JSON generator functions for lod-view ==========
 
 
+def _qname_parts(rdf_graph: Graph, iri: str) -> Tuple[str, str, str]:
+    """Returns the prefix, namespace and name of the IRI. The prefix is empty if
+    none is bound for the namespace: no prefix is added to the graph, because the
+    graphs from the graph cache are shared by the threads and must not change."""
+    try:
+        prefix, namespace, name = rdf_graph.compute_qname(iri, generate=False)
+        return prefix, str(namespace), name
+    except KeyError:
+        split_namespace, split_name = split_uri(iri)
+        return "", split_namespace, split_name
+
+
 def json_parts_from_IRI(rdf_graph: Graph, iri: str) -> dict:
     """Generates the parts needed in the UI, eg. prefix, namespace and property."""
     if iri.endswith("/"):  # URIs that end with a '/' can not be split by rdflib.
         return {"uri": iri, "prefix": "", "namespace": "", "property": ""}
     else:
-        prefix, namespace, name = rdf_graph.compute_qname(str(iri))
+        prefix, namespace, name = _qname_parts(rdf_graph, str(iri))
         return {
             "uri": iri,
             "prefix": prefix if not prefix.startswith("ns") else "",
-            "namespace": str(namespace),
+            "namespace": namespace,
             "property": name,
         }
 
@@ -108,12 +122,12 @@ def json_for_literal(rdf_graph: Graph, literal: Literal, lang: str = "") -> dict
 def json_for_datatype(rdf_graph: Graph, datatype_iri: URIRef | None) -> dict:
     """Generates JSON parts for a given datatype IRI."""
     if datatype_iri:
-        prefix, namespace, name = rdf_graph.compute_qname(str(datatype_iri))
+        prefix, namespace, name = _qname_parts(rdf_graph, str(datatype_iri))
         return {
             "datatype": {
                 "uri": str(datatype_iri),
                 "prefix": prefix,
-                "namespace": str(namespace),
+                "namespace": namespace,
                 "property": name,
             }
         }
@@ -281,37 +295,62 @@ def json_inverse_relations_for_resource(
         g = util.ld_util.get_inverse_relations_from_rdf_store(
             resource_url, sparql_endpoint
         )
+        return json_inverse_relations_from_rdf_graph(g, resource_url)
+    return []
 
-        # Count occurrences of each predicate (property) for a given resource URI.
-        property_counts = Counter(p for p in g.predicates(None, URIRef(resource_url)))
-        if logger.getEffectiveLevel() == logging.DEBUG:
-            for prop, count in property_counts.items():
-                logger.debug(f"{prop}: {count}")
 
-        return [
-            {
-                "p": json_parts_from_IRI(g, str(property)),
-                "count": count,
-                "resources": [
-                    {
-                        "s": json_parts_from_IRI(g, str(s))
-                        | {
-                            "labels": json_label_for_node(
-                                g,
-                                s,
-                                lang=cfg.get("UI_LANGUAGE_PREFERENCE", "nl"),
-                            )
-                        }
+def submit_inverse_relations_for_resource(
+    resource_url: str, sparql_endpoint: str
+) -> Future:
+    """Start getting the inverse relations for the lod view in the thread pool, so
+    that this runs at the same time as getting the graph for the resource.
+    The ASK is skipped: without inverse relations the query result is just empty.
+    :returns: a Future for the JSON structure for the lod view inverse relations.
+    """
+    return util.concurrency_util.get_executor().submit(
+        _json_inverse_relations_from_rdf_store, resource_url, sparql_endpoint
+    )
+
+
+def _json_inverse_relations_from_rdf_store(
+    resource_url: str, sparql_endpoint: str
+) -> list:
+    g = util.ld_util.get_inverse_relations_from_rdf_store(resource_url, sparql_endpoint)
+    return json_inverse_relations_from_rdf_graph(g, resource_url)
+
+
+def json_inverse_relations_from_rdf_graph(g: Graph, resource_url: str) -> list:
+    """Create the JSON structure that is used in the lod view inverse relations from
+    the graph with the inverse relations."""
+    # Count occurrences of each predicate (property) for a given resource URI.
+    property_counts = Counter(p for p in g.predicates(None, URIRef(resource_url)))
+    if logger.getEffectiveLevel() == logging.DEBUG:
+        for prop, count in property_counts.items():
+            logger.debug(f"{prop}: {count}")
+
+    return [
+        {
+            "p": json_parts_from_IRI(g, str(property)),
+            "count": count,
+            "resources": [
+                {
+                    "s": json_parts_from_IRI(g, str(s))
+                    | {
+                        "labels": json_label_for_node(
+                            g,
+                            s,
+                            lang=cfg.get("UI_LANGUAGE_PREFERENCE", "nl"),
+                        )
                     }
-                    for s in itertools.islice(
-                        g.subjects(property, URIRef(resource_url), unique=True), 0, 100
-                    )
-                    if isinstance(s, URIRef)
-                ],
-            }
-            for property, count in property_counts.items()
-        ]
-    return []
+                }
+                for s in itertools.islice(
+                    g.subjects(property, URIRef(resource_url), unique=True), 0, 100
+                )
+                if isinstance(s, URIRef)
+            ],
+        }
+        for property, count in property_counts.items()
+    ]
 
 
 def generate_html_page(
@@ -319,6 +358,7 @@ def generate_html_page(
     resource_iri: str,
     sparql_endpoint: str,
     template: str = "bg_resource.html",
+    inverse_relations: Optional[Future] = None,
 ):
     logger.info(f"Generating HTML page for {resource_iri}.")
     html_page = get_lod_view_resource(
@@ -326,6 +366,7 @@ def generate_html_page(
         resource_iri,
         sparql_endpoint,
         html_template=template,
+        inverse_relations=inverse_relations,
     )
     if html_page:
         return Response(html_page, mimetype=MimeType.HTML.value)
@@ -342,18 +383,26 @@ def get_lod_view_resource(
     resource_url: str,
     sparql_endpoint: str,
     html_template: str = "bg_resource.html",
+    inverse_relations: Optional[Future] = None,
 ) -> str:
     """Given a Graph, a URI and an HTML template, return an HTML page.
     :param rdf_graph: A Graph for the resource.
     :param resource_url: The URI for the resource.
     :param sparql_endpoint: The SPARQL endpoint URL.
     :param html_template: The HTML template to be used.
+    :param inverse_relations: optional, the Future from submit_inverse_relations_for_resource.
+        If omitted, the inverse relations are queried now.
     :returns: rendered HTML page as string.
     """
     if rdf_graph:
         logger.info(
             f"Rendering an html page for graph ({len(rdf_graph)} triples) using template '{html_template}'."
         )
+        json_inverse_relations = (
+            inverse_relations.result()
+            if inverse_relations is not None
+            else json_inverse_relations_for_resource(resource_url, sparql_endpoint)
+        )
         return render_template(
             html_template,
             resource_uri=resource_url,
@@ -362,9 +411,7 @@ def get_lod_view_resource(
             json_iri_iri=json_iri_iri_from_rdf_graph(rdf_graph, resource_url),
             json_iri_lit=json_iri_lit_from_rdf_graph(rdf_graph, resource_url),
             json_iri_bnode=json_iri_bnode_from_rdf_graph(rdf_graph, resource_url),
-            json_inverse_relations=json_inverse_relations_for_resource(
-                resource_url, sparql_endpoint
-            ),
+            json_inverse_relations=json_inverse_relations,
             sparql_endpoint=sparql_endpoint,
             album_art=util.ld_util.get_album_art_from_rdf_graph(
                 rdf_graph, resource_url
@@ -0,0 +1,151 @@
+import logging
+import re
+import threading
+from typing import Dict, List, Optional
+from util.base_util import relative_from_repo_root
+
+logger = logging.getLogger()
+
+# the settings with the query files that are loaded at startup
+QUERY_SETTINGS = [
+    "BENG_LOD_RESOURCE_QUERY",
+    "BENG_IS_CAT_NISV_RESOURCE",
+    "BENG_IS_SKOS_RESOURCE",
+    "INVERSE_RELATIONS_ASK",
+    "INVERSE_RELATIONS_QUERY",
+    "MUZIEKWEB_LOD_RESOURCE_QUERY",
+]
+
+# the variable in the query files that is bound to the resource IRI
+RESOURCE_IRI_PLACEHOLDER = re.compile(r"\?resource_iri\b")
+
+# characters that are not allowed in an IRIREF (see the SPARQL 1.1 grammar)
+_IRIREF_ESCAPE = re.compile(r'[\x00-\x20<>"{}|^`\\]')
+
+# the projection of a SELECT query (the WHERE keyword is optional), and the LIMIT
+# at the end of a query
+_SELECT_PROJECTION = re.compile(
+    r"\bselect\s+((?:distinct\s+|reduced\s+)?)([^{]*?)(?:\bwhere\s*)?\{", re.I | re.S
+)
+_LIMIT = re.compile(r"\blimit\s+(\d+)\s*$", re.I)
+_ORDER_BY = re.compile(r"\border\s+by\b", re.I)
+_VARIABLE = re.compile(r"[?$]\w+")
+
+_registry: Dict[str, "QueryTemplate"] = {}
+_registry_lock = threading.Lock()
+
+
+class QueryTemplate:
+    """A query that is read (and checked) once, with the resource IRI bound per request."""
+
+    def __init__(self, query: str):
+        self.query = query
+        # split once, so binding is a join instead of a search and replace
+        self._parts: List[str] = RESOURCE_IRI_PLACEHOLDER.split(query)
+
+    @property
+    def has_placeholder(self) -> bool:
+        return len(self._parts) > 1
+
+    def bind(self, resource_iri: str) -> str:
+        """Returns the query with ?resource_iri replaced by the escaped <resource_iri>."""
+        return sparql_iri(resource_iri).join(self._parts)
+
+    def bind_values(self, resource_iris: List[str]) -> str:
+        """Returns the SELECT query for all resource IRIs at once: ?resource_iri is
+        bound by a VALUES clause and added to the projection, so every result tells
+        to which resource it belongs. A LIMIT at the end of the query is multiplied
+        by the number of resource IRIs.
+        raises a ValueError if the query is not a SELECT query.
+        """
+        match = _SELECT_PROJECTION.search(self.query)
+        if match is None:
+            raise ValueError("Only a SELECT query can be bound to multiple IRIs")
+        values = " ".join(sparql_iri(iri) for iri in resource_iris)
+        query = (
+            f"{self.query[: match.start()]}SELECT {match.group(1)}?resource_iri "
+            f"{match.group(2)}WHERE {{\n    VALUES ?resource_iri {{ {values} }}"
+            f"{self.query[match.end():]}"
+        )
+        return _LIMIT.sub(
+            lambda m: f"LIMIT {int(m.group(1)) * len(resource_iris)}", query
+        )
+
+
+def query_limit(query: str) -> Optional[int]:
+    """Returns the LIMIT at the end of the query, or None if there is none."""
+    match = _LIMIT.search(query)
+    return int(match.group(1)) if match else None
+
+
+def page_query(query: str, offset: int) -> str:
+    """Returns the query for the page of results at the offset, with the LIMIT at
+    the end of the query as the page size. Unless the query orders the results
+    already, they are ordered by the projected variables, so the pages don't overlap.
+    raises a ValueError if the query has no LIMIT at the end or is not a SELECT
+    query with variables in the projection.
+    """
+    limit = _LIMIT.search(query)
+    projection = _SELECT_PROJECTION.search(query)
+    variables = _VARIABLE.findall(projection.group(2)) if projection else []
+    if limit is None or not variables:
+        raise ValueError("Only a SELECT query with variables and a LIMIT can be paged")
+    order_by = "" if _ORDER_BY.search(query) else f"ORDER BY {' '.join(variables)}\n"
+    return f"{query[: limit.start()]}{order_by}LIMIT {limit.group(1)} OFFSET {offset}"
+
+
+def sparql_iri(iri: str) -> str:
+    """Returns the IRI as a SPARQL IRIREF. Characters that are not allowed in an
+    IRIREF (e.g. '>', spaces, quotes and braces) are percent-encoded, so the IRI
+    can not close the IRIREF and change the query."""
+    return "<{}>".format(
+        _IRIREF_ESCAPE.sub(lambda m: "%{:02X}".format(ord(m.group())), iri)
+    )
+
+
+def read_query_file(filepath: str) -> str:
+    """Return the query read from the query file."""
+    with open(relative_from_repo_root(filepath), encoding="utf-8") as qf:
+        return qf.read()
+
+
+def load_query_template(filepath: str) -> QueryTemplate:
+    """Reads the query file and checks that it is a query for a resource.
+    raises a ValueError if the query is empty or doesn't contain ?resource_iri.
+    """
+    query_template = QueryTemplate(read_query_file(filepath))
+    if not query_template.query.strip():
+        raise ValueError(f"Query file {filepath} is empty")
+    if not query_template.has_placeholder:
+        raise ValueError(f"Query file {filepath} does not contain ?resource_iri")
+    return query_template
+
+
+def load_queries(config: dict):
+    """Loads the query files of all QUERY_SETTINGS that are in the config into the
+    registry, so the query files are read at startup instead of per request.
+    raises an OSError or ValueError for a missing or invalid query file.
+    """
+    for setting in QUERY_SETTINGS:
+        filepath = config.get(setting)
+        if filepath:
+            logger.info(f"Loading query {setting} from {filepath}")
+            _registry[filepath] = load_query_template(filepath)
+
+
+def get_query_template(filepath: str) -> QueryTemplate:
+    """Returns the query template for the query file from the registry.
+    A query file that wasn't loaded at startup is loaded (once) now."""
+    query_template = _registry.get(filepath)
+    if query_template is None:
+        with _registry_lock:
+            query_template = _registry.get(filepath)
+            if query_template is None:
+                query_template = load_query_template(filepath)
+                _registry[filepath] = query_template
+    return query_template
+
+
+def get_query(filepath: str, resource_iri: str) -> str:
+    """Returns the query in the query file, for the resource IRI."""
+    return get_query_template(filepath).bind(resource_iri)
@@ -0,0 +1,273 @@
+import gzip
+import hashlib
+import logging
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Any, Callable, Iterator, NamedTuple, Optional, Tuple
+from flask import Response, request, stream_with_context
+from rdflib import Graph
+from werkzeug.http import is_resource_modified
+from config import cfg
+from util.cache_util import create_shared_cache, graph_digest
+from util.mime_type_util import MimeType
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional, gzip is always available
+    brotli = None
+
+logger = logging.getLogger()
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    content_type: str
+    etag: str = ""
+    # the compressed bodies, (content coding, body) pairs, see _compress
+    compressed: Tuple[Tuple[str, bytes], ...] = ()
+
+
+def _encode(cached_response: CachedResponse) -> bytes:
+    # the compressed bodies follow the body, their lengths are in the header
+    lengths = ",".join(
+        f"{coding}:{len(body)}" for coding, body in cached_response.compressed
+    )
+    header = f"{cached_response.content_type}\n{cached_response.etag}\n{lengths}\n"
+    return b"".join(
+        [header.encode("utf-8"), cached_response.body]
+        + [body for _, body in cached_response.compressed]
+    )
+
+
+def _decode(data: bytes) -> CachedResponse:
+    content_type, etag, lengths, data = data.split(b"\n", 3)
+    codings = [
+        (coding, int(length))
+        for coding, length in (
+            coding_length.split(":")
+            for coding_length in lengths.decode("utf-8").split(",")
+            if coding_length
+        )
+    ]
+    offset = len(data) - sum(length for _, length in codings)
+    body = data[:offset]
+    compressed = []
+    for coding, length in codings:
+        compressed.append((coding, data[offset : offset + length]))
+        offset += length
+    return CachedResponse(
+        body, content_type.decode("utf-8"), etag.decode("utf-8"), tuple(compressed)
+    )
+
+
+def _compress(body: bytes) -> Tuple[Tuple[str, bytes], ...]:
+    """Returns the compressed bodies that are smaller than the body, as (content
+    coding, body) pairs: Brotli (if the brotli package is installed) and gzip.
+    Bodies smaller than COMPRESSION_MIN_BYTES are not compressed.
+    """
+    if len(body) < cfg.get("COMPRESSION_MIN_BYTES", 1024):
+        return ()
+    compressed = []
+    if brotli is not None:
+        compressed.append(
+            ("br", brotli.compress(body, quality=cfg.get("BROTLI_QUALITY", 5)))
+        )
+    # mtime=0, so the same body always gives the same gzip body
+    compressed.append(
+        ("gzip", gzip.compress(body, cfg.get("GZIP_COMPRESS_LEVEL", 6), mtime=0))
+    )
+    return tuple((coding, data) for coding, data in compressed if len(data) < len(body))
+
+
+def _set_body(response: Response, cached_response: CachedResponse):
+    """Sets the body of the response that the client accepts (the Accept-Encoding
+    header): one of the compressed bodies, or the uncompressed body."""
+    if not cached_response.compressed:
+        response.set_data(cached_response.body)
+        return
+    compressed = dict(cached_response.compressed)
+    coding = request.accept_encodings.best_match(list(compressed)) or ""
+    response.set_data(compressed.get(coding, cached_response.body))
+    if coding in compressed:
+        response.content_encoding = coding
+    response.vary.add("Accept-Encoding")
+
+
+# serialized graphs and rendered HTML pages, the size is the number of bytes
+response_cache = create_shared_cache(
+    "response",
+    max_entries=cfg.get("RESPONSE_CACHE_MAX_ENTRIES", 1000),
+    ttl_sec=cfg.get("RESPONSE_CACHE_TTL_SEC", 300.0),
+    max_size=cfg.get("RESPONSE_CACHE_MAX_BYTES", 200000000),
+    size_of=lambda cached_response: len(cached_response.body)
+    + sum(len(body) for _, body in cached_response.compressed),
+    encode=_encode,
+    decode=_decode,
+    max_stale_sec=cfg.get("RESPONSE_CACHE_MAX_STALE_SEC", 3600.0),
+)
+
+# see RFC 7234, section 5.5.1
+STALE_WARNING = '110 - "Response is Stale"'
+
+
+def _etag(*parts: str) -> str:
+    # the app version is included, so a new release (e.g. new HTML templates)
+    # doesn't get a 304 for a representation rendered by the previous one
+    data = "\n".join((cfg.get("APP_VERSION", ""),) + parts)
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+
+def graph_etag(rdf_graph: Graph, mime_type: MimeType) -> str:
+    """Returns the ETag for the representation of the graph in the mime type.
+    The ETag is computed from the canonical form of the graph, so it is the same
+    for the same triples (blank nodes included), also in another process. The
+    digest of a cached graph was computed when it was cached, see graph_digest.
+    """
+    return _etag(graph_digest(rdf_graph), mime_type.value)
+
+
+def version_etag(resource_url: str, mime_type: MimeType, version: str) -> str:
+    """Returns the ETag for the representation of the resource in the mime type,
+    for a version of the source data (e.g. the digest of the data catalog). The ETag
+    is known without getting the graph of the resource.
+    """
+    return _etag(version, resource_url, mime_type.value)
+
+
+def is_not_modified(etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """Returns True if the conditional headers of the current request
+    (If-None-Match, or If-Modified-Since) show the client has this representation.
+    """
+    return not is_resource_modified(
+        request.environ, etag=etag, last_modified=last_modified
+    )
+
+
+def not_modified_response(
+    etag: str, last_modified: Optional[datetime] = None
+) -> Response:
+    response = Response(status=304)
+    _set_validators(response, etag, last_modified)
+    return response
+
+
+def _set_validators(
+    response: Response, etag: str, last_modified: Optional[datetime] = None
+):
+    # weak ETags: the same triples can be serialized in another order
+    if etag:
+        response.set_etag(etag, weak=True)
+    if last_modified is not None:
+        response.last_modified = last_modified
+
+
+def get_cached_response(
+    resource_url: str,
+    mime_type: MimeType,
+    version: str = "",
+    last_modified: Optional[datetime] = None,
+    refresh: Optional[Callable[[Callable[[], None]], Any]] = None,
+) -> Optional[Response]:
+    """Returns a new response with the cached (compressed) body for the resource
+    in the mime type, or None if it isn't cached. Returns 304 Not Modified instead,
+    if the client already has the cached representation.
+    :param version: optional, the version of the source data (e.g. the data catalog).
+    :param last_modified: optional, when the source data was last modified.
+    :param refresh: optional, refreshes the source data in the background and
+        calls the function it gets when done. Only with refresh, a stale response
+        (older than RESPONSE_CACHE_TTL_SEC, but not older than
+        RESPONSE_CACHE_MAX_STALE_SEC on top of that) is returned, with the Age and
+        Warning headers, while the source data is refreshed.
+    """
+    cache_key = (resource_url, mime_type.value, version)
+    entry = response_cache.get_with_age(cache_key)
+    if entry is None:
+        return None
+    cached_response, age = entry
+    is_stale = response_cache.is_stale(age)
+    if is_stale:
+        if refresh is None:
+            return None
+        # the next request renders the refreshed data
+        logger.info(f"Serving stale {resource_url}, refreshing it.")
+        refresh(lambda: response_cache.delete(cache_key))
+
+    if cached_response.etag and is_not_modified(cached_response.etag, last_modified):
+        response = not_modified_response(cached_response.etag, last_modified)
+    else:
+        logger.debug(f"Serving {resource_url} as {mime_type.value} from the cache.")
+        response = Response(content_type=cached_response.content_type)
+        _set_body(response, cached_response)
+        _set_validators(response, cached_response.etag, last_modified)
+    if is_stale:
+        response.headers["Age"] = str(int(age))
+        response.headers["Warning"] = STALE_WARNING
+    return response
+
+
+def cache_response(
+    resource_url: str,
+    mime_type: MimeType,
+    response: Any,
+    version: str = "",
+    etag: str = "",
+    last_modified: Optional[datetime] = None,
+) -> Any:
+    """Caches the body of a successful response for the resource in the mime
+    type, with its compressed bodies, and sets the ETag and Last-Modified headers.
+    The response gets the (compressed) body the client accepts. Error responses
+    are not cached.
+    :param version: optional, the version of the source data (e.g. the data catalog).
+    :param etag: optional, the ETag of the representation, see graph_etag.
+    :param last_modified: optional, when the source data was last modified.
+    :returns: the response, so the API can return cache_response(...).
+    """
+    if isinstance(response, Response) and response.status_code == 200:
+        _set_validators(response, etag, last_modified)
+        body = response.get_data()
+        cached_response = CachedResponse(
+            body, response.content_type, etag, _compress(body)
+        )
+        response_cache.set((resource_url, mime_type.value, version), cached_response)
+        _set_body(response, cached_response)
+    return response
+
+
+def streamed_response(
+    body: Iterator[str],
+    mime_type: MimeType,
+    etag: str = "",
+    last_modified: Optional[datetime] = None,
+) -> Response:
+    """Returns a response that streams the body, with the ETag and Last-Modified
+    headers. The body is not cached (nor compressed), so it is never in memory
+    at once.
+    """
+    response = Response(stream_with_context(body), mimetype=mime_type.value)
+    _set_validators(response, etag, last_modified)
+    return response
+
+
+def conditional_response(
+    resource_url: str,
+    mime_type: MimeType,
+    etag: str,
+    render: Callable[[], Any],
+    pending: Optional[Future] = None,
+) -> Any:
+    """Returns 304 Not Modified if the client already has the representation with
+    this ETag, without rendering it. Otherwise renders the response and caches it.
+    :param render: returns the response, e.g. the HTML page or the serialized graph.
+    :param pending: optional, work for rendering that is cancelled on a 304.
+    """
+    if is_not_modified(etag):
+        cancel_pending(pending)
+        return not_modified_response(etag)
+    return cache_response(resource_url, mime_type, render(), etag=etag)
+
+
+def cancel_pending(pending: Optional[Future]):
+    """Cancels work for rendering a response that is not rendered, e.g. for a 404
+    (work that already started runs to the end)."""
+    if pending is not None:
+        pending.cancel()
@@ -0,0 +1,122 @@
+import codecs
+import json
+import re
+from typing import Any, Iterable, Iterator
+
+# whitespace as allowed between JSON tokens
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_decoder = json.JSONDecoder()
+
+
+class _JSONStreamReader:
+    """Reads JSON tokens and values from chunks of UTF-8 encoded bytes, keeping only
+    the part of the text that wasn't read yet."""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._utf8_decoder = codecs.getincrementaldecoder("utf-8")()
+        self._text = ""
+        self._pos = 0
+        self._eof = False
+
+    def _read_chunk(self) -> bool:
+        """Adds the next chunk to the text. Returns False at the end of the stream."""
+        if self._eof:
+            return False
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            self._eof = True
+            text = self._utf8_decoder.decode(b"", final=True)
+        else:
+            text = self._utf8_decoder.decode(chunk)
+        self._text = self._text[self._pos :] + text
+        self._pos = 0
+        return chunk is not None
+
+    def peek(self) -> str:
+        """Skips whitespace and returns the next character, '' at the end."""
+        while True:
+            match = _WHITESPACE.match(self._text, self._pos)
+            self._pos = match.end() if match else self._pos
+            if self._pos < len(self._text):
+                return self._text[self._pos]
+            if not self._read_chunk():
+                return ""
+
+    def expect(self, char: str):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Invalid SPARQL JSON results: expected '{char}'")
+        self._pos += 1
+
+    def separator(self, end_char: str) -> bool:
+        """Reads a ',' or the end_char. Returns True if more items follow."""
+        found = self.peek()
+        self._pos += 1
+        if found == end_char:
+            return False
+        if found != ",":
+            raise ValueError(
+                f"Invalid SPARQL JSON results: expected ',' or '{end_char}'"
+            )
+        return True
+
+    def value(self) -> Any:
+        """Reads a complete JSON value, reading more chunks when it is incomplete."""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self._text, self._pos)
+                # a number at the end of the text may continue in the next chunk
+                if end < len(self._text) or self._eof:
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            self._read_chunk()
+
+
+def _object_keys(reader: _JSONStreamReader) -> Iterator[str]:
+    """Reads a JSON object and yields its keys. The caller reads the value of each key."""
+    reader.expect("{")
+    if reader.peek() == "}":
+        reader.expect("}")
+        return
+    while True:
+        key = reader.value()
+        if not isinstance(key, str):
+            raise ValueError("Invalid SPARQL JSON results: expected a key")
+        reader.expect(":")
+        yield key
+        if not reader.separator("}"):
+            return
+
+
+def _array_items(reader: _JSONStreamReader) -> Iterator[Any]:
+    reader.expect("[")
+    if reader.peek() == "]":
+        reader.expect("]")
+        return
+    while True:
+        yield reader.value()
+        if not reader.separator("]"):
+            return
+
+
+def iter_bindings(chunks: Iterable[bytes]) -> Iterator[dict]:
+    """Yields the bindings in application/sparql-results+json results, while the
+    results are read, so the complete results are never in memory at once.
+    raises a ValueError when the results are not valid JSON.
+    :param chunks: the results as chunks of bytes, e.g. from Response.iter_content.
+    """
+    reader = _JSONStreamReader(chunks)
+    for key in _object_keys(reader):
+        if key == "results":
+            for results_key in _object_keys(reader):
+                if results_key == "bindings":
+                    yield from _array_items(reader)
+                else:
+                    reader.value()
+        else:
+            reader.value()  # e.g. the head with the vars